@@ -0,0 +1,158 @@
+"""
+Value codec benchmark: size and decoding latency of the dict values of the hot
+columns, serialized with pickle, msgpack (freaddb ToBytes.OBJ) and the binary codec
+(kgdb.utils.binary_codec), for whole values and for one field of the values.
+
+Values are generated with a fixed seed (Wikidata literal claims, labels), or
+sampled from a column of a database (--db_name, --db_dir, --column).
+
+python -m kgdb.benchmarks.codec --n_values 2000 --output codec.json
+python -m kgdb.benchmarks.codec --db_name DBWikidata --db_dir /tmp/mkg/databases \
+    --column CLAIMS_LIT --field string
+"""
+
+import argparse
+import pickle
+import random
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+import msgpack
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+from kgdb.utils.binary_codec import BinaryCodec, get_key_table, unpackb
+
+CLAIM_TYPES = ["string", "time", "quantity", "monolingualtext", "globecoordinate"]
+# Synthetic values: generator, field of the field decoding
+WORKLOADS = {
+    "claims": "time",
+    "labels": "en",
+}
+
+
+def get_claims(rand: random.Random) -> Dict:
+    # Literal claims of Wikidata items {type: {prop_lid: [values]}}
+    def props(n):
+        return rand.sample(range(1, 12_000), n)
+
+    return {
+        "string": {
+            p: [f"ID{rand.randrange(10**7)}" for _ in range(rand.randint(1, 2))]
+            for p in props(rand.randint(3, 30))
+        },
+        "time": {p: ["+1987-05-04T00:00:00Z"] for p in props(3)},
+        "quantity": {
+            p: [["+12.5", rand.randrange(10**6)], ["3", -1]] for p in props(3)
+        },
+        "monolingualtext": {1476: ["Title of the item"]},
+    }
+
+
+def get_labels(rand: random.Random, langs: List[str]) -> Dict:
+    # Labels of Wikidata items {lang: label}
+    item_langs = ["en"] + rand.sample(langs, rand.randint(1, 100))
+    return {lang: f"Label {rand.randrange(10**6)} ({lang})" for lang in item_langs}
+
+
+def get_synthetic_values(workload: str, n_values: int, seed: int = 42) -> List:
+    rand = random.Random(seed)
+    if workload == "claims":
+        return [get_claims(rand) for _ in range(n_values)]
+    langs = [f"l{i}" for i in range(300)]
+    return [get_labels(rand, langs) for _ in range(n_values)]
+
+
+def get_db_values(db_name: str, db_dir: str, column: str, n_values: int) -> List:
+    # Decoded values of evenly spaced items of a column
+    from kgdb.benchmarks.startup import open_db
+    from kgdb.resources.db.db_codecs import get_column_codec, sample_values
+
+    db = open_db(db_name, db_dir)
+    codec = get_column_codec(db, column)
+    values = [codec.decode(value) for value in sample_values(db, column, n_values)]
+    db.close()
+    return values
+
+
+def get_decode_time(func: Callable, values: List[bytes], n_runs: int) -> float:
+    # Best mean decoding time of n_runs runs in microseconds
+    times = []
+    for _ in range(n_runs):
+        start = perf_counter()
+        for value in values:
+            func(value)
+        times.append((perf_counter() - start) / max(1, len(values)) * 1e6)
+    return min(times)
+
+
+def run_codec_benchmark(
+    values: List[Any], field: Optional[Any] = None, n_runs: int = 5
+) -> Dict:
+    """
+    Mean size (bytes) and decoding time (microseconds) of the values per format
+    """
+    codec = BinaryCodec(get_key_table(values, cf.BINARY_MAX_KEYS))
+    formats = {
+        "pickle": (
+            [pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL) for v in values],
+            pickle.loads,
+        ),
+        "msgpack": ([msgpack.packb(v) for v in values], unpackb),
+        "binary": ([codec.dumps(v) for v in values], codec.loads),
+    }
+    responds = dict()
+    for name, (encoded, loads) in formats.items():
+        responds[name] = {
+            "size": sum(len(v) for v in encoded) / max(1, len(encoded)),
+            "decode_us": get_decode_time(loads, encoded, n_runs),
+        }
+    if field is not None:
+        for name, (encoded, loads) in formats.items():
+            responds[name]["decode_field_us"] = get_decode_time(
+                lambda v: loads(v).get(field), encoded, n_runs
+            )
+        responds["binary"]["decode_field_us"] = get_decode_time(
+            lambda v: codec.loads_field(v, field), formats["binary"][0], n_runs
+        )
+    return responds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="kgdb value codec benchmark")
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS))
+    parser.add_argument("--n_values", type=int, default=2000)
+    parser.add_argument("--n_runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db_name", default=None, help="e.g., DBWikidata")
+    parser.add_argument("--db_dir", default=cf.DIR_DATABASES)
+    parser.add_argument("--column", default=None, help="e.g., CLAIMS_LIT")
+    parser.add_argument("--field", default=None, help="Field of the column values")
+    parser.add_argument("--output", default=None, help="JSON result file")
+    args = parser.parse_args()
+
+    if args.db_name:
+        runs = {
+            f"{args.db_name}/{args.column}": (
+                get_db_values(args.db_name, args.db_dir, args.column, args.n_values),
+                args.field,
+            )
+        }
+    else:
+        runs = {
+            workload: (
+                get_synthetic_values(workload, args.n_values, args.seed),
+                WORKLOADS[workload],
+            )
+            for workload in args.workloads
+        }
+    results = dict()
+    for run, (values, field) in runs.items():
+        results[run] = run_codec_benchmark(values, field, args.n_runs)
+        for name, result in results[run].items():
+            iw.print_status(
+                f"{run} {name}: "
+                + " ".join(f"{metric} {value:.2f}" for metric, value in result.items())
+            )
+    if args.output:
+        iw.save_json_file(args.output, results)
@@ -0,0 +1,264 @@
+"""
+Read hot-path benchmark: per-operation latency (p50/p95/p99) and throughput of the
+lookup functions used by the services, single- and multi-threaded.
+
+Keys are sampled with a fixed seed from the databases of cf.DIR_DATABASES (set
+KGDB_DIR_DATABASES to benchmark another build, e.g., the mini knowledge graph), so
+two runs on the same build query the same keys and their JSON results can be
+compared.
+
+python -m kgdb.benchmarks.hot_path --n_keys 1000 --n_threads 1 4 --output hot.json
+python -m kgdb.benchmarks.hot_path --output new.json --compare hot.json
+"""
+
+import argparse
+import random
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+
+WORKLOADS = [
+    "get_lid",
+    "get_item",
+    "get_claims_entity",
+    "get_all_types",
+    "get_haswbstatements",
+    "get_wd_ranking_from_label",
+    "search",
+]
+PERCENTILES = [50, 95, 99]
+
+
+def summarize(latencies: List[float], wall_time: float) -> Dict:
+    """
+    Latency percentiles (milliseconds) and throughput of one run
+    """
+    if not latencies:
+        return {"ops": 0, "ops_per_sec": 0}
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000
+    responds = {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / wall_time if wall_time else 0,
+        "mean_ms": float(latencies.mean()),
+        "max_ms": float(latencies.max()),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        responds[f"p{p}_ms"] = float(value)
+    return responds
+
+
+def run_ops(func: Callable, keys: List, n_threads: int = 1) -> Dict:
+    # Keys are split in n_threads contiguous chunks, one per thread
+    def run_chunk(chunk):
+        latencies = []
+        for key in chunk:
+            start = perf_counter()
+            func(key)
+            latencies.append(perf_counter() - start)
+        return latencies
+
+    chunk_size = -(-len(keys) // n_threads) if keys else 1
+    chunks = [keys[i : i + chunk_size] for i in range(0, len(keys), chunk_size)]
+    start = perf_counter()
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            results = list(pool.map(run_chunk, chunks))
+    else:
+        results = [run_chunk(chunk) for chunk in chunks]
+    wall_time = perf_counter() - start
+    return summarize([t for latencies in results for t in latencies], wall_time)
+
+
+def sample_items(db, n_keys: int, seed: int = 42) -> List[Tuple[int, str]]:
+    # Random (lid, Wikidata ID) pairs, lids are dense in [0, max_lid_id)
+    from kgdb.resources.db.utils import is_wikidata_item
+
+    rng = random.Random(seed)
+    responds = []
+    if not db.max_lid_id:
+        return responds
+    for _ in range(n_keys * 10):
+        lid = rng.randrange(db.max_lid_id)
+        wd_id = db.get_id(lid)
+        if wd_id and is_wikidata_item(wd_id):
+            responds.append((lid, wd_id))
+            if len(responds) >= n_keys:
+                break
+    return responds
+
+
+def get_statements(db, lids: List[int], max_statements: int = 2) -> List[List]:
+    # haswbstatements queries built from the claims of the sampled items, so that
+    # every query has at least one result
+    responds = []
+    for lid in lids:
+        claims = db.get_claims_entity(lid)
+        if not claims:
+            continue
+        statements = []
+        for key, values in claims.items():
+            if not values:
+                continue
+            pid = key[-1] if isinstance(key, tuple) else key
+            statements.append(
+                [cf.ATTR_OPTS.AND, db.get_id(pid), db.get_id(list(values)[0])]
+            )
+            if len(statements) >= max_statements:
+                break
+        if statements:
+            responds.append(statements)
+    return responds
+
+
+def get_workloads(
+    workloads: List[str] = WORKLOADS,
+    n_keys: int = 1000,
+    seed: int = 42,
+    search_mode: str = "a",
+) -> Dict[str, Tuple[Callable, List]]:
+    """
+    Operation and sampled keys of each workload: {name: (func, keys)}
+    """
+    from kgdb.modules import entity_search
+
+    db_items = entity_search.get_wiki_items()
+    items = sample_items(db_items, n_keys, seed)
+    lids = [lid for lid, _ in items]
+    labels = None
+    if {"get_wd_ranking_from_label", "search"} & set(workloads):
+        labels = [db_items.get_label(lid) for lid in lids]
+        labels = [label for label in labels if label]
+
+    responds = dict()
+    for name in workloads:
+        if name == "get_lid":
+            responds[name] = (db_items.get_lid, [wd_id for _, wd_id in items])
+        elif name == "get_item":
+            responds[name] = (db_items.get_item, lids)
+        elif name == "get_claims_entity":
+            responds[name] = (db_items.get_claims_entity, lids)
+        elif name == "get_all_types":
+            responds[name] = (db_items.get_all_types, lids)
+        elif name == "get_haswbstatements":
+            responds[name] = (
+                db_items.get_haswbstatements,
+                get_statements(db_items, lids),
+            )
+        elif name == "get_wd_ranking_from_label":
+            db_labels = entity_search.get_wiki_labels()
+            responds[name] = (db_labels.get_wd_ranking_from_label, labels)
+        elif name == "search":
+            responds[name] = (
+                lambda query: entity_search.search(query, mode=search_mode),
+                labels,
+            )
+        else:
+            raise ValueError(f"Unknown workload: {name}")
+    return responds
+
+
+def run_hot_path_benchmark(
+    workloads: List[str] = WORKLOADS,
+    n_keys: int = 1000,
+    n_warmup: int = 100,
+    n_threads: Tuple[int, ...] = (1,),
+    seed: int = 42,
+    search_mode: str = "a",
+    search_cache: bool = False,
+    output_file: Optional[str] = None,
+) -> Dict:
+    # The search result cache is off by default: repeated keys would only measure it
+    cache_size = cf.SEARCH_CACHE_SIZE
+    if not search_cache:
+        cf.SEARCH_CACHE_SIZE = 0
+    try:
+        jobs = get_workloads(workloads, n_keys, seed, search_mode)
+        responds = {
+            "config": {
+                "dir_databases": cf.DIR_DATABASES,
+                "n_keys": n_keys,
+                "n_warmup": n_warmup,
+                "seed": seed,
+                "search_mode": search_mode,
+                "search_cache": search_cache,
+            },
+            "workloads": dict(),
+        }
+        for name, (func, keys) in jobs.items():
+            responds["workloads"][name] = dict()
+            if not keys:
+                iw.print_status(f"{name}: no keys sampled")
+                continue
+            # Warm up the page cache and the lazily created objects
+            run_ops(func, keys[:n_warmup])
+            for n in n_threads:
+                result = run_ops(func, keys, n)
+                responds["workloads"][name][f"threads_{n}"] = result
+                iw.print_status(
+                    f"{name} ({n} threads): {result['ops_per_sec']:.1f} ops/s - "
+                    f"p50 {result['p50_ms']:.3f}ms p95 {result['p95_ms']:.3f}ms "
+                    f"p99 {result['p99_ms']:.3f}ms"
+                )
+    finally:
+        cf.SEARCH_CACHE_SIZE = cache_size
+
+    if output_file:
+        iw.create_dir(output_file)
+        iw.save_json_file(output_file, responds)
+    return responds
+
+
+def compare_results(base: Dict, new: Dict) -> Dict:
+    """
+    Ratio new / base of throughput and latency percentiles of the shared runs
+    """
+    responds = dict()
+    metrics = ["ops_per_sec"] + [f"p{p}_ms" for p in PERCENTILES]
+    for name, runs in new.get("workloads", {}).items():
+        for run, result in runs.items():
+            base_result = base.get("workloads", {}).get(name, {}).get(run)
+            if not base_result:
+                continue
+            responds[f"{name}/{run}"] = {
+                metric: result[metric] / base_result[metric]
+                for metric in metrics
+                if base_result.get(metric) and metric in result
+            }
+    return responds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="kgdb read hot-path benchmark")
+    parser.add_argument("--workloads", nargs="+", default=WORKLOADS)
+    parser.add_argument("--n_keys", type=int, default=1000)
+    parser.add_argument("--n_warmup", type=int, default=100)
+    parser.add_argument("--n_threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--search_mode", default="a", choices=["a", "b", "f"])
+    parser.add_argument("--search_cache", action="store_true")
+    parser.add_argument("--output", default=None, help="JSON result file")
+    parser.add_argument("--compare", default=None, help="JSON result of a base run")
+    args = parser.parse_args()
+    results = run_hot_path_benchmark(
+        workloads=args.workloads,
+        n_keys=args.n_keys,
+        n_warmup=args.n_warmup,
+        n_threads=args.n_threads,
+        seed=args.seed,
+        search_mode=args.search_mode,
+        search_cache=args.search_cache,
+        output_file=args.output,
+    )
+    if args.compare:
+        for run, ratios in compare_results(
+            iw.read_json_file(args.compare), results
+        ).items():
+            iw.print_status(
+                f"{run}: "
+                + " ".join(f"{metric} x{ratio:.2f}" for metric, ratio in ratios.items())
+            )
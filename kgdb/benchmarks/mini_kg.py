@@ -0,0 +1,843 @@
+"""
+Synthetic mini knowledge graph: scaled-down Wikidata, Wikipedia and DBpedia dump
+files with the names and formats of the real ones (cf.DIR_DUMP_*), for reproducible
+builder and reader benchmarks.
+
+Generate the dumps, then run the build_* pipelines on them:
+python -m kgdb.benchmarks.mini_kg --dir /tmp/mini_kg --n_entities 100000 --build
+"""
+
+import argparse
+import bz2
+import gzip
+import os
+import re
+import subprocess
+import sys
+import urllib.parse
+from collections import defaultdict
+from contextlib import closing
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import ujson
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+RDFS_COMMENT = "http://www.w3.org/2000/01/rdf-schema#comment"
+OWL_THING = "http://www.w3.org/2002/07/owl#Thing"
+OWL_EQUIVALENT_CLASS = "http://www.w3.org/2002/07/owl#equivalentClass"
+OWL_EQUIVALENT_PROPERTY = "http://www.w3.org/2002/07/owl#equivalentProperty"
+
+# Languages of the DBpedia label dumps read by _parse_aliases_multilingual
+DP_LANGS = [
+    "ar",
+    "ca",
+    "cs",
+    "de",
+    "el",
+    "eo",
+    "es",
+    "eu",
+    "fr",
+    "ga",
+    "id",
+    "it",
+    "ja",
+    "ko",
+    "nl",
+    "pl",
+    "pt",
+    "ru",
+    "sv",
+    "uk",
+    "zh",
+]
+
+# Faster than the default (9), the files are small
+BZ2_LEVEL = 1
+
+# Wikidata properties of the literal claims
+PROP_TIME = "P585"
+PROP_QUANTITY = "P1082"
+PROP_STRING = "P1813"
+
+SYLLABLES = [
+    "ka", "lo", "mi", "ra", "te", "su", "no", "vi", "da", "re", "po", "li", "an",
+    "be", "co", "du", "el", "fa", "go", "hu", "is", "jo", "ku", "ma", "ne", "or",
+    "pa", "qu", "ri", "sa", "to", "ul", "ve", "wa", "xi", "yo", "ze", "ha", "mo",
+]  # fmt: skip
+
+
+def get_dump_files(dump_dir: str) -> Dict[str, str]:
+    """
+    Dump files of the real layout (cf.DIR_DUMP_*) moved to dump_dir
+    """
+
+    def move(file):
+        return f"{dump_dir}{file[len(cf.DIR_DUMP):]}"
+
+    dump_files = {
+        name: move(getattr(cf, name))
+        for name in dir(cf)
+        if name.startswith("DIR_DUMP_")
+    }
+    for lang in DP_LANGS:
+        dump_files[f"DIR_DUMP_DP_LABELS_{lang.upper()}"] = move(
+            f"{cf.DIR_DUMPS_DP}/labels_lang={lang}_uris=en.ttl.bz2"
+        )
+    return dump_files
+
+
+def sql_value(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, str):
+        value = value.replace("\\", "\\\\").replace("'", "\\'")
+        return f"'{value}'"
+    return str(value)
+
+
+def write_sql_dump(file: str, table: str, rows, rows_per_insert: int = 1_000):
+    iw.create_dir(file)
+    with gzip.open(file, "wt", encoding=cf.ENCODING) as f:
+        f.write(f"-- MySQL dump of the synthetic table `{table}`\n\n")
+        buff = []
+        for row in rows:
+            buff.append("(" + ",".join(sql_value(v) for v in row) + ")")
+            if len(buff) >= rows_per_insert:
+                f.write(f"INSERT INTO `{table}` VALUES {','.join(buff)};\n")
+                buff = []
+        if buff:
+            f.write(f"INSERT INTO `{table}` VALUES {','.join(buff)};\n")
+
+
+def page_row(page_id, namespace, title, ver, is_redirect=False, model="wikitext"):
+    # page_id, page_namespace, page_title, page_is_redirect, page_is_new,
+    # page_random, page_touched, page_links_updated, page_latest, page_len,
+    # page_content_model, page_lang
+    touched = f"{ver}000000"
+    page_len = 10 if is_redirect else 100
+    is_redirect = int(is_redirect)
+    return (
+        page_id, namespace, title, is_redirect, 0, 0.5, touched, touched, page_id,
+        page_len, model, None,
+    )  # fmt: skip
+
+
+def nt_literal(value: str, lang: Optional[str] = None, datatype=None) -> str:
+    value = value.replace("\\", "\\\\").replace('"', '\\"')
+    if lang:
+        return f'"{value}"@{lang}'
+    if datatype:
+        return f'"{value}"^^<{XSD}{datatype}>'
+    return f'"{value}"'
+
+
+class MiniKGGenerator(object):
+    def __init__(
+        self,
+        n_entities: int = 10_000,
+        n_properties: int = 50,
+        n_classes: int = 0,
+        degree_distribution: str = "zipf",
+        mean_degree: float = 8,
+        max_degree: int = 1_000,
+        degree_exponent: float = 2.0,
+        popularity_exponent: float = 1.0,
+        n_words: int = 0,
+        redirect_ratio: float = 0.05,
+        n_langs: int = 3,
+        seed: int = 42,
+    ):
+        """
+        n_entities: Wikidata items (and Wikipedia pages, DBpedia resources)
+        degree_distribution: out-degree of the entities, "zipf" (power law with
+        degree_exponent), "poisson" or "fixed" (mean_degree).
+        Link targets are sampled by a Zipf popularity (popularity_exponent).
+        n_words: label vocabulary size (default: n_entities // 2), a small
+        vocabulary gives ambiguous labels and disambiguation pages.
+        """
+        self.n = n_entities
+        self.n_properties = n_properties
+        self.n_classes = n_classes or max(5, n_entities // 200)
+        self.rng = np.random.default_rng(seed)
+        self.redirect_ratio = redirect_ratio
+        self.langs = ["en"] + DP_LANGS[: max(0, n_langs - 1)]
+
+        self.labels = self._get_labels(n_words or max(10, n_entities // 2))
+        self.titles = self._get_titles()
+        self.properties = [f"P{2000 + i}" for i in range(n_properties)]
+        self.property_labels = [self._get_word(2) for _ in range(n_properties)]
+
+        # Class hierarchy: a tree, class i is a subclass of (i - 1) // 2
+        self.classes = self.rng.integers(0, self.n_classes, size=self.n, endpoint=False)
+        self.classes[: self.n_classes] = np.maximum(
+            (np.arange(self.n_classes) - 1) // 2, 0
+        )
+
+        # Entity graph (CSR)
+        degrees = self._get_degrees(
+            degree_distribution, mean_degree, max_degree, degree_exponent
+        )
+        self.offsets = np.concatenate([[0], np.cumsum(degrees)])
+        popularity = self._get_zipf_weights(self.n, popularity_exponent)
+        self.targets = self.rng.choice(
+            self.n,
+            size=int(self.offsets[-1]),
+            p=popularity[self.rng.permutation(self.n)],
+        )
+        self.edge_props = self.rng.choice(
+            n_properties,
+            size=int(self.offsets[-1]),
+            p=self._get_zipf_weights(n_properties, 1.0),
+        )
+
+        self.redirects = self._get_redirects()
+        self._resources = None
+
+    def _get_word(self, n_syllables: int) -> str:
+        ids = self.rng.integers(0, len(SYLLABLES), size=n_syllables)
+        return "".join(SYLLABLES[i] for i in ids).capitalize()
+
+    def _get_labels(self, n_words: int) -> List[str]:
+        words = [self._get_word(int(self.rng.integers(2, 4))) for _ in range(n_words)]
+        ids = self.rng.choice(
+            n_words, size=(self.n, 2), p=self._get_zipf_weights(n_words, 0.8)
+        )
+        return [f"{words[i]} {words[j]}" for i, j in ids]
+
+    def _get_titles(self) -> List[str]:
+        # Unique Wikipedia titles, ambiguous labels are qualified as in Wikipedia
+        titles = []
+        seen = set()
+        for i, label in enumerate(self.labels):
+            title = label
+            if title in seen:
+                title = f"{label} ({i})"
+            seen.add(title)
+            titles.append(title)
+        return titles
+
+    @staticmethod
+    def _get_zipf_weights(n: int, exponent: float) -> np.ndarray:
+        weights = 1.0 / np.arange(1, n + 1) ** exponent
+        return weights / weights.sum()
+
+    def _get_degrees(self, distribution, mean_degree, max_degree, exponent):
+        if distribution == "zipf":
+            degrees = self.rng.zipf(exponent, size=self.n)
+        elif distribution == "poisson":
+            degrees = self.rng.poisson(mean_degree, size=self.n)
+        elif distribution == "fixed":
+            degrees = np.full(self.n, int(mean_degree))
+        else:
+            raise ValueError(f"Unknown degree distribution: {distribution}")
+        return np.minimum(degrees, max_degree)
+
+    def _get_redirects(self) -> Dict[str, int]:
+        # Redirect title -> target entity
+        n_redirects = int(self.n * self.redirect_ratio)
+        targets = self.rng.integers(0, self.n, size=n_redirects)
+        redirects = dict()
+        titles = set(self.titles)
+        for j, target in enumerate(targets):
+            title = f"{self._get_word(2)} {self.labels[target].split()[-1]}"
+            if title in titles or title in redirects:
+                continue
+            redirects[title] = int(target)
+        return redirects
+
+    def qid(self, i: int) -> str:
+        return f"Q{i + 1}"
+
+    def class_of(self, i: int) -> int:
+        return int(self.classes[i])
+
+    def neighbors(self, i: int):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return zip(
+            self.edge_props[start:end].tolist(), self.targets[start:end].tolist()
+        )
+
+    def entity_langs(self, i: int) -> List[str]:
+        # English and a random subset of the other languages
+        return [lang for j, lang in enumerate(self.langs) if j == 0 or (i + j) % 3 == 0]
+
+    def get_time(self, i: int) -> str:
+        return f"{1800 + i % 220:04d}-{1 + i % 12:02d}-{1 + i % 28:02d}"
+
+    def get_quantity(self, i: int) -> int:
+        return (i * 7919) % 1_000_000
+
+    ############################################################################
+    # Wikidata
+    ############################################################################
+    def get_wikidata_json(self, i: int) -> dict:
+        qid = self.qid(i)
+        langs = self.entity_langs(i)
+        claims = defaultdict(list)
+
+        def add_claim(prop, datatype, value):
+            claims[prop].append(
+                {
+                    "mainsnak": {
+                        "snaktype": "value",
+                        "property": prop,
+                        "datavalue": {"value": value, "type": datatype},
+                    },
+                    "type": "statement",
+                    "rank": "normal",
+                    "references": [],
+                }
+            )
+
+        def entity_value(j):
+            return {"entity-type": "item", "numeric-id": j + 1, "id": self.qid(j)}
+
+        if i < self.n_classes:
+            if i:
+                add_claim("P279", "wikibase-entityid", entity_value(self.class_of(i)))
+        else:
+            add_claim("P31", "wikibase-entityid", entity_value(self.class_of(i)))
+        for prop, target in self.neighbors(i):
+            add_claim(self.properties[prop], "wikibase-entityid", entity_value(target))
+        if i % 2 == 0:
+            add_claim(
+                PROP_TIME,
+                "time",
+                {
+                    "time": f"+{self.get_time(i)}T00:00:00Z",
+                    "timezone": 0,
+                    "precision": 11,
+                    "calendarmodel": f"{cf.WD}Q1985727",
+                },
+            )
+        if i % 3 == 0:
+            add_claim(
+                PROP_QUANTITY,
+                "quantity",
+                {"amount": f"+{self.get_quantity(i)}", "unit": "1"},
+            )
+        if i % 5 == 0:
+            add_claim(
+                PROP_STRING,
+                "monolingualtext",
+                {"text": self.labels[i].split()[0], "language": "en"},
+            )
+
+        return {
+            "type": "item",
+            "id": qid,
+            "labels": {
+                lang: {"language": lang, "value": self.labels[i]} for lang in langs
+            },
+            "descriptions": {
+                "en": {
+                    "language": "en",
+                    "value": f"{self.labels[self.class_of(i)].lower()} {i}",
+                }
+            },
+            "aliases": {
+                "en": [
+                    {"language": "en", "value": title}
+                    for title in [self.titles[i]]
+                    if title != self.labels[i]
+                ]
+            },
+            "claims": claims,
+            "sitelinks": {
+                f"{lang}wiki": {"site": f"{lang}wiki", "title": self.titles[i]}
+                for lang in langs
+            },
+        }
+
+    def get_wikidata_property_json(self, prop: str, label: str, datatype: str):
+        return {
+            "type": "property",
+            "datatype": datatype,
+            "id": prop,
+            "labels": {"en": {"language": "en", "value": label}},
+            "descriptions": {},
+            "aliases": {},
+            "claims": {},
+        }
+
+    def iter_wikidata_properties(self):
+        yield "P31", "instance of", "wikibase-item"
+        yield "P279", "subclass of", "wikibase-item"
+        yield PROP_TIME, "point in time", "time"
+        yield PROP_QUANTITY, "population", "quantity"
+        yield PROP_STRING, "short name", "monolingualtext"
+        for prop, label in zip(self.properties, self.property_labels):
+            yield prop, label.lower(), "wikibase-item"
+
+    def write_wikidata_json(self, file: str):
+        iw.create_dir(file)
+        with bz2.open(file, "wt", compresslevel=BZ2_LEVEL, encoding=cf.ENCODING) as f:
+            f.write("[\n")
+            for prop, label, datatype in self.iter_wikidata_properties():
+                obj = self.get_wikidata_property_json(prop, label, datatype)
+                f.write(ujson.dumps(obj, ensure_ascii=False) + ",\n")
+            for i in range(self.n):
+                end = ",\n" if i < self.n - 1 else "\n"
+                f.write(ujson.dumps(self.get_wikidata_json(i), ensure_ascii=False))
+                f.write(end)
+            f.write("]\n")
+
+    def write_wikidata_sql(self, file_page: str, file_redirect: str):
+        properties = list(self.iter_wikidata_properties())
+        n_pages = self.n + len(properties)
+        ver = cf.VER_WD_SQL
+
+        def iter_pages():
+            for i in range(self.n):
+                yield page_row(i + 1, 0, self.qid(i), ver, model="wikibase-item")
+            for j, (prop, _, _) in enumerate(properties):
+                page_id = self.n + j + 1
+                yield page_row(page_id, 120, prop, ver, model="wikibase-property")
+            for j in range(len(self.redirects)):
+                page_id = n_pages + j + 1
+                yield page_row(
+                    page_id, 0, self.qid(self.n + j), ver, True, "wikibase-item"
+                )
+
+        def iter_redirects():
+            for j, target in enumerate(self.redirects.values()):
+                yield n_pages + j + 1, 0, self.qid(target), "", ""
+
+        write_sql_dump(file_page, "page", iter_pages())
+        write_sql_dump(file_redirect, "redirect", iter_redirects())
+
+    ############################################################################
+    # Wikipedia
+    ############################################################################
+    def get_wikitext(self, i: int) -> str:
+        class_title = self.titles[self.class_of(i)]
+        links = defaultdict(list)
+        for prop, target in self.neighbors(i):
+            links[self.property_labels[prop]].append(self.titles[target])
+        lines = ["{{Infobox " + class_title.lower(), f"| name = {self.labels[i]}"]
+        lines.append(f"| type = [[{class_title}]]")
+        for prop_label, titles in list(links.items())[:5]:
+            lines.append(f"| {prop_label.lower()} = [[{titles[0]}]]")
+        if i % 2 == 0:
+            lines.append(f"| date = {self.get_time(i)}")
+        lines.append("}}")
+        lines.append(
+            f"'''{self.labels[i]}''' is a [[{class_title}|{class_title.lower()}]]."
+        )
+        for prop_label, titles in links.items():
+            lines.append(f"\n=={prop_label}==")
+            lines.extend(f"* [[{title}]]" for title in titles)
+        lines.append("\n==External links==")
+        lines.append("{{Subject bar|d=" + self.qid(i) + "}}")
+        return "\n".join(lines)
+
+    def write_wikipedia_xml(self, file: str, lang: str = "en"):
+        iw.create_dir(file)
+
+        def page_xml(page_id, title, text, redirect=None):
+            xml = ["  <page>", f"    <title>{escape(title)}</title>", "    <ns>0</ns>"]
+            xml.append(f"    <id>{page_id}</id>")
+            if redirect:
+                xml.append(f"    <redirect title={quoteattr(redirect)} />")
+            xml.append("    <revision>")
+            xml.append(f"      <id>{page_id}</id>")
+            xml.append("      <model>wikitext</model>")
+            xml.append("      <format>text/x-wiki</format>")
+            xml.append(
+                f'      <text bytes="{len(text)}" xml:space="preserve">'
+                f"{escape(text)}</text>"
+            )
+            xml.append("    </revision>")
+            xml.append("  </page>")
+            return "\n".join(xml) + "\n"
+
+        with bz2.open(file, "wt", compresslevel=BZ2_LEVEL, encoding=cf.ENCODING) as f:
+            f.write(
+                '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" '
+                f'version="0.10" xml:lang="{lang}">\n'
+            )
+            f.write(
+                "  <siteinfo>\n    <sitename>Wikipedia</sitename>\n"
+                "    <dbname>enwiki</dbname>\n  </siteinfo>\n"
+            )
+            for i in range(self.n):
+                f.write(page_xml(i + 1, self.titles[i], self.get_wikitext(i)))
+            for j, (title, target) in enumerate(self.redirects.items()):
+                target = self.titles[target]
+                f.write(
+                    page_xml(self.n + j + 1, title, f"#REDIRECT [[{target}]]", target)
+                )
+            f.write("</mediawiki>\n")
+
+    def write_wikipedia_sql(self, file_page: str, file_redirect: str, file_props: str):
+        ver = cf.VER_WP
+
+        def wp_title(title):
+            return title.replace(" ", "_")
+
+        def iter_pages():
+            for i in range(self.n):
+                yield page_row(i + 1, 0, wp_title(self.titles[i]), ver)
+            for j, title in enumerate(self.redirects):
+                yield page_row(self.n + j + 1, 0, wp_title(title), ver, True)
+            # Other namespaces are ignored by the builders
+            n_pages = self.n + len(self.redirects)
+            for j in range(self.n_classes):
+                yield page_row(n_pages + j + 1, 14, wp_title(self.titles[j]), ver)
+
+        def iter_redirects():
+            for j, target in enumerate(self.redirects.values()):
+                yield self.n + j + 1, 0, wp_title(self.titles[target]), "", ""
+
+        def iter_props():
+            for i in range(self.n):
+                yield i + 1, "wikibase_item", self.qid(i), None
+                if i % 4 == 0:
+                    image = f"{wp_title(self.labels[i])}.jpg"
+                    yield i + 1, "page_image_free", image, None
+
+        write_sql_dump(file_page, "page", iter_pages())
+        write_sql_dump(file_redirect, "redirect", iter_redirects())
+        write_sql_dump(file_props, "page_props", iter_props())
+
+    ############################################################################
+    # DBpedia
+    ############################################################################
+    @staticmethod
+    def get_resource_name(title: str) -> str:
+        return urllib.parse.quote(title.replace(" ", "_"), safe="()_,")
+
+    def dbr(self, title: str) -> str:
+        return f"<{cf.DBR}{self.get_resource_name(title)}>"
+
+    def dbr_entity(self, i: int) -> str:
+        if self._resources is None:
+            self._resources = [self.dbr(title) for title in self.titles]
+        return self._resources[i]
+
+    def dbo_class(self, i: int) -> str:
+        return f"<{cf.DBO}{re.sub(r'[ ()]', '', self.titles[i])}>"
+
+    def dbo_prop(self, prop: int) -> str:
+        label = self.property_labels[prop]
+        return f"<{cf.DBO}{label[0].lower()}{label[1:]}>"
+
+    def super_classes(self, c: int) -> List[int]:
+        responds = []
+        while c > 0:
+            c = (c - 1) // 2
+            responds.append(c)
+        return responds
+
+    def iter_dbpedia_triples(self, dump_name: str):
+        if dump_name == "DIR_DUMP_DP_REDIRECT":
+            for title, target in self.redirects.items():
+                yield self.dbr(title), f"<{cf.DBO}wikiPageRedirects>", self.dbr_entity(
+                    target
+                )
+        elif dump_name == "DIR_DUMP_DP_LABELS":
+            for i in range(self.n):
+                yield self.dbr_entity(i), f"<{RDFS_LABEL}>", nt_literal(
+                    self.titles[i], lang="en"
+                )
+        elif dump_name == "DIR_DUMP_DP_DESC":
+            for i in range(0, self.n, 2):
+                desc = f"{self.labels[i]} is a {self.labels[self.class_of(i)].lower()}."
+                yield self.dbr_entity(i), f"<{RDFS_COMMENT}>", nt_literal(
+                    desc, lang="en"
+                )
+        elif dump_name == "DIR_DUMP_DP_TYPES_SPECIFIC":
+            for i in range(self.n_classes, self.n):
+                yield self.dbr_entity(i), f"<{RDF_TYPE}>", self.dbo_class(
+                    self.class_of(i)
+                )
+        elif dump_name == "DIR_DUMP_DP_TYPES_TRANSITIVE":
+            for i in range(self.n_classes, self.n):
+                c = self.class_of(i)
+                for c_i in [c] + self.super_classes(c):
+                    yield self.dbr_entity(i), f"<{RDF_TYPE}>", self.dbo_class(c_i)
+                yield self.dbr_entity(i), f"<{RDF_TYPE}>", f"<{OWL_THING}>"
+        elif dump_name == "DIR_DUMP_DP_INFOBOX":
+            for i in range(self.n):
+                for prop, target in list(self.neighbors(i))[:5]:
+                    label = self.property_labels[prop].lower()
+                    yield self.dbr_entity(i), f"<{cf.DBP}{label}>", self.dbr_entity(
+                        target
+                    )
+                if i % 2 == 0:
+                    yield self.dbr_entity(i), f"<{cf.DBP}date>", nt_literal(
+                        self.get_time(i), datatype="date"
+                    )
+        elif dump_name == "DIR_DUMP_DP_OBJECTS":
+            for i in range(self.n):
+                for prop, target in self.neighbors(i):
+                    yield self.dbr_entity(i), self.dbo_prop(prop), self.dbr_entity(
+                        target
+                    )
+        elif dump_name == "DIR_DUMP_DP_LITERALS":
+            for i in range(self.n):
+                head = self.dbr_entity(i)
+                if i % 2 == 0:
+                    yield head, f"<{cf.DBO}date>", nt_literal(
+                        self.get_time(i), datatype="date"
+                    )
+                if i % 3 == 0:
+                    yield head, f"<{cf.DBO}populationTotal>", nt_literal(
+                        str(self.get_quantity(i)), datatype="nonNegativeInteger"
+                    )
+                    yield head, f"<{cf.DBO}areaTotal>", nt_literal(
+                        f"{self.get_quantity(i) / 100:.2f}", datatype="double"
+                    )
+                # Other names are read by DBDBpedia._parse_aliases
+                if i % 5 == 0:
+                    yield head, f"<{cf.DBO}alias>", nt_literal(
+                        self.labels[i].split()[0], lang="en"
+                    )
+                if i % 7 == 0:
+                    yield head, f"<{cf.DBO}otherName>", nt_literal(
+                        self.labels[i].split()[-1], lang="en"
+                    )
+        elif dump_name == "DIR_DUMP_DP_DISAMBIGUATION":
+            ambiguous = defaultdict(list)
+            for i, label in enumerate(self.labels):
+                ambiguous[label].append(i)
+            for label, entities in ambiguous.items():
+                if len(entities) < 2:
+                    continue
+                for i in entities:
+                    yield self.dbr(
+                        f"{label} (disambiguation)"
+                    ), f"<{cf.DBO}wikiPageDisambiguates>", self.dbr_entity(i)
+        elif dump_name == "DIR_DUMP_DP_WP":
+            for i in range(self.n):
+                dbr = self.dbr_entity(i)
+                wiki = f"<{cf.WIKI_EN}{self.dbr_entity(i)[len(cf.DBR) + 1 :]}"
+                yield dbr, f"<{cf.FOAF}isPrimaryTopicOf>", wiki
+                yield wiki, f"<{cf.FOAF}primaryTopic>", dbr
+        elif dump_name == "DIR_DUMP_DP_WD":
+            for c in range(self.n_classes):
+                wd_class = f"<{cf.WD}{self.qid(c)}>"
+                yield self.dbo_class(c), f"<{OWL_EQUIVALENT_CLASS}>", wd_class
+            for prop in range(self.n_properties):
+                wd_prop = f"<{cf.WD}{self.properties[prop]}>"
+                yield self.dbo_prop(prop), f"<{OWL_EQUIVALENT_PROPERTY}>", wd_prop
+        elif dump_name.startswith("DIR_DUMP_DP_LABELS_"):
+            lang = dump_name[len("DIR_DUMP_DP_LABELS_") :].lower()
+            for i in range(self.n):
+                if lang in self.entity_langs(i):
+                    yield self.dbr_entity(i), f"<{RDFS_LABEL}>", nt_literal(
+                        self.labels[i], lang=lang
+                    )
+
+    def write_dbpedia_ttl(self, dump_name: str, file: str):
+        iw.create_dir(file)
+        if file.endswith(".bz2"):
+            writer = bz2.open(file, "wt", compresslevel=BZ2_LEVEL, encoding=cf.ENCODING)
+        else:
+            writer = open(file, "w", encoding=cf.ENCODING)
+        with writer as f:
+            for s, p, o in self.iter_dbpedia_triples(dump_name):
+                f.write(f"{s} {p} {o} .\n")
+
+    ############################################################################
+    # All dumps
+    ############################################################################
+    def get_write_tasks(self, dump_files: Dict[str, str]):
+        tasks = [
+            ("write_wikidata_json", (dump_files["DIR_DUMP_WD_JSON"],)),
+            (
+                "write_wikidata_sql",
+                (dump_files["DIR_DUMP_WD_PAGE"], dump_files["DIR_DUMP_WD_REDIRECT"]),
+            ),
+            ("write_wikipedia_xml", (dump_files["DIR_DUMP_WP_EN"],)),
+            (
+                "write_wikipedia_sql",
+                (
+                    dump_files["DIR_DUMP_WP_PAGE"],
+                    dump_files["DIR_DUMP_WP_REDIRECT"],
+                    dump_files["DIR_DUMP_WP_PROPS"],
+                ),
+            ),
+        ]
+        for dump_name, file in dump_files.items():
+            if dump_name.startswith("DIR_DUMP_DP_"):
+                tasks.append(("write_dbpedia_ttl", (dump_name, file)))
+        return tasks
+
+    def write_dumps(self, dump_dir: str, n_cpu: int = os.cpu_count()):
+        """
+        Write all dump files, a file per process (bz2 compression is the
+        bottleneck). Return the dump files.
+        """
+        global _generator
+        dump_files = get_dump_files(dump_dir)
+        start = perf_counter()
+
+        # Truthy dump is not used by the builders
+        iw.create_dir(dump_files["DIR_DUMP_WD_TRUTHY"])
+        with bz2.open(dump_files["DIR_DUMP_WD_TRUTHY"], "wt") as f:
+            f.write("")
+
+        tasks = self.get_write_tasks(dump_files)
+        if n_cpu > 1:
+            # Forked workers share the generator, it is not pickled
+            _generator = self
+            try:
+                with closing(get_context("fork").Pool(processes=n_cpu)) as pool:
+                    pool.map(write_task, tasks, chunksize=1)
+            finally:
+                _generator = None
+        else:
+            for method, args in tasks:
+                getattr(self, method)(*args)
+
+        iw.print_status(
+            f"Mini KG: {self.n:,} entities, {int(self.offsets[-1]):,} edges, "
+            f"{len(self.redirects):,} redirects in {perf_counter() - start:.2f}s - "
+            f"{dump_dir}"
+        )
+        return dump_files
+
+
+_generator: Optional[MiniKGGenerator] = None
+
+
+def write_task(task):
+    method, args = task
+    getattr(_generator, method)(*args)
+
+
+# Builder steps, in the order of run_test.step_2_build_resources
+BUILD_STEPS = [
+    ("dbpedia", "build_redirects"),
+    ("wikidata", "build_redirects"),
+    ("wikipedia", "build_redirects_and_wikidata_mapping"),
+    ("dbpedia", "build_mapping"),
+    ("wikidata", "build_mapping"),
+    ("wikipedia", "build_information"),
+    ("wikipedia", "build_link_graph"),
+    ("dbpedia", "build_information"),
+    ("wikidata", "build_information"),
+    ("labels", "build_vocab"),
+    ("labels", "build_ranking_list"),
+]
+
+
+def open_db_writer(db_name: str):
+    if db_name == "dbpedia":
+        from kgdb.resources.db.db_dbpedia import DBDBpedia
+
+        return DBDBpedia(readonly=False, map_size=cf.SIZE_1GB)
+    if db_name == "wikidata":
+        from kgdb.resources.db.db_wikidata import DBWikidata
+
+        return DBWikidata(readonly=False, map_size=cf.SIZE_1GB)
+    if db_name == "wikipedia":
+        from kgdb.resources.db.db_wikipedia import DBWikipedia
+
+        return DBWikipedia(readonly=False, map_size=cf.SIZE_1GB)
+    if db_name == "labels":
+        from kgdb.resources.db.db_entity_labels import DBELabel
+
+        return DBELabel(read_only=False)
+    raise ValueError(f"Unknown database: {db_name}")
+
+
+def build_step(step: str) -> dict:
+    """
+    Run one builder step (e.g., "dbpedia.build_redirects") on the dumps and
+    databases of the config directories
+    """
+    db_name, method = step.split(".")
+    start = perf_counter()
+    error = None
+    try:
+        db = open_db_writer(db_name)
+        getattr(db, method)()
+        db.close()
+    except Exception as message:
+        error = f"{type(message).__name__}: {message}"
+    return {"step": step, "time": perf_counter() - start, "error": error}
+
+
+def get_env(kg_dir: str) -> Dict[str, str]:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env["KGDB_DIR_ROOT"] = root
+    env["KGDB_DIR_DUMP"] = f"{kg_dir}/dumps"
+    env["KGDB_DIR_DATABASES"] = f"{kg_dir}/databases"
+    return env
+
+
+def build_mini_kg(kg_dir: str, steps: Optional[List[str]] = None) -> List[dict]:
+    """
+    Run the builders on the mini KG of kg_dir. Each step runs in a new interpreter:
+    the config directories (and the default arguments bound to them) point to
+    kg_dir, and the LMDB environments opened by a step are released.
+    A failed step does not stop the next ones.
+    """
+    steps = steps or [f"{db_name}.{method}" for db_name, method in BUILD_STEPS]
+    step_file = f"{kg_dir}/build_step.json"
+    responds = []
+    for step in steps:
+        command = [sys.executable, "-m", "kgdb.benchmarks.mini_kg", "--dir", kg_dir]
+        command += ["--build_step", step]
+        process = subprocess.run(command, env=get_env(kg_dir))
+        if process.returncode == 0 and os.path.exists(step_file):
+            respond = iw.read_json_file(step_file)
+            iw.delete_file(step_file)
+        else:
+            respond = {"step": step, "time": None, "error": "Process failed"}
+        responds.append(respond)
+        iw.print_status(
+            f"{step}: {respond['time'] or 0:.2f}s"
+            + (f" - {respond['error']}" if respond["error"] else "")
+        )
+    iw.save_json_file(f"{kg_dir}/build_stats.json", responds)
+    return responds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic mini knowledge graph")
+    parser.add_argument("--dir", required=True, help="Output directory")
+    parser.add_argument("--n_entities", type=int, default=10_000)
+    parser.add_argument("--n_properties", type=int, default=50)
+    parser.add_argument(
+        "--degree", default="zipf", choices=["zipf", "poisson", "fixed"]
+    )
+    parser.add_argument("--mean_degree", type=float, default=8)
+    parser.add_argument("--degree_exponent", type=float, default=2.0)
+    parser.add_argument("--n_langs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--build", action="store_true", help="Run the builders")
+    parser.add_argument("--steps", nargs="*", default=None, help="Builder steps")
+    parser.add_argument("--build_step", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build_step:
+        if cf.DIR_DUMP != f"{args.dir}/dumps":
+            raise ValueError(f"Set KGDB_DIR_DUMP={args.dir}/dumps")
+        iw.save_json_file(f"{args.dir}/build_step.json", build_step(args.build_step))
+    else:
+        generator = MiniKGGenerator(
+            n_entities=args.n_entities,
+            n_properties=args.n_properties,
+            degree_distribution=args.degree,
+            mean_degree=args.mean_degree,
+            degree_exponent=args.degree_exponent,
+            n_langs=args.n_langs,
+            seed=args.seed,
+        )
+        generator.write_dumps(f"{args.dir}/dumps")
+        if args.build:
+            build_mini_kg(args.dir, args.steps)
@@ -0,0 +1,322 @@
+"""
+Startup benchmark: package import time, database open latency and time to the
+first query (cold and warm page cache) on small synthetic databases.
+
+python -m kgdb.benchmarks.startup --n_items 10000 --output startup.json
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from freaddb.db_lmdb import FReadDB, ToBytes
+from pyroaring import BitMap
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+
+IMPORT_MODULES = ["kgdb", "kgdb.config.config", "kgdb.modules.entity_search"]
+DB_NAMES = ["DBWikidata", "DBDBpedia", "DBWikipedia", "DBELabel", "DBDeletes"]
+
+# Column read by the first query of each database
+LOOKUP_COLUMNS = {
+    "DBWikidata": "ID_LID",
+    "DBDBpedia": "ID_LID",
+    "DBWikipedia": "ID_LID",
+    "DBELabel": "LID_LABEL",
+    "DBDeletes": "DELETE",
+}
+
+# FReadDB steps timed while a database is opened. DBCore.__init__ counts the ID_LID
+# items (get_number_items_from) on every open.
+OPEN_STEPS = [
+    "save_metadata_info",
+    "load_metadata_info",
+    "init_env_and_sub_databases",
+    "get_number_items_from",
+]
+
+IMPORT_TIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def parse_import_time(stderr: str) -> List[dict]:
+    """
+    Parse the output of python -X importtime, times are in seconds
+    """
+    responds = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        responds.append(
+            {
+                "module": module,
+                "self": int(self_us) / 1e6,
+                "cumulative": int(cumulative_us) / 1e6,
+                "depth": (len(indent) - 1) // 2,
+            }
+        )
+    return responds
+
+
+def measure_import_time(
+    module: str = "kgdb", python: str = sys.executable, top_k: int = 20
+) -> dict:
+    # A fresh interpreter per module, nothing is cached in sys.modules
+    start = perf_counter()
+    process = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    run_time = perf_counter() - start
+    imports = parse_import_time(process.stderr)
+    target = [obj for obj in imports if obj["module"] == module]
+    kgdb_imports = [obj for obj in imports if obj["module"].startswith("kgdb")]
+    return {
+        "module": module,
+        "error": process.returncode != 0,
+        "run_time": run_time,
+        "cumulative": target[-1]["cumulative"] if target else None,
+        "n_modules": len(imports),
+        "kgdb_self": sum(obj["self"] for obj in kgdb_imports),
+        "top_self": sorted(imports, key=lambda x: x["self"], reverse=True)[:top_k],
+        "kgdb_modules": sorted(
+            kgdb_imports, key=lambda x: x["cumulative"], reverse=True
+        ),
+    }
+
+
+@contextmanager
+def timed_methods(cls, method_names: List[str]):
+    """
+    Sum the time spent in the methods of cls while the context is open
+    """
+    timings = defaultdict(float)
+    originals = {}
+    for name in method_names:
+        func = cls.__dict__.get(name)
+        if func is None:
+            continue
+        originals[name] = func
+
+        def wrapper(*args, _func=func, _name=name, **kwargs):
+            start = perf_counter()
+            try:
+                return _func(*args, **kwargs)
+            finally:
+                timings[_name] += perf_counter() - start
+
+        setattr(cls, name, wrapper)
+    try:
+        yield timings
+    finally:
+        for name, func in originals.items():
+            setattr(cls, name, func)
+
+
+@contextmanager
+def databases_dir(db_dir: str):
+    # DBDeletes derives its file from cf.DIR_DATABASES
+    dir_databases = cf.DIR_DATABASES
+    cf.DIR_DATABASES = db_dir
+    try:
+        yield
+    finally:
+        cf.DIR_DATABASES = dir_databases
+
+
+def open_db(db_name: str, db_dir: str, readonly: bool = True):
+    # Imported here: the import cost is measured separately
+    if db_name == "DBWikidata":
+        from kgdb.resources.db.db_wikidata import DBWikidata
+
+        return DBWikidata(db_file=f"{db_dir}/wikidata", readonly=readonly)
+    if db_name == "DBDBpedia":
+        from kgdb.resources.db.db_dbpedia import DBDBpedia
+
+        return DBDBpedia(db_file=f"{db_dir}/dbpedia", readonly=readonly)
+    if db_name == "DBWikipedia":
+        from kgdb.resources.db.db_wikipedia import DBWikipedia
+
+        return DBWikipedia(db_file=f"{db_dir}/wikipedia", readonly=readonly)
+    if db_name == "DBELabel":
+        from kgdb.resources.db.db_entity_labels import DBELabel
+
+        return DBELabel(
+            db_file=f"{db_dir}/labels", read_only=readonly, create_new=not readonly
+        )
+    if db_name == "DBDeletes":
+        from kgdb.resources.db.db_deletes import DBDeletes
+
+        with databases_dir(db_dir):
+            return DBDeletes(read_only=readonly, create_new=not readonly)
+    raise ValueError(f"Unknown database: {db_name}")
+
+
+def get_synthetic_item(db_spec, i: int, degree: int = 8):
+    if db_spec.combinekey:
+        key = (i, i + 1)
+    elif db_spec.integerkey:
+        key = i
+    else:
+        key = f"q{i}"
+
+    if db_spec.bytes_value == ToBytes.INT_BITMAP:
+        value = BitMap(range(i, i + degree))
+    elif db_spec.bytes_value == ToBytes.BYTES:
+        value = f"v{i}".encode(cf.ENCODING)
+    elif db_spec.name.endswith("LID"):
+        value = i
+    else:
+        value = list(range(i, i + degree))
+    return key, value
+
+
+def get_lookup_key(db_name: str, i: int):
+    if LOOKUP_COLUMNS[db_name] == "LID_LABEL":
+        return i
+    return f"q{i}"
+
+
+def build_synthetic_db(db_name: str, db_dir: str, n_items: int, degree: int = 8):
+    """
+    Fill every column of the database schema with n_items synthetic items
+    """
+    db = open_db(db_name, db_dir, readonly=False)
+    for db_spec in db.db_schema.values():
+        for i in range(n_items):
+            key, value = get_synthetic_item(db_spec, i, degree)
+            db.add_buff(db_spec.name, key, value)
+        db.save_buff()
+    db.close()
+
+
+def evict_page_cache(db_dir: str) -> bool:
+    """
+    Drop the clean pages of the database files from the OS page cache.
+    Return False if it is not supported (e.g., macOS).
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for root, _, files in os.walk(db_dir):
+        for file in files:
+            fd = os.open(os.path.join(root, file), os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+    return True
+
+
+def measure_open(db_name: str, db_dir: str, lookup_key) -> dict:
+    with timed_methods(FReadDB, OPEN_STEPS) as timings:
+        start = perf_counter()
+        db = open_db(db_name, db_dir)
+        time_open = perf_counter() - start
+    breakdown = dict(timings)
+    breakdown["other"] = time_open - sum(breakdown.values())
+
+    start = perf_counter()
+    db.get_value(LOOKUP_COLUMNS[db_name], lookup_key)
+    time_first_query = perf_counter() - start
+    db.close()
+    return {
+        "open": time_open,
+        "first_query": time_first_query,
+        "breakdown": breakdown,
+    }
+
+
+def get_dir_size(db_dir: str) -> int:
+    size = 0
+    for root, _, files in os.walk(db_dir):
+        size += sum(os.path.getsize(os.path.join(root, file)) for file in files)
+    return size
+
+
+def benchmark_db(db_name: str, db_dir: str, n_items: int, repeat: int = 5) -> dict:
+    lookup_key = get_lookup_key(db_name, n_items // 2)
+    is_cold = evict_page_cache(db_dir)
+    cold = measure_open(db_name, db_dir, lookup_key)
+    warm = [measure_open(db_name, db_dir, lookup_key) for _ in range(repeat)]
+    return {
+        "n_items": n_items,
+        "size": get_dir_size(db_dir),
+        "page_cache_evicted": is_cold,
+        "cold": cold,
+        "warm": {
+            "open": statistics.median(obj["open"] for obj in warm),
+            "first_query": statistics.median(obj["first_query"] for obj in warm),
+            "breakdown": {
+                step: statistics.median(obj["breakdown"].get(step, 0) for obj in warm)
+                for step in cold["breakdown"]
+            },
+        },
+    }
+
+
+def run_startup_benchmark(
+    db_dir: Optional[str] = None,
+    n_items: int = 10_000,
+    repeat: int = 5,
+    import_modules: List[str] = IMPORT_MODULES,
+    db_names: List[str] = DB_NAMES,
+    output_file: Optional[str] = None,
+) -> Dict:
+    responds = {"import": [measure_import_time(m) for m in import_modules]}
+    for obj in responds["import"]:
+        iw.print_status(
+            f"Import {obj['module']}: {obj['cumulative']}s "
+            f"(kgdb modules: {obj['kgdb_self']:.4f}s)"
+        )
+
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=db_dir) as tmp_dir:
+        responds["databases"] = dict()
+        for db_name in db_names:
+            db_dir_i = f"{tmp_dir}/{db_name}"
+            try:
+                build_synthetic_db(db_name, db_dir_i, n_items)
+                result = benchmark_db(db_name, db_dir_i, n_items, repeat)
+            except Exception as message:
+                iw.print_status(f"{db_name}: {message}")
+                result = {"error": str(message)}
+            responds["databases"][db_name] = result
+            if "error" not in result:
+                iw.print_status(
+                    f"{db_name}: open {result['cold']['open']:.4f}s (cold) "
+                    f"{result['warm']['open']:.4f}s (warm) - first query "
+                    f"{result['cold']['first_query']:.6f}s (cold) "
+                    f"{result['warm']['first_query']:.6f}s (warm)"
+                )
+
+    if output_file:
+        iw.create_dir(output_file)
+        iw.save_json_file(output_file, responds)
+    return responds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="kgdb startup benchmark")
+    parser.add_argument("--db_dir", default=None, help="Parent of the temp databases")
+    parser.add_argument("--n_items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="JSON result file")
+    args = parser.parse_args()
+    run_startup_benchmark(
+        db_dir=args.db_dir,
+        n_items=args.n_items,
+        repeat=args.repeat,
+        output_file=args.output,
+    )
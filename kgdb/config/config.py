@@ -1,13 +1,13 @@
 import csv
+import os
 import re
+import threading
 from datetime import datetime
 from enum import Enum
 
 # Configuration
 from typing import List, Set
 
-import psutil
-
 ENCODING = "utf-8"
 
 ################################################################################
@@ -19,10 +19,11 @@ VER_WD_JSON = "20220606"
 VER_WP = "20220601"
 
 
-# Directories
-DIR_ROOT = "/Users/phucnguyen/git/kgdb"
-DIR_DUMP = "/Users/phucnguyen/git/dumps"
-DIR_DATABASES = "/Users/phucnguyen/git/databases"
+# Directories, can be overridden with environment variables (e.g., to run the
+# builders on the synthetic dumps of kgdb.benchmarks.mini_kg)
+DIR_ROOT = os.environ.get("KGDB_DIR_ROOT", "/Users/phucnguyen/git/kgdb")
+DIR_DUMP = os.environ.get("KGDB_DIR_DUMP", "/Users/phucnguyen/git/dumps")
+DIR_DATABASES = os.environ.get("KGDB_DIR_DATABASES", "/Users/phucnguyen/git/databases")
 DIR_CONFIG = f"{DIR_ROOT}/kgdb/config"
 
 # Log
@@ -71,6 +72,8 @@ DIR_WPDB = f"{DIR_DATABASES}/wikipedia"
 DIR_DB_LABELS = f"{DIR_DATABASES}/labels"
 DIR_WIKI_PAGERANK_STATS = f"{DIR_DATABASES}/wiki_graph_pagerank_stats.pkl"
 DIR_WIKI_GRAPH_PAGERANK = f"{DIR_DATABASES}/wiki_graph_pagerank.pkl"
+# Sorted runs spilled to disk by the builders
+DIR_TEMP = f"{DIR_DATABASES}/tmp"
 
 
 class ATTR_OPTS:
@@ -110,25 +113,25 @@ def read_tsv_file_first_col(file_name) -> List[str]:
     return first_col
 
 
-WIKIDATA_IDENTIFIERS: Set[str] = set(
-    read_tsv_file_first_col(f"{DIR_CONFIG}/WD_IDENTIFIERS.tsv")
-)
+# Settings read from files or from the system are loaded on first access
+# (module __getattr__), importing the config does not do any I/O
+WIKIDATA_IDENTIFIERS: Set[str]
 # WP_IGNORED_NS = read_tsv_file_first_col(f"{DIR_CONFIG}/WP_IGNORED_NS.tsv")
 # 105 languages as mGENRE De Cao et al.
 # LANGS_105 = read_tsv_file_first_col(f"{DIR_CONFIG}/LANGS_105.tsv")
 # 322 languages of Wikipedia
-LANGS_322: List[str] = read_tsv_file_first_col(f"{DIR_CONFIG}/LANGS_322.tsv")
+LANGS_322: List[str]
 # LANGS_SELECTED = read_tsv_file_first_col(f"{DIR_CONFIG}/LANGS_SELECTED.tsv")
-LANGS: List[str] = LANGS_322
+LANGS: List[str]
 
 WP_NAMESPACE_RE = re.compile(r"^{(.*?)}")
 WP_DISAMBIGUATE_REGEXP = re.compile(
     r"{{\s*(disambiguation|disambig|disamb|dab|geodis)\s*(\||})", re.IGNORECASE
 )
 
-HTML_HEADERS: List[str] = read_tsv_file_first_col(f"{DIR_CONFIG}/TAGS_HTML_HEADERS.tsv")
-SPACY_NER_TAGS: List[str] = read_tsv_file_first_col(f"{DIR_CONFIG}/NER_TAGS_SPACY.tsv")
-LANGS_SPACY: List[str] = read_tsv_file_first_col(f"{DIR_CONFIG}/LANGS_SPACY.tsv")
+HTML_HEADERS: List[str]
+SPACY_NER_TAGS: List[str]
+LANGS_SPACY: List[str]
 WP_IGNORED_NS = (
     "wikipedia:",
     "file:",
@@ -149,12 +152,54 @@ SIZE_1GB = 1_073_741_824
 LMDB_MAX_KEY = 511
 LMDB_MAP_SIZE = 10_737_418_240  # 10GB
 # Using Ram as buffer
-LMDB_BUFF_BYTES_SIZE = psutil.virtual_memory().total // 10
-if LMDB_BUFF_BYTES_SIZE > SIZE_1GB:
-    LMDB_BUFF_BYTES_SIZE = SIZE_1GB
+LMDB_BUFF_BYTES_SIZE: int
+
+
+def get_lmdb_buff_bytes_size() -> int:
+    import psutil
+
+    return min(psutil.virtual_memory().total // 10, SIZE_1GB)
+
+
+_LAZY_SETTINGS = {
+    "WIKIDATA_IDENTIFIERS": lambda: set(
+        read_tsv_file_first_col(f"{DIR_CONFIG}/WD_IDENTIFIERS.tsv")
+    ),
+    "LANGS_322": lambda: read_tsv_file_first_col(f"{DIR_CONFIG}/LANGS_322.tsv"),
+    "LANGS": lambda: __getattr__("LANGS_322"),
+    "HTML_HEADERS": lambda: read_tsv_file_first_col(
+        f"{DIR_CONFIG}/TAGS_HTML_HEADERS.tsv"
+    ),
+    "SPACY_NER_TAGS": lambda: read_tsv_file_first_col(
+        f"{DIR_CONFIG}/NER_TAGS_SPACY.tsv"
+    ),
+    "LANGS_SPACY": lambda: read_tsv_file_first_col(f"{DIR_CONFIG}/LANGS_SPACY.tsv"),
+    "LMDB_BUFF_BYTES_SIZE": get_lmdb_buff_bytes_size,
+}
+_lazy_lock = threading.RLock()
+
+
+def __getattr__(name: str):
+    load = _LAZY_SETTINGS.get(name)
+    if load is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = load()
+    return globals()[name]
 
 
 BUFF_LIMIT = SIZE_1GB
+# Estimated memory of the in-memory groups of ExternalGroupBy before they are
+# spilled to disk
+GROUP_BY_BUFF_LIMIT = SIZE_1GB
+# zstd dictionaries of the compressed columns (db.compress(zstd_columns=...)):
+# dictionary size, values sampled to train it, and compression level
+ZSTD_DICT_SIZE = 112_640
+ZSTD_DICT_SAMPLES = 100_000
+ZSTD_LEVEL = 3
+# Size of the key tables of the binary columns (db.compress(binary_columns=...))
+BINARY_MAX_KEYS = 65_536
 
 WD_ENTITY_NAME_PROPS: List[str] = [
     "P528",  # catalog code
@@ -205,9 +250,30 @@ WEIGHT_PR_DIV = WEIGHT_PR_MAX - WEIGHT_PR_MIN
 WEIGHT_PR_MEAN_RATIO = (WEIGHT_PR_MEAN - WEIGHT_PR_MIN) / WEIGHT_PR_DIV
 
 
+# Label search backend of entity search: "es" (Elastic Search) or "bm25" (embedded)
+LABEL_SEARCH_BACKEND = "es"
+# Threads of the LMDB lookups of the asyncio entity search
+ASYNC_LMDB_THREADS = 16
+# Entity search result cache: LRU size (0: no cache), TTL in seconds (0: no expiry),
+# and the optional LMDB file of the on-disk cache
+SEARCH_CACHE_SIZE = 100_000
+SEARCH_CACHE_TTL = 0
+SEARCH_CACHE_DB = None
+# Per-column access counters and timers of the databases (db.stats()), off by
+# default: disabled databases run the plain FReadDB read functions
+DB_STATS = os.environ.get("KGDB_DB_STATS", "0") == "1"
+
 # Elastic Search parameters
+ES_HOSTS = ["http://localhost:9200"]
+# Request timeout in seconds
+ES_TIMEOUT = 300
 ES_INDEX_NAME_EN = "mtab_en"
 ES_INDEX_NAME_ALL = "mtab_all"
+# Number of queries per _msearch request
+ES_MSEARCH_SIZE = 200
+# Indexing with parallel_bulk
+ES_BULK_THREADS = 4
+ES_BULK_CHUNK_SIZE = 10_000
 ES_MAPPING = {
     "settings": {
         "number_of_shards": 2,
@@ -217,6 +283,7 @@ ES_MAPPING = {
     "mappings": {"properties": {"label": {"type": "text"}}},
 }
 
+
 # Enum
 class EnumPr(Enum):
     SOFTMAX = 1
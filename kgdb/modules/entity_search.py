@@ -1,30 +1,117 @@
+from copy import deepcopy
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from time import time
 
-from kgdb.m_f import init
-from kgdb.resources.db.db_entity_labels import DBELabel
-from kgdb.resources.db.db_wikidata import DBWikidata
-from kgdb.resources.db.utils import is_wikidata_item
-from kgdb.resources.db_elasticsearch import ESearch
+from kgdb.config import config as cf
 from kgdb.utils import io_worker as iw
-from kgdb.utils import similarities
-from kgdb.utils import utils as ul
 from kgdb.utils.benchmark import profile
+from kgdb.utils.cache import QueryCache, get_files_version
+from kgdb.utils.lazy import Singletons
 
-wiki_items = DBWikidata()
-wiki_labels = DBELabel()
-search_e = ESearch()
+# Shared databases and search backends, created on first use. The database and
+# search modules (scipy, elasticsearch, ...) are imported on first use too, importing
+# this module stays fast.
+singletons = Singletons()
 
 
-def search(
-    query, attr=None, lang="en", mode="a", limit=20, expensive=False, fuzzy=False
-):
-    # One search query will create new instances search_e, search_f, and wiki_items
+def get_wiki_items():
+    from kgdb.resources.db.db_wikidata import DBWikidata
+
+    return singletons.get("wiki_items", DBWikidata)
+
+
+def get_wiki_labels():
+    from kgdb.resources.db.db_entity_labels import DBELabel
+
+    return singletons.get("wiki_labels", DBELabel)
+
+
+def get_search_e(backend=None):
+    backend = backend or cf.LABEL_SEARCH_BACKEND
+
+    def create():
+        if backend == "bm25":
+            from kgdb.resources.db.db_bm25 import BM25Search
+
+            return BM25Search()
+        from kgdb.resources.db_elasticsearch import ESearch
+
+        return ESearch()
+
+    return singletons.get(f"search_e_{backend}", create)
+
+
+def get_search_f(lang="en"):
+    from kgdb.resources.db.db_deletes import DBDeletes
+
+    lang = "en" if lang == "en" else "all"
+    return singletons.get(f"search_f_{lang}", lambda: DBDeletes(lang=lang))
+
+
+def get_db_version():
+    # Search results change with the database builds and the label search backend
+    db_version = get_files_version([cf.DIR_WIKIDB, cf.DIR_DB_LABELS])
+    return f"{cf.LABEL_SEARCH_BACKEND}|{db_version}"
+
+
+def get_search_cache():
+    if not cf.SEARCH_CACHE_SIZE:
+        return None
+    return singletons.get(
+        "search_cache",
+        lambda: QueryCache(
+            version=get_db_version(),
+            max_size=cf.SEARCH_CACHE_SIZE,
+            ttl=cf.SEARCH_CACHE_TTL,
+            db_file=cf.SEARCH_CACHE_DB,
+        ),
+    )
+
+
+def release(name=None):
+    # Close the shared databases (or one of them), they are reopened on next use
+    singletons.release(name)
+
+
+def get_cached(queries, lang="en", mode="a", limit=20, expensive=False, fuzzy=False):
+    # Return cached responds (None: miss), the cache keys, and the indices of misses
+    search_cache = get_search_cache()
+    if search_cache is None:
+        return [None] * len(queries), None, list(range(len(queries)))
+    cache_keys = [
+        (get_query_text(query), lang, mode, limit, fuzzy, expensive)
+        for query in queries
+    ]
+    responds = search_cache.get_many(cache_keys)
+    misses = [i for i, respond in enumerate(responds) if respond is None]
+    # Callers get copies, they can not modify the cached responds
+    responds = [deepcopy(respond) for respond in responds]
+    return responds, cache_keys, misses
+
+
+def set_cached(responds, cache_keys, misses, results):
+    search_cache = get_search_cache() if cache_keys is not None else None
+    for i, result in zip(misses, results):
+        responds[i] = result
+        if search_cache is not None:
+            search_cache.set(cache_keys[i], deepcopy(result))
+    return responds
+
+
+def get_query_text(query):
+    """
+    Normalized text of a query (lower case, NFKC, spaces), the key of the search
+    cache. Queries are searched and scored with this text only, so that all
+    queries of a key get the same responds.
+    """
+    from kgdb.resources.db.db_entity_labels import norm_text
 
-    search_f = None
+    return norm_text(query, punctuations=True)
 
-    # Check query is a wikidata item or not
-    is_wd_id = is_wikidata_item(query)
+
+def get_query_lang(query, lang="en"):
+    from kgdb.utils import utils as ul
 
     # Check is query multilingual
     # query_lang = m_f.lang_pre().predict(query)
@@ -32,89 +119,288 @@ def search(
     #     lang = "all"
     if not ul.isEnglish(query):
         lang = "all"
+    return lang
+
+
+def search_labels(
+    queries, lang="en", mode="a", limit=20, expensive=False, fuzzy=False, n_threads=8
+):
+    # Label retrieval of a list of queries: elastic search queries are sent in
+    # batches, fuzzy lookups run concurrently
+    responds_label_e, responds_label_f = None, None
+    if mode != "f":
+        responds_label_e = get_search_e().search_wd_batch(
+            queries, limit=limit, lang=lang, fuzzy=fuzzy
+        )
+    if mode != "b":
+
+        def _search_f(query):
+            return get_search_f(lang).search_wd(
+                query, limit=limit, lang=lang, expensive=expensive
+            )
+
+        if n_threads > 1 and len(queries) > 1:
+            with ThreadPoolExecutor(max_workers=min(n_threads, len(queries))) as pool:
+                responds_label_f = list(pool.map(_search_f, queries))
+        else:
+            responds_label_f = [_search_f(query) for query in queries]
+
+    return merge_labels(responds_label_e, responds_label_f, mode=mode)
+
+
+def merge_labels(responds_label_e, responds_label_f, mode="a"):
+    if mode == "b":
+        return responds_label_e
+    if mode == "f":
+        return responds_label_f
+    from kgdb.utils import utils as ul
+
+    return [
+        ul.merge_ranking([label_e, label_f], weight=[0.9, 1], is_sorted=True)
+        for label_e, label_f in zip(responds_label_e, responds_label_f)
+    ]
+
+
+def get_candidates(responds_label, labels_ranking, limit=20):
+    # Walk the candidate labels in ranking order and stop as soon as more than
+    # limit entities are collected: [(label_score, wd_lid, prank)]
+    candidates = []
+    wd_ids = set()
+    for _respond, _res_s in responds_label:
+        respond_wds = labels_ranking.get(_respond)
+        if not respond_wds:
+            continue
+        for _res_wd, _prank in respond_wds:
+            candidates.append((_res_s, _res_wd, _prank))
+            wd_ids.add(_res_wd)
+        if limit and len(wd_ids) > limit:
+            break
+    return candidates
+
+
+def score_candidates(
+    query, candidates, lang="en", limit=20, main_labels=None, labels_wd=None
+):
+    """
+    query: normalized query text (the cache key), compared to the labels without
+    case and punctuation
+    """
+    if not candidates:
+        return []
+    import numpy as np
+    from rapidfuzz.utils import default_process
+
+    from kgdb.utils import similarities
+
+    if main_labels is None:
+        main_labels = dict()
+    if labels_wd is None:
+        labels_wd = dict()
+
+    # Unique entities in the order of first appearance
+    wd_index = dict()
+    for _, _res_wd, _ in candidates:
+        if _res_wd not in wd_index:
+            wd_index[_res_wd] = len(wd_index)
+    wd_ids = list(wd_index.keys())
+
+    res_s = np.fromiter((c[0] for c in candidates), dtype=np.float64)
+    prank = np.fromiter((c[2] for c in candidates), dtype=np.float64)
+    res_i = np.fromiter((wd_index[c[1]] for c in candidates), dtype=np.int64)
+
+    # Label similarity of each entity, computed once per entity
+    labels = [labels_wd.get(_res_wd) for _res_wd in wd_ids]
+    labels = [list(l.values()) if isinstance(l, dict) else l or [] for l in labels]
+    labels_sim = similarities.get_closest_scores(
+        query, labels, processor=default_process
+    )
+
+    scores = res_s * 0.4 + prank * 0.3 + labels_sim[res_i] * 0.3
+    if lang == "en":
+        # _responds[_res_wd] = max(_responds[_res_wd], _res_s * 0.7 + _prank * 0.3)
+        main_label_sim = similarities.sim_fuzz_ratio_list(
+            query,
+            [main_labels.get(_res_wd) for _res_wd in wd_ids],
+            processor=default_process,
+        )
+        scores += main_label_sim[res_i] * 0.001
+
+    responds = np.zeros(len(wd_ids), dtype=np.float64)
+    np.maximum.at(responds, res_i, scores)
+
+    if limit == 0 or limit > len(wd_ids):
+        limit = len(wd_ids)
+    top_k = np.arange(len(wd_ids))
+    if limit < len(wd_ids):
+        top_k = np.argpartition(-responds, limit - 1)[:limit]
+    # Sort by score, keep the order of first appearance for ties
+    top_k = top_k[np.lexsort((top_k, -responds[top_k]))]
+    return [(wd_ids[i], float(responds[i])) for i in top_k]
+
+
+def search(
+    query, attr=None, lang="en", mode="a", limit=20, expensive=False, fuzzy=False
+):
+    return search_batch(
+        [query],
+        attr=attr,
+        lang=lang,
+        mode=mode,
+        limit=limit,
+        expensive=expensive,
+        fuzzy=fuzzy,
+    )[0]
 
-    # iw.print_status(f"Lang: {lang}")
 
+def search_batch(
+    queries,
+    attr=None,
+    lang="en",
+    mode="a",
+    limit=20,
+    expensive=False,
+    fuzzy=False,
+    n_threads=8,
+):
+    """
+    Search a list of queries, return the list of responds in the query order.
+    Results are cached by (normalized query, lang, mode, limit, fuzzy, expensive).
+    Queries are deduplicated by normalized text, label retrieval is batched,
+    and candidate labels and entities of all queries are fetched with multi-gets.
+    """
     # Attribute handling
     if attr:
         # Todo: Implement entity search
         pass
 
-    if is_wd_id:
-        return [[query.upper(), 1]]
-
-    if mode == "b":
-        responds_label = search_e.search_wd(query, limit=limit, lang=lang, fuzzy=fuzzy)
-    elif mode == "f":
-        responds_label = search_f.search_wd(
-            query, limit=limit, lang=lang, expensive=expensive
-        )
-    else:
-        responds_label_e = search_e.search_wd(
-            query, limit=limit, lang=lang, fuzzy=fuzzy
-        )
-        responds_label_f = search_f.search_wd(
-            query, limit=limit, lang=lang, expensive=expensive
-        )
-        responds_label = ul.merge_ranking(
-            [responds_label_e, responds_label_f], weight=[0.9, 1], is_sorted=True
+    responds, cache_keys, misses = get_cached(
+        queries, lang, mode, limit, expensive, fuzzy
+    )
+    if misses:
+        results = search_batch_uncached(
+            [queries[i] for i in misses],
+            lang=lang,
+            mode=mode,
+            limit=limit,
+            expensive=expensive,
+            fuzzy=fuzzy,
+            n_threads=n_threads,
         )
+        set_cached(responds, cache_keys, misses, results)
+    return responds
 
-    if not responds_label:
-        return []
 
-    responds = defaultdict(float)
+def search_batch_uncached(
+    queries, lang="en", mode="a", limit=20, expensive=False, fuzzy=False, n_threads=8
+):
+    responds, queries_norm = get_query_keys(queries, lang)
+    if not queries_norm:
+        return responds
 
-    for _r_i, (_respond, _res_s) in enumerate(responds_label):
-        respond_wds = wiki_labels.get_wd_ranking_from_label(
-            _respond, lang, search_objs="entity"
+    # Label retrieval
+    responds_labels = dict()
+    for query_lang, lang_keys in group_query_keys(queries_norm).items():
+        lang_responds = search_labels(
+            [query_key[0] for query_key in lang_keys],
+            lang=query_lang,
+            mode=mode,
+            limit=limit,
+            expensive=expensive,
+            fuzzy=fuzzy,
+            n_threads=n_threads,
         )
-        if not respond_wds:
+        responds_labels.update(zip(lang_keys, lang_responds))
+
+    return rank_labels(queries, queries_norm, responds_labels, responds, limit=limit)
+
+
+def get_query_keys(queries, lang="en"):
+    # Return the responds of wikidata ids, and
+    # (normalized query, lang) -> [query index] of the other queries
+    from kgdb.resources.db.utils import is_wikidata_item
+
+    responds = [None] * len(queries)
+    queries_norm = defaultdict(list)
+    for i, query in enumerate(queries):
+        query = get_query_text(query)
+        # Check query is a wikidata item or not
+        if is_wikidata_item(query):
+            responds[i] = [[query.upper(), 1]]
             continue
+        query_lang = get_query_lang(query, lang)
+        queries_norm[(query, query_lang)].append(i)
+    return responds, queries_norm
 
-        for _res_wd, _prank in respond_wds:
-            if lang == "en":
-                # _responds[_res_wd] = max(_responds[_res_wd], _res_s * 0.7 + _prank * 0.3)
-
-                main_label = wiki_items.get_label(_res_wd)
-                main_label_sim = 0
-                if main_label:
-                    main_label_sim = similarities.sim_fuzz_ratio(main_label, query)
-
-                label_en = wiki_labels.get_labels_en_from_wd_id(_res_wd)
-                label_en_sim = 0
-                if label_en:
-                    label_en_closest = similarities.get_closest(query, label_en)
-                    if label_en_closest:
-                        c_label, label_en_sim = label_en_closest
-
-                responds[_res_wd] = max(
-                    responds[_res_wd],
-                    _res_s * 0.4
-                    + _prank * 0.3
-                    + main_label_sim * 0.001
-                    + label_en_sim * 0.3,
-                )
-            else:
-                label_all = wiki_labels.get_labels_all_from_wd_id(_res_wd)
-                label_all_sim = 0
-                if label_all:
-                    label_all_closest = similarities.get_closest(query, label_all)
-                    if label_all_closest:
-                        c_label, label_all_sim = label_all_closest
-
-                responds[_res_wd] = max(
-                    responds[_res_wd],
-                    _res_s * 0.4 + _prank * 0.3 + label_all_sim * 0.3,
-                )
-            # if limit and len(_responds) > limit:
-            #     break
-        if limit and len(responds) > limit:
-            break
 
-    if limit == 0:
-        limit = len(responds)
-    responds = sorted(responds.items(), key=lambda x: x[1], reverse=True)[:limit]
+def group_query_keys(queries_norm):
+    # lang -> [query key]
+    groups = defaultdict(list)
+    for query_key in queries_norm:
+        groups[query_key[1]].append(query_key)
+    return groups
+
+
+def rank_labels(queries, queries_norm, responds_labels, responds, limit=20):
+    """
+    Rank the entities of the retrieved labels (responds_labels: query key -> labels)
+    and fill responds in the query order
+    """
+    wiki_items = get_wiki_items()
+    wiki_labels = get_wiki_labels()
+    query_keys = list(queries_norm.keys())
+    responds_labels = [responds_labels.get(query_key) for query_key in query_keys]
+
+    # Candidate labels -> entity rankings
+    labels_ranking = dict()
+    for query_lang in {query_key[1] for query_key in query_keys}:
+        labels = {
+            _respond
+            for query_key, responds_label in zip(query_keys, responds_labels)
+            if query_key[1] == query_lang and responds_label
+            for _respond, _ in responds_label
+        }
+        if labels:
+            labels_ranking[query_lang] = wiki_labels.get_wd_ranking_from_labels(
+                list(labels), query_lang, search_objs="entity"
+            )
+
+    candidates = dict()
+    wd_ids = defaultdict(set)
+    for query_key, responds_label in zip(query_keys, responds_labels):
+        if not responds_label:
+            continue
+        candidates[query_key] = get_candidates(
+            responds_label, labels_ranking.get(query_key[1], {}), limit=limit
+        )
+        wd_ids[query_key[1]].update(_res_wd for _, _res_wd, _ in candidates[query_key])
+
+    # Entity hydration
+    main_labels = dict()
+    labels_wd = dict()
+    for query_lang, query_wd_ids in wd_ids.items():
+        if not query_wd_ids:
+            continue
+        if query_lang == "en":
+            main_labels = wiki_items.get_label_batch(query_wd_ids)
+            labels_wd[query_lang] = wiki_labels.get_labels_en_from_wd_ids(query_wd_ids)
+        else:
+            labels_wd[query_lang] = wiki_labels.get_labels_all_from_wd_ids(query_wd_ids)
+
+    # Scoring: queries of the same key (normalized text) get the same responds
+    for query_key, query_ids in queries_norm.items():
+        query_norm, query_lang = query_key
+        respond = []
+        if query_key in candidates:
+            respond = score_candidates(
+                query_norm,
+                candidates[query_key],
+                lang=query_lang,
+                limit=limit,
+                main_labels=main_labels,
+                labels_wd=labels_wd.get(query_lang),
+            )
+        for i in query_ids:
+            responds[i] = list(respond)
     return responds
 
 
@@ -241,7 +527,7 @@ def run_entity_search(lang="en", mode="a", limit=20, expensive=False):
         iw.print_status(
             f"About {len(responds)} results ({(time() - start):.5f} seconds)"
         )
-        responds = wiki_items.get_items_info(responds[:3])
+        responds = get_wiki_items().get_items_info(responds[:3])
         if responds:
             c_ok += 1
         for i, respond in enumerate(responds):
@@ -256,6 +542,8 @@ def run_entity_search(lang="en", mode="a", limit=20, expensive=False):
 
 
 if __name__ == "__main__":
+    from kgdb.m_f import init
+
     init()
     # Aggregation Search
     # run_entity_search(lang="en", mode="b")
@@ -0,0 +1,158 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from kgdb.config import config as cf
+from kgdb.modules import entity_search
+from kgdb.utils.lazy import Singletons
+
+singletons = Singletons()
+
+
+def get_executor_lmdb() -> ThreadPoolExecutor:
+    # LMDB lookups are blocking, they run in a dedicated thread pool
+    return singletons.get(
+        "executor_lmdb",
+        lambda: ThreadPoolExecutor(
+            max_workers=cf.ASYNC_LMDB_THREADS, thread_name_prefix="kgdb_lmdb"
+        ),
+    )
+
+
+def get_search_e():
+    if cf.LABEL_SEARCH_BACKEND != "es":
+        return None
+    from kgdb.resources.db_elasticsearch import AsyncESearch
+
+    return singletons.get("search_e", AsyncESearch)
+
+
+async def run_lmdb(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor_lmdb(), partial(func, *args, **kwargs)
+    )
+
+
+async def search_labels_e(queries, lang="en", limit=20, fuzzy=False):
+    search_e = get_search_e()
+    if search_e is None:
+        # Embedded label index
+        return await run_lmdb(
+            entity_search.get_search_e().search_wd_batch,
+            queries,
+            limit=limit,
+            lang=lang,
+            fuzzy=fuzzy,
+        )
+    return await search_e.search_wd_batch(queries, limit=limit, lang=lang, fuzzy=fuzzy)
+
+
+async def search_labels_f(queries, lang="en", limit=20, expensive=False):
+    def _search_f(query):
+        return entity_search.get_search_f(lang).search_wd(
+            query, limit=limit, lang=lang, expensive=expensive
+        )
+
+    return await asyncio.gather(*[run_lmdb(_search_f, query) for query in queries])
+
+
+async def search_labels(
+    queries, lang="en", mode="a", limit=20, expensive=False, fuzzy=False
+):
+    # The elastic search and fuzzy branches run concurrently
+    responds_label_e, responds_label_f = None, None
+    if mode == "b":
+        responds_label_e = await search_labels_e(queries, lang, limit, fuzzy)
+    elif mode == "f":
+        responds_label_f = await search_labels_f(queries, lang, limit, expensive)
+    else:
+        responds_label_e, responds_label_f = await asyncio.gather(
+            search_labels_e(queries, lang, limit, fuzzy),
+            search_labels_f(queries, lang, limit, expensive),
+        )
+    return entity_search.merge_labels(responds_label_e, responds_label_f, mode=mode)
+
+
+async def search(
+    query, attr=None, lang="en", mode="a", limit=20, expensive=False, fuzzy=False
+):
+    return (
+        await search_batch(
+            [query],
+            attr=attr,
+            lang=lang,
+            mode=mode,
+            limit=limit,
+            expensive=expensive,
+            fuzzy=fuzzy,
+        )
+    )[0]
+
+
+async def search_batch(
+    queries, attr=None, lang="en", mode="a", limit=20, expensive=False, fuzzy=False
+):
+    """
+    asyncio version of entity_search.search_batch
+    """
+    responds, cache_keys, misses = entity_search.get_cached(
+        queries, lang, mode, limit, expensive, fuzzy
+    )
+    if misses:
+        results = await search_batch_uncached(
+            [queries[i] for i in misses],
+            lang=lang,
+            mode=mode,
+            limit=limit,
+            expensive=expensive,
+            fuzzy=fuzzy,
+        )
+        entity_search.set_cached(responds, cache_keys, misses, results)
+    return responds
+
+
+async def search_batch_uncached(
+    queries, lang="en", mode="a", limit=20, expensive=False, fuzzy=False
+):
+    responds, queries_norm = entity_search.get_query_keys(queries, lang)
+    if not queries_norm:
+        return responds
+
+    # Label retrieval
+    query_groups = entity_search.group_query_keys(queries_norm)
+    lang_responds = await asyncio.gather(
+        *[
+            search_labels(
+                [query_key[0] for query_key in lang_keys],
+                lang=query_lang,
+                mode=mode,
+                limit=limit,
+                expensive=expensive,
+                fuzzy=fuzzy,
+            )
+            for query_lang, lang_keys in query_groups.items()
+        ]
+    )
+    responds_labels = dict()
+    for lang_keys, responds_label in zip(query_groups.values(), lang_responds):
+        responds_labels.update(zip(lang_keys, responds_label))
+
+    return await run_lmdb(
+        entity_search.rank_labels,
+        queries,
+        queries_norm,
+        responds_labels,
+        responds,
+        limit=limit,
+    )
+
+
+async def close():
+    search_e = singletons.pop("search_e")
+    if search_e is not None:
+        await search_e.close()
+    executor_lmdb = singletons.pop("executor_lmdb")
+    if executor_lmdb is not None:
+        executor_lmdb.shutdown(wait=False)
+    entity_search.release()
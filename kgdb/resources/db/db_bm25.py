@@ -0,0 +1,391 @@
+import gc
+import math
+import os
+import re
+from collections import defaultdict
+from enum import Enum
+from typing import List, Optional
+
+import numpy as np
+from freaddb.db_lmdb import DBSpec, FReadDB, ToBytes
+from pyroaring import BitMap
+from tqdm import tqdm
+
+from kgdb.config import config as cf
+from kgdb.resources.db.db_deletes import delete_edits_prefix
+from kgdb.resources.db.db_entity_labels import DBELabel
+from kgdb.resources.db.utils import is_wikidata_item
+from kgdb.resources.db_elasticsearch import ESearch
+from kgdb.utils import io_worker as iw
+from kgdb.utils.similarities import dis_damerau_levenshtein_bounded
+
+
+class DB_BM25_COLUMN_NAME(Enum):
+    TOKEN_ID = "TOKEN_ID"
+    ID_TOKEN = "ID_TOKEN"
+    POSTING = "POSTING"
+    TOKEN_DELETE = "TOKEN_DELETE"
+
+
+DB_BM25_SCHEMA = {
+    DB_BM25_COLUMN_NAME.TOKEN_ID: DBSpec(DB_BM25_COLUMN_NAME.TOKEN_ID.value),
+    DB_BM25_COLUMN_NAME.ID_TOKEN: DBSpec(
+        DB_BM25_COLUMN_NAME.ID_TOKEN.value, integerkey=True
+    ),
+    DB_BM25_COLUMN_NAME.POSTING: DBSpec(
+        DB_BM25_COLUMN_NAME.POSTING.value,
+        integerkey=True,
+        bytes_value=ToBytes.INT_BITMAP,
+    ),
+    DB_BM25_COLUMN_NAME.TOKEN_DELETE: DBSpec(
+        DB_BM25_COLUMN_NAME.TOKEN_DELETE.value, bytes_value=ToBytes.INT_BITMAP
+    ),
+}
+
+# Same defaults as Elastic Search
+BM25_K1 = 1.2
+BM25_B = 0.75
+FUZZY_MAX_EXPANSIONS = 50
+FUZZY_PREFIX_LEN = 7
+
+
+def get_bm25_db_file(lang: str = "en") -> str:
+    return f"{cf.DIR_DATABASES}/bm25_{lang}"
+
+
+def tokenize(text: str) -> List[str]:
+    # Unique word tokens of a normalized label, in order
+    if not text:
+        return []
+    return list(dict.fromkeys(re.findall(r"\w+", text.lower())))
+
+
+def get_fuzziness(token: str) -> int:
+    # Elastic Search "AUTO" fuzziness
+    if len(token) <= 2:
+        return 0
+    if len(token) <= 5:
+        return 1
+    return 2
+
+
+def get_idf(df: int, n_labels: int) -> float:
+    return math.log(1 + (n_labels - df + 0.5) / (df + 0.5))
+
+
+def bm25_top_k(terms, norms, k1: float = BM25_K1, min_norm: float = 0, limit=0):
+    """
+    Term-at-a-time BM25 with MaxScore pruning.
+    terms: [(weight, posting)] where weight is the term idf (times the fuzzy boost)
+    norms: label id -> k1 * (1 - b + b * label_length / avg_label_length)
+    Labels store unique tokens, so the term frequency is 1 and the contribution
+    of a term to a label is weight * (k1 + 1) / (1 + norm).
+    Return (label_ids, scores) sorted by score
+    """
+    terms = [(w, w * (k1 + 1) / (1 + min_norm), p) for w, p in terms if p]
+    # Highest upper bound first
+    terms.sort(key=lambda x: x[1], reverse=True)
+    remaining = sum(ub for _, ub, _ in terms)
+
+    candidates = BitMap()
+    cand_ids = np.zeros(0, dtype=np.int64)
+    cand_scores = np.zeros(0, dtype=np.float64)
+    threshold = 0
+    for weight, ub, posting in terms:
+        # Labels not seen yet can not reach the top-k if the upper bound of the
+        # remaining terms is lower than the current k-th score
+        if limit and len(cand_ids) >= limit and remaining < threshold:
+            posting = posting & candidates
+            if not posting:
+                remaining -= ub
+                continue
+        remaining -= ub
+
+        ids = np.array(posting.to_array(), dtype=np.int64)
+        # float64 as the upper bounds, float32 rounding could exceed them
+        scores = weight * (k1 + 1) / (1 + norms[ids].astype(np.float64))
+        if len(posting - candidates):
+            candidates |= posting
+            new_ids = np.array(candidates.to_array(), dtype=np.int64)
+            new_scores = np.zeros(len(new_ids), dtype=np.float64)
+            new_scores[np.searchsorted(new_ids, cand_ids)] = cand_scores
+            cand_ids, cand_scores = new_ids, new_scores
+        cand_scores[np.searchsorted(cand_ids, ids)] += scores
+
+        if limit and len(cand_ids) >= limit:
+            threshold = np.partition(cand_scores, -limit)[-limit]
+
+    if limit and limit < len(cand_ids):
+        # Labels tied with the k-th score are kept for the tie-break
+        threshold = np.partition(cand_scores, -limit)[-limit]
+        top_k = np.flatnonzero(cand_scores >= threshold)
+    else:
+        top_k = np.arange(len(cand_ids))
+    top_k = top_k[np.lexsort((cand_ids[top_k], -cand_scores[top_k]))]
+    if limit:
+        top_k = top_k[:limit]
+    return cand_ids[top_k], cand_scores[top_k]
+
+
+class DBBM25(FReadDB):
+    def __init__(
+        self,
+        lang: str = "en",
+        db_schema: Optional[List[DBSpec]] = DB_BM25_SCHEMA.values(),
+        read_only=True,
+        buff_limit: int = cf.BUFF_LIMIT,
+        create_new: bool = False,
+        buff_postings_limit=32_000_000,
+    ):
+        """
+        Embedded BM25 index of entity labels (DBELabel), lang: "en" or "all".
+        Norms and collection statistics are stored next to the LMDB files.
+        """
+        db_file = get_bm25_db_file(lang)
+        if create_new and not read_only:
+            iw.delete_folder(db_file)
+        super().__init__(
+            db_file=db_file,
+            db_schema=db_schema,
+            readonly=read_only,
+            buff_limit=buff_limit,
+            split_subdatabases=True,
+        )
+        self.lang = lang
+        self.file_norms = f"{db_file}_norms.npy"
+        self.file_stats = f"{db_file}_stats.json"
+        self.buff_postings = defaultdict(BitMap)
+        self.buff_size_postings = 0
+        self.buff_limit_postings = buff_postings_limit
+        self._norms = None
+        self._stats = None
+        self._db_labels = None
+
+    @property
+    def db_labels(self):
+        if self._db_labels is None:
+            self._db_labels = DBELabel()
+        return self._db_labels
+
+    @property
+    def norms(self):
+        if self._norms is None:
+            self._norms = np.load(self.file_norms, mmap_mode="r")
+        return self._norms
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            self._stats = iw.read_json_file(self.file_stats)
+        return self._stats
+
+    def get_token_ids(self, tokens: List[str]):
+        return self.get_values(DB_BM25_COLUMN_NAME.TOKEN_ID.value, tokens)
+
+    def get_tokens(self, token_ids: List[int]):
+        return self.get_values(DB_BM25_COLUMN_NAME.ID_TOKEN.value, token_ids)
+
+    def get_postings(self, token_ids: List[int]):
+        return self.get_values(DB_BM25_COLUMN_NAME.POSTING.value, token_ids)
+
+    def get_fuzzy_tokens(self, token: str):
+        # Vocabulary tokens within the AUTO edit distance of the token:
+        # {token_id: boost}, boost = 1 - distance / len(token)
+        max_distance = get_fuzziness(token)
+        if not max_distance:
+            return {}
+        candidates = BitMap()
+        deletes = delete_edits_prefix(token, max_distance, FUZZY_PREFIX_LEN)
+        for posting in self.get_values(
+            DB_BM25_COLUMN_NAME.TOKEN_DELETE.value, list(deletes)
+        ).values():
+            candidates |= posting
+        if not candidates:
+            return {}
+
+        responds = []
+        for token_id, token_ in self.get_tokens(list(candidates)).items():
+            distance = dis_damerau_levenshtein_bounded(token, token_, max_distance)
+            if distance > max_distance:
+                continue
+            responds.append((distance, token_id))
+        responds.sort()
+        return {
+            token_id: 1 - distance / len(token)
+            for distance, token_id in responds[:FUZZY_MAX_EXPANSIONS]
+        }
+
+    def search(self, input_text: str, limit=cf.LIMIT_SEARCH_ES, fuzzy=False):
+        # Return [(label_id, score)]
+        tokens = tokenize(input_text)
+        if not tokens or not self.stats.get("n_labels"):
+            return []
+
+        term_weights = defaultdict(float)
+        for token, token_id in self.get_token_ids(tokens).items():
+            term_weights[token_id] = 1
+        if fuzzy:
+            for token in tokens:
+                for token_id, boost in self.get_fuzzy_tokens(token).items():
+                    term_weights[token_id] = max(term_weights[token_id], boost)
+        if not term_weights:
+            return []
+
+        n_labels = self.stats["n_labels"]
+        postings = self.get_postings(list(term_weights.keys()))
+        terms = [
+            (term_weights[token_id] * get_idf(len(posting), n_labels), posting)
+            for token_id, posting in postings.items()
+        ]
+        label_ids, scores = bm25_top_k(
+            terms,
+            self.norms,
+            k1=self.stats["k1"],
+            min_norm=self.stats["min_norm"],
+            limit=limit,
+        )
+        return list(zip(label_ids.tolist(), scores.tolist()))
+
+    def save_postings_buff(self, column_name: str):
+        for k, v in tqdm(
+            self.buff_postings.items(),
+            desc="Save buff",
+            total=len(self.buff_postings),
+        ):
+            # Merge with the posting of the previous saves
+            posting = self.get_value(column_name, k)
+            if posting:
+                v |= posting
+            self.add_buff(column_name, k, v)
+        self.save_buff()
+        self.buff_postings.clear()
+        self.buff_size_postings = 0
+        gc.collect()
+
+    def add_posting(self, column_name: str, key, value: int):
+        self.buff_postings[key].add(value)
+        self.buff_size_postings += 1
+        if self.buff_size_postings > self.buff_limit_postings:
+            self.save_postings_buff(column_name)
+
+    def build(self, k1: float = BM25_K1, b: float = BM25_B, step: int = 1_000):
+        if self.lang == "en":
+            iter_items = self.db_labels.iter_en()
+            total = self.db_labels.size_labels_en()
+        else:
+            iter_items = self.db_labels.iter_all()
+            total = self.db_labels.size_labels_all()
+
+        # Postings: token id -> label ids
+        vocab = dict()
+        lengths = np.zeros(self.db_labels.size_vocab() + 1, dtype=np.uint32)
+        p_bar = tqdm(desc=f"BM25 {self.lang}", total=total)
+        for i, (label, label_id) in enumerate(iter_items):
+            if i and i % step == 0:
+                p_bar.update(step)
+                p_bar.set_description(
+                    f"BM25 {self.lang} | Tokens: {len(vocab):,} | buff: {self.buff_size_postings / self.buff_limit_postings * 100:.0f}%"
+                )
+            if not label or is_wikidata_item(label):
+                continue
+            tokens = tokenize(label)
+            if not tokens:
+                continue
+            if label_id >= len(lengths):
+                lengths = np.concatenate(
+                    [lengths, np.zeros(label_id + 1, dtype=np.uint32)]
+                )
+            lengths[label_id] = len(tokens)
+            for token in tokens:
+                token_id = vocab.get(token)
+                if token_id is None:
+                    token_id = len(vocab)
+                    vocab[token] = token_id
+                self.add_posting(DB_BM25_COLUMN_NAME.POSTING.value, token_id, label_id)
+        p_bar.close()
+        self.save_postings_buff(DB_BM25_COLUMN_NAME.POSTING.value)
+
+        # Vocabulary and token deletes for fuzzy queries
+        for token, token_id in tqdm(vocab.items(), desc="Vocab", total=len(vocab)):
+            self.add_buff(DB_BM25_COLUMN_NAME.TOKEN_ID.value, token, token_id)
+            self.add_buff(DB_BM25_COLUMN_NAME.ID_TOKEN.value, token_id, token)
+            max_distance = get_fuzziness(token)
+            if not max_distance:
+                continue
+            for delete in delete_edits_prefix(token, max_distance, FUZZY_PREFIX_LEN):
+                self.add_posting(
+                    DB_BM25_COLUMN_NAME.TOKEN_DELETE.value, delete, token_id
+                )
+        self.save_postings_buff(DB_BM25_COLUMN_NAME.TOKEN_DELETE.value)
+        self.save_buff()
+
+        # Precomputed norms
+        n_labels = int(np.count_nonzero(lengths))
+        avg_length = float(lengths.sum() / n_labels) if n_labels else 0
+        norms = np.full(len(lengths), np.inf, dtype=np.float32)
+        if n_labels:
+            indexed = lengths > 0
+            norms[indexed] = k1 * (1 - b + b * lengths[indexed] / avg_length)
+        np.save(self.file_norms, norms)
+        stats = {
+            "n_labels": n_labels,
+            "n_tokens": len(vocab),
+            "avg_length": avg_length,
+            "k1": k1,
+            "b": b,
+            "min_norm": float(norms.min()) if n_labels else 0,
+        }
+        iw.save_json_file(self.file_stats, stats)
+        self._norms, self._stats = None, None
+        iw.print_status(stats)
+
+
+class BM25Search(ESearch):
+    """
+    ESearch interface (search_label, search_wd) on the embedded BM25 label indexes,
+    no Elastic Search service is required
+    """
+
+    def __init__(self):
+        self.client = None
+        self.index_en = "en"
+        self.index_all = "all"
+        self.indexes = dict()
+
+    def get_index(self, lang="en"):
+        lang = "en" if lang == "en" else "all"
+        if lang not in self.indexes:
+            self.indexes[lang] = DBBM25(lang=lang)
+        return self.indexes[lang]
+
+    def build(self):
+        for lang in [self.index_en, self.index_all]:
+            db_bm25 = DBBM25(lang=lang, read_only=False, create_new=True)
+            db_bm25.build()
+
+    def ping(self):
+        # The indexes are built
+        return all(
+            os.path.exists(f"{get_bm25_db_file(lang)}_stats.json")
+            for lang in [self.index_en, self.index_all]
+        )
+
+    def search_hits_batch(self, queries, lang="en", batch_size=0):
+        return [
+            self.search_hits(input_text, lang=lang, is_fuzzy=is_fuzzy)
+            for input_text, is_fuzzy in queries
+        ]
+
+    def search_hits(self, input_text, lang="en", is_fuzzy=False):
+        db_bm25 = self.get_index(lang)
+        responds = db_bm25.search(input_text, limit=cf.LIMIT_SEARCH_ES, fuzzy=is_fuzzy)
+        if not responds:
+            return {}
+        labels = db_bm25.db_labels.get_labels_from_lid_list(
+            [label_id for label_id, _ in responds]
+        )
+        return {
+            labels[label_id]: score
+            for label_id, score in responds
+            if labels.get(label_id)
+        }
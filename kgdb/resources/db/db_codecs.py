@@ -0,0 +1,545 @@
+"""
+Per-column value formats: schema-aware binary codec and trained zstd dictionaries.
+
+At compaction time, the values of a column can be
+- converted to the binary codec (convert_columns, see kgdb.utils.binary_codec):
+  dict values are indexed by their keys, string keys are interned in a key table
+- compressed with a zstd dictionary trained on sampled values (compress_columns)
+The format of each converted column (format flag, key table, zstd dictionary) is
+saved in the value codecs metadata of the database ({db_file}_value_codecs.json).
+Columns without metadata keep the values serialized with their DBSpec. DBCore loads
+the metadata when the database is opened, decodes the values of these columns on
+read and encodes the values added to them (add_buff, add_buff_with_lid).
+"""
+
+import base64
+import dataclasses
+import math
+import os
+import threading
+from time import perf_counter
+from typing import Any, Dict, Hashable, Iterator, List, Optional
+
+import zstandard as zstd
+from freaddb.db_lmdb import (
+    DBSpec,
+    FReadDB,
+    ToBytes,
+    deserialize_value,
+    serialize_value,
+)
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+from kgdb.utils.binary_codec import MSGPACK, BinaryCodec, get_key_table
+
+# Value formats: serialized with the column DBSpec (freaddb) or the binary codec
+FORMAT_FREADDB = "freaddb"
+FORMAT_BINARY = "binary"
+
+# First byte of the zstd values: zstd frame, or raw value when compression does
+# not make it smaller (e.g., values of a few bytes)
+ZSTD_FRAME = b"\x01"
+ZSTD_RAW = b"\x00"
+
+
+def get_compression_params(level: int) -> zstd.ZstdCompressionParameters:
+    # Frames without magic number, dictionary id and checksum: the dictionary and
+    # the format are known from the metadata
+    return zstd.ZstdCompressionParameters.from_level(
+        level,
+        format=zstd.FORMAT_ZSTD1_MAGICLESS,
+        write_content_size=True,
+        write_dict_id=False,
+        write_checksum=False,
+    )
+
+
+class ValueCodec(object):
+    """
+    Stored values of a column: values serialized with the DBSpec of the column
+    (value_args) or with the binary codec (keys: key table), and compressed with a
+    trained zstd dictionary (dict_data).
+    """
+
+    def __init__(
+        self,
+        value_args: Dict,
+        keys: Optional[List[str]] = None,
+        dict_data: Optional[bytes] = None,
+        level: int = cf.ZSTD_LEVEL,
+        stats: Optional[Dict] = None,
+    ):
+        self.value_args = value_args
+        self.binary = BinaryCodec(keys) if keys is not None else None
+        self.dict_data = None
+        self.level = level
+        self.stats = stats if stats else dict()
+        self._compressor = None
+        # zstd decompressors are not thread-safe, one per thread
+        self._local = threading.local()
+        if dict_data is not None:
+            self.set_dict(dict_data, level)
+
+    @property
+    def format(self) -> str:
+        return FORMAT_BINARY if self.binary is not None else FORMAT_FREADDB
+
+    def set_dict(self, dict_data: bytes, level: int = cf.ZSTD_LEVEL):
+        self.dict_data = zstd.ZstdCompressionDict(dict_data)
+        self.level = level
+        self._compressor = None
+        self._local = threading.local()
+
+    @property
+    def decompressor(self):
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = zstd.ZstdDecompressor(
+                dict_data=self.dict_data, format=zstd.FORMAT_ZSTD1_MAGICLESS
+            )
+            self._local.decompressor = decompressor
+        return decompressor
+
+    def compress(self, value: bytes) -> bytes:
+        if self.dict_data is None:
+            return value
+        if self._compressor is None:
+            self._compressor = zstd.ZstdCompressor(
+                dict_data=self.dict_data,
+                compression_params=get_compression_params(self.level),
+            )
+        compressed = self._compressor.compress(value)
+        if len(compressed) < len(value):
+            return ZSTD_FRAME + compressed
+        return ZSTD_RAW + value
+
+    def decompress(self, value: bytes) -> bytes:
+        if self.dict_data is None:
+            return value
+        value = memoryview(value)
+        if value[:1] == ZSTD_RAW:
+            return value[1:].tobytes()
+        return self.decompressor.decompress(value[1:])
+
+    def encode(self, value: Any, is_serialized: bool = False) -> bytes:
+        """
+        Stored bytes of a value added to the column. is_serialized: the value is
+        serialized with the DBSpec of the column.
+        """
+        if self.binary is not None:
+            if is_serialized:
+                value = deserialize_value(value, **self.value_args)
+            value = self.binary.dumps(value)
+        elif not is_serialized:
+            value = serialize_value(value, **self.value_args)
+        return self.compress(value)
+
+    def dumps(self, value: Any) -> bytes:
+        # Binary format of a value, before compression
+        return self.binary.dumps(value)
+
+    def loads(self, value: bytes) -> Any:
+        if self.binary is not None:
+            return self.binary.loads(value)
+        return deserialize_value(value, **self.value_args)
+
+    def decode(self, value: bytes) -> Any:
+        return self.loads(self.decompress(value))
+
+    def decode_field(self, value: bytes, key: Hashable) -> Any:
+        """
+        value.get(key) of a dict value, only this key is decoded in binary columns
+        """
+        value = self.decompress(value)
+        if self.binary is not None:
+            return self.binary.loads_field(value, key)
+        value = deserialize_value(value, **self.value_args)
+        return value.get(key) if isinstance(value, dict) else None
+
+    def to_json(self) -> Dict:
+        json_obj = {
+            "format": self.format,
+            "bytes_value": int(self.value_args["bytes_value"]),
+            "compress_value": self.value_args["compress_value"],
+            "stats": self.stats,
+        }
+        if self.binary is not None:
+            json_obj["keys"] = self.binary.keys
+        if self.dict_data is not None:
+            json_obj["zstd"] = {
+                "level": self.level,
+                "dict": base64.b64encode(self.dict_data.as_bytes()).decode("ascii"),
+            }
+        return json_obj
+
+    @staticmethod
+    def from_json(json_obj: Dict) -> "ValueCodec":
+        zstd_obj = json_obj.get("zstd", {})
+        return ValueCodec(
+            value_args={
+                "bytes_value": ToBytes(json_obj["bytes_value"]),
+                "compress_value": json_obj["compress_value"],
+            },
+            keys=json_obj.get("keys") if json_obj["format"] == FORMAT_BINARY else None,
+            dict_data=base64.b64decode(zstd_obj["dict"]) if zstd_obj else None,
+            level=zstd_obj.get("level", cf.ZSTD_LEVEL),
+            stats=json_obj.get("stats"),
+        )
+
+
+def get_metadata_file(db: FReadDB) -> str:
+    return f"{db.db_file}_value_codecs.json"
+
+
+def load_value_codecs(db: FReadDB) -> Dict[str, ValueCodec]:
+    """
+    Codecs of the converted columns of a database. The DBSpecs of these columns are
+    replaced by raw bytes specs, FReadDB returns the stored bytes and DBCore decodes
+    them.
+    """
+    metadata_file = get_metadata_file(db)
+    if not os.path.exists(metadata_file):
+        return dict()
+
+    value_codecs = dict()
+    for db_name, json_obj in iw.read_json_file(metadata_file).items():
+        if db_name not in db.db_schema:
+            continue
+        value_codecs[db_name] = ValueCodec.from_json(json_obj)
+        db.db_schema[db_name] = get_raw_spec(db.db_schema[db_name])
+    return value_codecs
+
+
+def save_value_codecs(db: FReadDB, value_codecs: Dict[str, ValueCodec]):
+    iw.save_json_file(
+        get_metadata_file(db),
+        {db_name: codec.to_json() for db_name, codec in value_codecs.items()},
+    )
+
+
+def get_raw_spec(db_spec: DBSpec) -> DBSpec:
+    # The schema DBSpecs are shared by the database instances, they are copied
+    return dataclasses.replace(db_spec, bytes_value=ToBytes.BYTES, compress_value=False)
+
+
+def decode_value(db: FReadDB, db_name: str, value: bytes) -> Any:
+    """
+    Value of the stored bytes of a column: decoded with the codec of the converted
+    columns, deserialized with the column DBSpec otherwise
+    """
+    codec = getattr(db, "value_codecs", {}).get(db_name)
+    if codec is not None:
+        return codec.decode(value)
+    return deserialize_value(value, **db.db_schema[db_name].get_value_args())
+
+
+def decode_values(db: FReadDB, db_name: str, responds: Dict) -> Dict:
+    # Undecodable values are logged and skipped, never returned as bytes
+    decoded = dict()
+    for k, v in responds.items():
+        try:
+            decoded[k] = decode_value(db, db_name, v)
+        except Exception as message:
+            iw.print_status(f"{db_name} {k}: {message}", is_screen=False)
+    return decoded
+
+
+def get_value(db: FReadDB, db_name: str, key_obj: Any, get_deserialize: bool = True):
+    # FReadDB.get_value decoding the values of the converted columns
+    responds = FReadDB.get_value(db, db_name, key_obj, get_deserialize=False)
+    if get_deserialize and responds is not None:
+        try:
+            responds = decode_value(db, db_name, responds)
+        except Exception as message:
+            iw.print_status(f"{db_name} {key_obj}: {message}", is_screen=False)
+            responds = None
+    return responds
+
+
+def get_values(db: FReadDB, db_name: str, key_objs: List, get_deserialize=True):
+    # FReadDB returns {} for keys that are not a list, set, tuple or array
+    responds = FReadDB.get_values(db, db_name, key_objs, get_deserialize=False)
+    if get_deserialize:
+        responds = decode_values(db, db_name, responds)
+    return responds
+
+
+def get_db_iter(
+    db: FReadDB,
+    db_name: str,
+    get_values: bool = True,
+    deserialize_obj: bool = True,
+    from_i: int = 0,
+    to_i: int = -1,
+):
+    items = FReadDB.get_db_iter(db, db_name, get_values, deserialize_obj, from_i, to_i)
+    codec = db.value_codecs.get(db_name)
+    if codec is None or not get_values or not deserialize_obj:
+        return items
+    return ((k, codec.decode(v)) for k, v in items)
+
+
+def get_iter_with_prefix(db: FReadDB, db_name: str, prefix: Any, get_values=True):
+    items = FReadDB.get_iter_with_prefix(db, db_name, prefix, get_values)
+    codec = db.value_codecs.get(db_name)
+    if codec is None or not get_values:
+        return items
+    return ((k, codec.decode(v)) for k, v in items)
+
+
+def encode_column_value(
+    db: FReadDB, db_name: str, value: Any, is_serialize_value: bool
+):
+    """
+    Stored bytes of a value added to a converted column. Values that are not
+    serialized yet (is_serialize_value=False) are serialized by FReadDB.save_buff
+    with the column DBSpec, they are encoded here too.
+    """
+    is_serialized = not is_serialize_value and isinstance(value, (bytes, bytearray))
+    return db.value_codecs[db_name].encode(value, is_serialized=is_serialized)
+
+
+def add_buff(
+    db: FReadDB, db_name: str, key: Any, value: Any, is_serialize_value: bool = True
+) -> bool:
+    # FReadDB.add_buff encoding the values of the converted columns
+    if db_name in db.value_codecs:
+        value = encode_column_value(db, db_name, value, is_serialize_value)
+        is_serialize_value = False
+    return FReadDB.add_buff(db, db_name, key, value, is_serialize_value)
+
+
+def bind_value_codecs(db: FReadDB):
+    """
+    Decode the values of the converted columns on read and encode them on write.
+    The decoding read functions are bound to this instance only, databases without
+    converted columns keep the plain FReadDB functions. The counting functions of
+    db_stats read and decode the values with the same functions.
+    """
+    if not db.value_codecs:
+        return
+    db.add_buff = add_buff.__get__(db)
+    if getattr(db, "db_stats", None) is None:
+        db.get_value = get_value.__get__(db)
+        db.get_values = get_values.__get__(db)
+    db.get_db_iter = get_db_iter.__get__(db)
+    db.get_iter_with_prefix = get_iter_with_prefix.__get__(db)
+
+
+def iter_raw_items(db: FReadDB, db_name: str, batch_size: int = 10_000) -> Iterator:
+    """
+    Batches of the stored (key, value) bytes of a column. Each batch is read in its
+    own transaction, values of the read items can be rewritten between batches.
+    """
+    env, sub_db = db.env[db_name], db.dbs[db_name]
+    start = None
+    while True:
+        with env.begin(db=sub_db) as txn:
+            cur = txn.cursor()
+            found = cur.first() if start is None else cur.set_range(start)
+            batch = []
+            while found and len(batch) < batch_size:
+                batch.append(cur.item())
+                found = cur.next()
+            start = cur.key() if found else None
+        if batch:
+            yield batch
+        if start is None:
+            return
+
+
+def rewrite_values(db: FReadDB, db_name: str, func) -> Dict[str, int]:
+    # Replace the stored values of a column by func(stored value)
+    size, size_new = 0, 0
+    for batch in iter_raw_items(db, db_name):
+        size += sum(len(value) for _, value in batch)
+        batch = [(key, func(value)) for key, value in batch]
+        size_new += sum(len(value) for _, value in batch)
+        FReadDB.write(db.env[db_name], db.dbs[db_name], batch, sort_key=False)
+    return {"size": size, "size_new": size_new}
+
+
+def sample_values(db: FReadDB, db_name: str, n_samples: int) -> List[bytes]:
+    # Stored values of evenly spaced items of the column
+    step = max(1, math.ceil(db.get_number_items_from(db_name) / n_samples))
+    samples = []
+    for i, (_, value) in enumerate(
+        item for batch in iter_raw_items(db, db_name) for item in batch
+    ):
+        if i % step == 0:
+            samples.append(value)
+            if len(samples) >= n_samples:
+                break
+    return samples
+
+
+def get_decode_time(func, values: List[bytes]) -> float:
+    # Mean decoding time of the values in microseconds
+    start = perf_counter()
+    for value in values:
+        func(value)
+    return (perf_counter() - start) / max(1, len(values)) * 1e6
+
+
+def get_column_codec(db: FReadDB, db_name: str) -> ValueCodec:
+    codec = db.value_codecs.get(db_name)
+    if codec is None:
+        codec = ValueCodec(db.db_schema[db_name].get_value_args())
+    return codec
+
+
+def set_column_codec(db: FReadDB, db_name: str, codec: ValueCodec):
+    if db_name not in db.value_codecs:
+        db.db_schema[db_name] = get_raw_spec(db.db_schema[db_name])
+    db.value_codecs[db_name] = codec
+    save_value_codecs(db, db.value_codecs)
+    bind_value_codecs(db)
+
+
+def convert_columns(
+    db: FReadDB,
+    columns: List[str],
+    max_keys: int = cf.BINARY_MAX_KEYS,
+    n_samples: int = cf.ZSTD_DICT_SAMPLES,
+    dry_run: bool = False,
+    print_status: bool = True,
+) -> Dict[str, Dict]:
+    """
+    Convert the values of the columns to the binary codec. The key table of a
+    column is its most frequent string keys (max_keys). Returns the size and the
+    decoding latency of each column, in the DBSpec and binary formats, measured on
+    sampled values (dry_run: report only, the column is not rewritten). Columns
+    are converted once they are built, before zstd compression.
+    """
+    db.save_buff()
+    report = dict()
+    for db_name in columns:
+        if db_name in db.value_codecs:
+            iw.print_status(f"{db_name}: values are already converted", print_status)
+            continue
+        value_args = db.db_schema[db_name].get_value_args()
+        if value_args["bytes_value"] not in {ToBytes.OBJ, ToBytes.PICKLE}:
+            iw.print_status(f"{db_name}: values are not objects", print_status)
+            continue
+
+        def iter_values():
+            for batch in iter_raw_items(db, db_name):
+                for _, value in batch:
+                    yield deserialize_value(value, **value_args)
+
+        codec = ValueCodec(value_args, keys=get_key_table(iter_values(), max_keys))
+        samples = sample_values(db, db_name, n_samples)
+        converted = [codec.dumps(deserialize_value(v, **value_args)) for v in samples]
+        stats = {
+            "items": db.get_number_items_from(db_name),
+            "samples": len(samples),
+            "keys": len(codec.binary.keys),
+            "sample_size": sum(len(value) for value in samples),
+            "sample_size_binary": sum(len(value) for value in converted),
+            "decode_us": get_decode_time(
+                lambda value: deserialize_value(value, **value_args), samples
+            ),
+            "decode_us_binary": get_decode_time(codec.loads, converted),
+        }
+        report[db_name] = stats
+        iw.print_status(
+            f"{db_name}: {stats['sample_size'] / max(1, len(samples)):.0f}B"
+            f" -> {stats['sample_size_binary'] / max(1, len(samples)):.0f}B"
+            f" - {stats['keys']:,} keys"
+            f" - decode {stats['decode_us']:.2f}us"
+            f" -> {stats['decode_us_binary']:.2f}us",
+            print_status,
+        )
+        if all(value[0] == MSGPACK for value in converted):
+            iw.print_status(f"{db_name}: not converted, no indexed dicts", print_status)
+            continue
+        if dry_run:
+            continue
+
+        sizes = rewrite_values(
+            db,
+            db_name,
+            lambda value: codec.dumps(deserialize_value(value, **value_args)),
+        )
+        stats["size"], stats["size_binary"] = sizes["size"], sizes["size_new"]
+        codec.stats["binary"] = stats
+        set_column_codec(db, db_name, codec)
+    return report
+
+
+def compress_columns(
+    db: FReadDB,
+    columns: List[str],
+    level: int = cf.ZSTD_LEVEL,
+    dict_size: int = cf.ZSTD_DICT_SIZE,
+    n_samples: int = cf.ZSTD_DICT_SAMPLES,
+    dry_run: bool = False,
+    print_status: bool = True,
+) -> Dict[str, Dict]:
+    """
+    Compress the values of the columns with a zstd dictionary trained on a sample of
+    their values. Returns the size and decoding latency of each column, before and
+    after compression, measured on the sample (dry_run: report only, the column is
+    not rewritten). Columns are compressed once they are built, values added later
+    are compressed with the dictionary of the column.
+    """
+    db.save_buff()
+    report = dict()
+    for db_name in columns:
+        codec = get_column_codec(db, db_name)
+        if codec.dict_data is not None:
+            iw.print_status(f"{db_name}: values are already compressed", print_status)
+            continue
+
+        samples = sample_values(db, db_name, n_samples)
+        try:
+            dict_data = zstd.train_dictionary(dict_size, samples, level=level)
+        except zstd.ZstdError as message:
+            iw.print_status(f"{db_name}: {message}", print_status)
+            continue
+        decode_us = get_decode_time(codec.decode, samples)
+        codec = ValueCodec(
+            codec.value_args,
+            keys=codec.binary.keys if codec.binary is not None else None,
+            dict_data=dict_data.as_bytes(),
+            level=level,
+            stats=dict(codec.stats),
+        )
+        compressed = [codec.compress(value) for value in samples]
+        compressor = zstd.ZstdCompressor(
+            compression_params=get_compression_params(level)
+        )
+        size_no_dict = sum(len(compressor.compress(value)) for value in samples)
+
+        stats = {
+            "items": db.get_number_items_from(db_name),
+            "samples": len(samples),
+            "dict_size": len(dict_data),
+            "sample_size": sum(len(value) for value in samples),
+            "sample_size_zstd": sum(len(value) for value in compressed),
+            "sample_size_zstd_no_dict": size_no_dict,
+            "decode_us": decode_us,
+            "decode_us_zstd": get_decode_time(codec.decode, compressed),
+        }
+        report[db_name] = stats
+        if print_status:
+            ratio = stats["sample_size"] / max(1, stats["sample_size_zstd"])
+            ratio_no_dict = stats["sample_size"] / max(1, size_no_dict)
+            iw.print_status(
+                f"{db_name}: {ratio:.2f}x (no dict: {ratio_no_dict:.2f}x)"
+                f" - dict {iw.get_size_obj(stats['dict_size'])}"
+                f" - decode {stats['decode_us']:.2f}us"
+                f" -> {stats['decode_us_zstd']:.2f}us"
+            )
+        if stats["sample_size_zstd"] >= stats["sample_size"]:
+            iw.print_status(f"{db_name}: not compressed, no size gain", print_status)
+            continue
+        if dry_run:
+            continue
+
+        sizes = rewrite_values(db, db_name, codec.compress)
+        stats["size"], stats["size_zstd"] = sizes["size"], sizes["size_new"]
+        codec.stats["zstd"] = stats
+        set_column_codec(db, db_name, codec)
+    return report
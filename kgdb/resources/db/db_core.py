@@ -2,11 +2,20 @@ import gc
 import sys
 from collections.abc import Iterable
 from numbers import Number
-from typing import Any, List, Optional, Union
+from time import perf_counter
+from typing import Any, Hashable, List, Optional, Union
 
 from freaddb.db_lmdb import DBSpec, FReadDB, serialize_value
 
 from kgdb.config import config as cf
+from kgdb.resources.db.db_codecs import (
+    bind_value_codecs,
+    compress_columns,
+    convert_columns,
+    encode_column_value,
+    load_value_codecs,
+)
+from kgdb.resources.db.db_stats import disable_stats, enable_stats
 from kgdb.utils import io_worker as iw
 
 ID_LID = "ID_LID"
@@ -24,6 +33,7 @@ class DBCore(FReadDB):
         buff_limit: int = cf.BUFF_LIMIT,
         map_size: int = cf.SIZE_1GB,
         split_subdatabases: bool = True,
+        db_stats: Optional[bool] = None,
     ):
         super().__init__(
             db_file=db_file,
@@ -37,6 +47,80 @@ class DBCore(FReadDB):
         self.buff_lid = dict()
         self.buff_size_lid = 0
 
+        # Columns converted to the binary codec or compressed with zstd, see db_codecs
+        self.value_codecs = load_value_codecs(self)
+        bind_value_codecs(self)
+
+        # Per-column access counters, see db_stats
+        self.db_stats = None
+        if cf.DB_STATS if db_stats is None else db_stats:
+            self.enable_stats()
+
+    def enable_stats(self):
+        return enable_stats(self)
+
+    def disable_stats(self):
+        disable_stats(self)
+        bind_value_codecs(self)
+
+    def stats(self, pretty: bool = True, head: int = 1, access_only: bool = False):
+        # Database stats of FReadDB, and the access counters if they are enabled
+        results = {} if access_only else super().stats(pretty=pretty, head=head)
+        if self.db_stats is not None:
+            results["access"] = self.db_stats.snapshot()
+        if self.value_codecs and not access_only:
+            results["value_codecs"] = {
+                db_name: codec.stats for db_name, codec in self.value_codecs.items()
+            }
+        return results
+
+    def stats_prometheus(self) -> str:
+        if self.db_stats is None:
+            return ""
+        return self.db_stats.to_prometheus()
+
+    def compress(
+        self,
+        print_status: bool = True,
+        zstd_columns: Optional[List[str]] = None,
+        binary_columns: Optional[List[str]] = None,
+    ):
+        """
+        Compact the LMDB files. binary_columns: the values of these columns are first
+        converted to the binary codec (db_codecs.convert_columns), zstd_columns: then
+        compressed with trained zstd dictionaries (db_codecs.compress_columns)
+        """
+        if binary_columns:
+            convert_columns(self, binary_columns, print_status=print_status)
+        if zstd_columns:
+            compress_columns(self, zstd_columns, print_status=print_status)
+        super().compress(print_status=print_status)
+
+    def get_value_field(self, db_name: str, key_obj: Any, field: Hashable) -> Any:
+        """
+        get_value(db_name, key_obj).get(field) of the dict values. In the binary
+        columns, only the value of the field is decoded.
+        """
+        codec = self.value_codecs.get(db_name)
+        if codec is None:
+            responds = self.get_value(db_name, key_obj)
+            return responds.get(field) if isinstance(responds, dict) else None
+
+        start = perf_counter()
+        responds = FReadDB.get_value(self, db_name, key_obj)
+        found = responds is not None
+        if found:
+            responds = codec.decode_field(responds, field)
+        if self.db_stats is not None:
+            self.db_stats.add(
+                db_name,
+                gets=1,
+                keys=1,
+                found=int(found),
+                read_time=perf_counter() - start,
+            )
+        return responds
+
     def save_buff_lid(self):
         for k, v in self.buff_lid.items():
             # add back lid to db
@@ -51,6 +135,8 @@ class DBCore(FReadDB):
     def get_lid(self, db_id: Any, create_new=False) -> int:
         # Check buff
         if db_id in self.buff_lid:
+            if self.db_stats is not None:
+                self.db_stats.add(ID_LID, cache_hits=1)
             return self.buff_lid[db_id]
 
         # Check db
@@ -82,6 +168,8 @@ class DBCore(FReadDB):
             return None
         # check buff
         if LID_ID in self.buff and lid in self.buff[LID_ID]:
+            if self.db_stats is not None:
+                self.db_stats.add(LID_ID, cache_hits=1)
             return self.buff[LID_ID]
 
         # check db
@@ -110,7 +198,9 @@ class DBCore(FReadDB):
             else:
                 value = self.get_lid(value, create_new=True)
 
-        if is_serialize_value:
+        if db_name in self.value_codecs:
+            value = encode_column_value(self, db_name, value, is_serialize_value)
+        elif is_serialize_value:
             value = serialize_value(value, **self.db_schema[db_name].get_value_args())
 
         if key and value:
@@ -148,6 +238,8 @@ class DBCore(FReadDB):
         results = self.get_value(db_name, key)
         if results is None and get_redirect:
             # Try redirect item
+            if self.db_stats is not None:
+                self.db_stats.add(db_name, redirect_fallbacks=1)
             try:
                 if isinstance(key, tuple):
                     key_redirect = tuple(
@@ -203,6 +295,8 @@ class DBCore(FReadDB):
 
         if iter_items is None and get_redirect:
             # Try redirect item
+            if self.db_stats is not None:
+                self.db_stats.add(db_name, redirect_fallbacks=1)
             try:
                 if isinstance(key, tuple):
                     key_redirect = tuple(
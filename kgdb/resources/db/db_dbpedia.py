@@ -2,24 +2,38 @@ import datetime
 import gc
 import json
 import numbers
+import os
 import re
+import tempfile
 import urllib
 from collections import defaultdict
+from contextlib import closing
 from enum import Enum
+from itertools import islice
+from multiprocessing import Pool
 from pickle import encode_long
 from typing import Any, List, Optional, Union
 
-import rdflib
 from freaddb.db_lmdb import DBSpec, ToBytes
-from rdflib import BNode, Literal, URIRef
-from rdflib.namespace import Namespace, NamespaceManager
-from rdflib.util import from_n3
 from tqdm import tqdm
 
 from kgdb.config import config as cf
 from kgdb.resources.db.db_core import DBCore
-from kgdb.resources.db.utils import is_wikidata_item
+from kgdb.resources.db.utils import (
+    ExternalGroupBy,
+    is_wikidata_item,
+    merge_runs,
+    union_sets,
+)
 from kgdb.utils import io_worker as iw
+from kgdb.utils.ntriples import (
+    get_iri,
+    get_object_text,
+    iter_triples,
+    parse_literal,
+    remove_iri_prefix,
+    to_text,
+)
 
 
 def clean_text_brackets(text) -> str:
@@ -45,40 +59,6 @@ def clean_text_brackets(text) -> str:
     return text
 
 
-def remove_prefix(ns):
-    for prefix in cf.PREFIX_LIST:
-        ns = ns.replace(prefix, "")
-    return ns
-
-
-def norm_namespace(ns, is_remove_prefix: bool = True):
-    if ns[0] == "<" and ns[-1] == ">":
-        ns = ns[1:-1]
-    if is_remove_prefix:
-        ns = remove_prefix(ns)
-    return ns
-
-
-def parse_triple_line(line, remove_prefix: bool = True):
-    if isinstance(line, (bytes, bytearray)):
-        line = line.decode(cf.ENCODING)
-    triple = line.split(" ", 2)
-    # if len(triple) < 2 or len(triple) > 5 \
-    #         or not (len(triple) == 4 and triple[-1] == "."):
-    #     return None
-
-    tail = triple[2].replace("\n", "")
-    tail = tail.strip()
-    if tail[-1] == ".":
-        tail = tail[:-1]
-    tail = tail.strip()
-
-    head = norm_namespace(triple[0], remove_prefix)
-    prop = norm_namespace(triple[1], remove_prefix)
-    tail = norm_namespace(tail, remove_prefix)
-    return head, prop, tail
-
-
 def norm_wikipedia_title(title, unquote=False):
     if not title or not len(title):
         return title
@@ -91,95 +71,6 @@ def norm_wikipedia_title(title, unquote=False):
     return title
 
 
-def from_n3_fix(obj):
-    try:
-        obj = from_n3_fix_unicodeescape(obj)
-    except KeyError:
-        obj = str(obj)
-    except Exception as message:
-        iw.print_status(message)  # type: ignore
-    return obj
-
-
-def from_n3_fix_unicodeescape(s: str, default=None, backend=None, nsm=None):
-    """
-    Try not use this in the orignial code of rdflib
-    value.encode("raw-unicode-escape").decode("unicode-escape")
-
-    :param s:
-    :type s:
-    :param default:
-    :type default:
-    :param backend:
-    :type backend:
-    :param nsm:
-    :type nsm:
-    :return:
-    :rtype:
-    """
-    if not s:
-        return default
-    if s.startswith("<"):
-        # Hack: this should correctly handle strings with either native unicode
-        # characters, or \u1234 unicode escapes.
-        return URIRef(s[1:-1].encode("raw-unicode-escape").decode("unicode-escape"))
-    elif s.startswith('"'):
-        if s.startswith('"""'):
-            quotes = '"""'
-        else:
-            quotes = '"'
-        value, rest = s.rsplit(quotes, 1)
-        value = value[len(quotes) :]  # strip leading quotes
-        datatype = None
-        language = None
-
-        # as a given datatype overrules lang-tag check for it first
-        dtoffset = rest.rfind("^^")
-        if dtoffset >= 0:
-            # found a data type
-            # data type has to come after lang-tag so ignore everything before
-            # see: http://www.w3.org/TR/2011/WD-turtle-20110809/
-            # #prod-turtle2-RDFLiteral
-            datatype = from_n3(rest[dtoffset + 2 :], default, backend, nsm)
-        else:
-            if rest.startswith("@"):
-                language = rest[1:]  # strip leading at sign
-
-        value = value.replace(r"\"", '"')
-        # unicode-escape interprets \xhh as an escape sequence,
-        # but n3 does not define it as such.
-        value = value.replace(r"\x", r"\\x")
-        # Hack: this should correctly handle strings with either native unicode
-        # characters, or \u1234 unicode escapes.
-        try:
-            value = value.encode("raw-unicode-escape").decode("unicode-escape")
-        except UnicodeDecodeError:
-            value = str(value)
-
-        return Literal(value, language, datatype)  # type: ignore
-    elif s == "true" or s == "false":
-        return Literal(s == "true")
-    elif s.isdigit():
-        return Literal(int(s))
-    elif s.startswith("{"):
-        identifier = from_n3(s[1:-1])
-        return rdflib.graph.QuotedGraph(backend, identifier)  # type: ignore
-    elif s.startswith("["):
-        identifier = from_n3(s[1:-1])
-        return rdflib.graph.Graph(backend, identifier)  # type: ignore
-    elif s.startswith("_:"):
-        return BNode(s[2:])
-    elif ":" in s:
-        if nsm is None:
-            # instantiate default NamespaceManager and rely on its defaults
-            nsm = NamespaceManager(rdflib.graph.Graph())  # type: ignore
-        prefix, last_part = s.split(":", 1)
-        ns = dict(nsm.namespaces())[prefix]
-        return Namespace(ns)[last_part]
-    else:
-        return BNode(s)
-
-
 class COLUMN(Enum):
     ID_LID = "ID_LID"
     LID_ID = "LID_ID"
@@ -233,6 +124,202 @@ DBDP_SCHEMA = {
 }
 
 
+# Languages of the DBpedia label dumps of English resources
+DP_LABEL_LANGS = [
+    "ar",
+    "ca",
+    "cs",
+    "de",
+    "el",
+    "eo",
+    "es",
+    "eu",
+    "fr",
+    "ga",
+    "id",
+    "it",
+    "ja",
+    "ko",
+    "nl",
+    "pl",
+    "pt",
+    "ru",
+    "sv",
+    "uk",
+    "zh",
+]
+
+
+def get_dump_labels_lang(lang: str) -> str:
+    return f"{cf.DIR_DUMPS_DP}/labels_lang={lang}_uris=en.ttl.bz2"
+
+
+def iter_ttl_1_1(file: str, tail_is_item: bool = False):
+    """
+    (title, value) of the DBpedia resources of a dump file, values are titles if
+    tail_is_item, else the text of the objects
+    """
+    for dp_title, _, dp_value in iter_triples(file, subject_prefix=cf.DBR):
+        dp_title = norm_wikipedia_title(dp_title[len(cf.DBR) :], unquote=True)
+        if not dp_title:
+            continue
+        dp_value = get_object_text(dp_value)
+        if tail_is_item:
+            dp_value = norm_wikipedia_title(dp_value, unquote=True)
+        if dp_value:
+            yield dp_title, dp_value
+
+
+def iter_ttl_1_n(file: str):
+    """
+    (title, class) of the DBpedia resources of a dump file, class redirects are not
+    resolved
+    """
+    for dp_title, _, dp_obj in iter_triples(file, subject_prefix=cf.DBR):
+        dp_obj = get_iri(dp_obj)
+        #  Only get DBpedia classes
+        if not dp_obj or not (dp_obj.startswith(cf.DBO) or dp_obj.startswith(cf.DBR)):
+            continue
+        dp_title = norm_wikipedia_title(dp_title[len(cf.DBR) :], unquote=True)
+        if not dp_title:
+            continue
+        dp_obj = norm_wikipedia_title(remove_iri_prefix(dp_obj), unquote=True)
+        if dp_obj:
+            yield dp_title, dp_obj
+
+
+def iter_facts_entities(file: str, prop_prefix: Optional[str] = None):
+    """
+    (title, property, title) of the facts between DBpedia resources, properties of
+    prop_prefix only if it is given. Redirects are not resolved.
+    """
+    for dp_title, dp_prop, dp_value in iter_triples(file, subject_prefix=cf.DBR):
+        dp_value = get_iri(dp_value)
+        if not dp_value or not dp_value.startswith(cf.DBR):
+            continue
+        if prop_prefix:
+            if not dp_prop.startswith(prop_prefix):
+                continue
+            dp_prop = dp_prop[len(prop_prefix) :]
+        else:
+            dp_prop = remove_iri_prefix(dp_prop)
+        dp_title = norm_wikipedia_title(dp_title[len(cf.DBR) :], unquote=True)
+        dp_value = norm_wikipedia_title(dp_value[len(cf.DBR) :], unquote=True)
+        if dp_title and dp_value:
+            yield dp_title, dp_prop, dp_value
+
+
+def get_literal_facts(dp_value: Any):
+    """
+    (column name, value) of a literal value (parse_literal). Strings keep the text
+    of every literal, empty values and zeros are not stored.
+    """
+    if not dp_value:
+        return []
+    responds = [(COLUMN.CLAIMS_STR.value, to_text(dp_value))]
+    if isinstance(dp_value, datetime.date):
+        responds.append((COLUMN.CLAIMS_TIME.value, str(dp_value)))
+    elif isinstance(dp_value, numbers.Number):
+        responds.append((COLUMN.CLAIMS_QUANTITY.value, dp_value))
+    else:
+        tmp = clean_text_brackets(dp_value)
+        if tmp:
+            responds.append((COLUMN.CLAIMS_STR.value, tmp))
+    return responds
+
+
+def iter_facts_literals(file: str):
+    """
+    (column name, title, property, value) of the literal facts of a dump file
+    """
+    for dp_title, dp_prop, dp_value in iter_triples(file, subject_prefix=cf.DBR):
+        dp_title = norm_wikipedia_title(dp_title[len(cf.DBR) :], unquote=True)
+        if not dp_title:
+            continue
+        dp_prop = remove_iri_prefix(dp_prop)
+        for column_name, value in get_literal_facts(parse_literal(dp_value)):
+            yield column_name, dp_title, dp_prop, value
+
+
+# Columns of build_information_parallel: (values are sets, encode values, resolve
+# value redirects). Keys are always encoded.
+INFORMATION_COLUMNS = {
+    COLUMN.LABEL.value: (False, True, False),
+    COLUMN.DESC.value: (False, False, False),
+    COLUMN.TYPES_SPECIFIC.value: (False, True, False),
+    COLUMN.TYPES_TRANSITIVE.value: (True, True, True),
+    COLUMN.CLAIMS_ENT.value: (True, True, True),
+    COLUMN.CLAIMS_STR.value: (True, False, False),
+    COLUMN.CLAIMS_TIME.value: (True, False, False),
+    COLUMN.CLAIMS_QUANTITY.value: (True, False, False),
+    COLUMN.ALIASES_ALL.value: (True, True, False),
+}
+
+
+def get_information_tasks():
+    # (column name, records function, dump file, arguments). Column name None: the
+    # records start with their column names
+    tasks = [
+        (COLUMN.LABEL.value, iter_ttl_1_1, cf.DIR_DUMP_DP_LABELS, {}),
+        (COLUMN.DESC.value, iter_ttl_1_1, cf.DIR_DUMP_DP_DESC, {}),
+        (COLUMN.TYPES_SPECIFIC.value, iter_ttl_1_1, cf.DIR_DUMP_DP_TYPES_SPECIFIC, {}),
+        (
+            COLUMN.TYPES_TRANSITIVE.value,
+            iter_ttl_1_n,
+            cf.DIR_DUMP_DP_TYPES_TRANSITIVE,
+            {},
+        ),
+        (COLUMN.CLAIMS_ENT.value, iter_facts_entities, cf.DIR_DUMP_DP_INFOBOX, {}),
+        (
+            COLUMN.CLAIMS_ENT.value,
+            iter_facts_entities,
+            cf.DIR_DUMP_DP_OBJECTS,
+            {"prop_prefix": cf.DBO},
+        ),
+        (None, iter_facts_literals, cf.DIR_DUMP_DP_LITERALS, {}),
+    ]
+    for lang in DP_LABEL_LANGS:
+        tasks.append(
+            (COLUMN.ALIASES_ALL.value, iter_ttl_1_1, get_dump_labels_lang(lang), {})
+        )
+    return tasks
+
+
+def parse_dump_task(args):
+    """
+    Worker: parse a DBpedia dump file, and spill its (key, value) records grouped
+    and sorted by key to run files of each column: {column name: [run files]}.
+    The names (titles, properties, entity values) of the records are spilled
+    sorted and de-duplicated to name runs of (name, None) items.
+    Return the column runs and the name runs.
+    """
+    column_name, func, file, kwargs, run_prefix = args
+    groups = dict()
+    names = ExternalGroupBy(is_set=False, run_prefix=f"{run_prefix}_names")
+    for record in func(file, **kwargs):
+        column_i = column_name
+        if column_i is None:
+            column_i, *record = record
+        if len(record) == 3:
+            key, value = (record[0], record[1]), record[2]
+        else:
+            key, value = record
+        group = groups.get(column_i)
+        if group is None:
+            group = groups[column_i] = ExternalGroupBy(
+                is_set=INFORMATION_COLUMNS[column_i][0],
+                run_prefix=f"{run_prefix}_{column_i}",
+            )
+        group.add(key, value)
+
+        for name in key if isinstance(key, tuple) else [key]:
+            names.add(name, None)
+        if INFORMATION_COLUMNS[column_i][1]:
+            names.add(value, None)
+    column_runs = {column_i: group.get_runs() for column_i, group in groups.items()}
+    return column_runs, names.get_runs()
+
+
 class DBDBpedia(DBCore):
     def __init__(
         self,
@@ -321,19 +408,15 @@ class DBDBpedia(DBCore):
         from kgdb.resources.db.db_wikipedia import DBWikipedia
 
         dbwp = DBWikipedia(readonly=True)
-        for line in tqdm(
-            iw.read_line_from_file(cf.DIR_DUMP_DP_WP),
+        for wp_title, dp_prop, dp_title in tqdm(
+            iter_triples(cf.DIR_DUMP_DP_WP),
             desc="Mapping DBpedia title -> Wikipedia title",
             mininterval=2,
         ):
-            respond = parse_triple_line(line)
-            if not respond:
-                continue
-            wp_title, dp_prop, dp_title = respond
-            if dp_prop != "isPrimaryTopicOf":
+            if remove_iri_prefix(dp_prop) != "isPrimaryTopicOf":
                 continue
-            wp_title = norm_wikipedia_title(wp_title, unquote=True)
-            dp_title = norm_wikipedia_title(dp_title, unquote=True)
+            wp_title = norm_wikipedia_title(remove_iri_prefix(wp_title), unquote=True)
+            dp_title = norm_wikipedia_title(get_object_text(dp_title), unquote=True)
             if wp_title and dp_title:
                 wp_title = dbwp.get_redirect(wp_title)
                 self.add_buff_with_lid(
@@ -345,17 +428,16 @@ class DBDBpedia(DBCore):
         from kgdb.resources.db.db_wikidata import DBWikidata
 
         dbwd = DBWikidata(readonly=True)
-        for line in tqdm(
-            iw.read_line_from_file(cf.DIR_DUMP_DP_WD),
+        for dp_title, _, wd_id in tqdm(
+            iter_triples(cf.DIR_DUMP_DP_WD),
             desc="Mapping DBpedia classes, properties -> Wikidata ID",
             mininterval=2,
         ):
-            respond = parse_triple_line(line)
-            if not respond or "wikidata" not in line:
+            wd_id = get_iri(wd_id)
+            if not wd_id or not wd_id.startswith(cf.WD):
                 continue
-            dp_title, _, wd_id = respond
-            dp_title = norm_wikipedia_title(dp_title, unquote=True)
-            wd_id = remove_prefix(wd_id)
+            dp_title = norm_wikipedia_title(remove_iri_prefix(dp_title), unquote=True)
+            wd_id = wd_id[len(cf.WD) :]
 
             if wd_id and dp_title and is_wikidata_item(wd_id):
 
@@ -381,39 +463,23 @@ class DBDBpedia(DBCore):
         """
         Parse DBpedia dump file as subject - predicate - object: 1 - 1 relation
         """
-        buff_objs_inv = defaultdict(set)
+        buff_objs_inv = ExternalGroupBy()
         p_bar = tqdm(desc=self.update_desc(column_name, message), mininterval=3)
 
-        for i, line in enumerate(iw.read_line_from_file(file)):
+        for i, (dp_title, dp_value) in enumerate(iter_ttl_1_1(file, tail_is_item)):
             if i and i % step == 0:
                 p_bar.update(step)
                 p_bar.set_description(self.update_desc(column_name, message))
-                # break
-
-            if "dbpedia" not in str(line):
-                continue
-
-            respond = parse_triple_line(line)
-            if not respond:
-                continue
 
-            dp_title, _, dp_value = respond
-            dp_title = norm_wikipedia_title(dp_title, unquote=True)
-            if dp_title:
-                if tail_is_item:
-                    dp_value = norm_wikipedia_title(dp_value, unquote=True)
-                else:
-                    dp_value = str(from_n3_fix(dp_value))
-                if dp_value:
-                    if column_name_inv:
-                        buff_objs_inv[dp_value].add(dp_title)
-                    self.add_buff_with_lid(
-                        column_name,
-                        dp_title,
-                        dp_value,
-                        encode_key=encode_key,
-                        encode_value=encode_value,
-                    )
+            if column_name_inv:
+                buff_objs_inv.add(dp_value, dp_title)
+            self.add_buff_with_lid(
+                column_name,
+                dp_title,
+                dp_value,
+                encode_key=encode_key,
+                encode_value=encode_value,
+            )
         p_bar.close()
 
         if column_name_inv:
@@ -425,6 +491,7 @@ class DBDBpedia(DBCore):
                     encode_key=encode_key_inv,
                     encode_value=encode_value_inv,
                 )
+        buff_objs_inv.close()
         self.save_buff_lid()
 
     def _parse_ttl_1_n(
@@ -437,36 +504,14 @@ class DBDBpedia(DBCore):
         step=10000,
     ):
         p_bar = tqdm(self.update_desc(column_name, message))
-        db_n = defaultdict(set)
-        for i, line in enumerate(iw.read_line_from_file(file)):
+        db_n = ExternalGroupBy()
+        for i, (dp_title, dp_obj) in enumerate(iter_ttl_1_n(file)):
             if i and i % step == 0:
                 p_bar.update(step)
 
-            if "dbpedia" not in str(line):
-                continue
-
-            respond = parse_triple_line(line, remove_prefix=False)
-            if not respond:
-                continue
-
-            dp_title, _, dp_obj = respond
-            if dp_title and dp_obj and cf.DBR in dp_title:
-                dp_title = dp_title.replace(cf.DBR, "")
-                dp_title = norm_wikipedia_title(dp_title, unquote=True)
-                if not dp_title:
-                    continue
-
-                #  Only get DBpedia classes
-                if cf.DBO in dp_obj or cf.DBR in dp_obj:
-                    dp_obj = dp_obj.replace(cf.DBO, "")
-                    dp_obj = dp_obj.replace(cf.DBR, "")
-                    dp_obj = norm_wikipedia_title(dp_obj, unquote=True)
-                    dp_obj = self.get_redirect(dp_obj)
-                    if dp_obj:
-                        db_n[dp_title].add(dp_obj)
-
-                # elif cf.WD in dp_obj:
-                #     dp_obj = dp_obj.replace(cf.WD, "")
+            dp_obj = self.get_redirect(dp_obj)
+            if dp_obj:
+                db_n.add(dp_title, dp_obj)
 
         for i, (k, v) in enumerate(db_n.items()):
             if i and i % step == 0:
@@ -481,33 +526,20 @@ class DBDBpedia(DBCore):
                 encode_value=encode_value,
             )
         p_bar.close()
+        db_n.close()
         self.save_buff_lid()
 
     def _parse_aliases(self, step=10000):
-        buff_obj = defaultdict(set)
+        buff_obj = ExternalGroupBy()
         disambiguation_aliases = defaultdict(set)
-        for i, line in tqdm(
-            enumerate(iw.read_line_from_file(cf.DIR_DUMP_DP_DISAMBIGUATION)),
+        for dp_title, dp_value in tqdm(
+            iter_ttl_1_1(cf.DIR_DUMP_DP_DISAMBIGUATION, tail_is_item=True),
             desc="DBpedia Disambiguation",
             mininterval=3,
         ):
-            # if i and i % step == 0:
-            #     break
-            if "dbpedia" not in str(line):
-                continue
-
-            respond = parse_triple_line(line)
-            if not respond:
-                continue
-            dp_title, _, dp_value = respond
-            dp_title = norm_wikipedia_title(dp_title, unquote=True)
             dp_title = dp_title.replace("(disambiguation)", "").strip()
-
             if dp_title:
-                dp_value = str(from_n3_fix(dp_value))
-                if dp_value:
-                    dp_value = norm_wikipedia_title(dp_value, unquote=True)
-                    disambiguation_aliases[dp_value].add(dp_title)
+                disambiguation_aliases[dp_value].add(dp_title)
 
         for i, dp_title in tqdm(
             enumerate(self.get_db_iter(COLUMN.ID_LID.value, get_values=False)),
@@ -527,7 +559,7 @@ class DBDBpedia(DBCore):
                         and "(disambiguation)" not in dp_title
                     ):
                         continue
-                    buff_obj[dp_title].add(dp_label)
+                    buff_obj.add(dp_title, dp_label)
 
             redirects_of = self.get_redirect_of(dp_title)
             if redirects_of:
@@ -537,7 +569,7 @@ class DBDBpedia(DBCore):
                         and "(disambiguation)" not in dp_title
                     ):
                         continue
-                    buff_obj[dp_title].add(dp_label)
+                    buff_obj.add(dp_title, dp_label)
 
             ambiguous_labels = disambiguation_aliases.get(dp_title)
             if ambiguous_labels:
@@ -547,7 +579,7 @@ class DBDBpedia(DBCore):
                         and "(disambiguation)" not in dp_title
                     ):
                         continue
-                    buff_obj[dp_title].add(dp_label)
+                    buff_obj.add(dp_title, dp_label)
         p_bar = tqdm(self.update_desc(COLUMN.ALIASES_EN.value, "ALIASES EN"))
 
         for i, (k, v) in enumerate(buff_obj.items()):
@@ -564,50 +596,17 @@ class DBDBpedia(DBCore):
                 encode_key=True,
                 encode_value=True,
             )
+        buff_obj.close()
         self.save_buff_lid()
 
     def _parse_aliases_multilingual(self, step=10000):
-        buff_obj = defaultdict(set)
-        langs = {
-            "ar",
-            "ca",
-            "cs",
-            "de",
-            "el",
-            "eo",
-            "es",
-            "eu",
-            "fr",
-            "ga",
-            "id",
-            "it",
-            "ja",
-            "ko",
-            "nl",
-            "pl",
-            "pt",
-            "ru",
-            "sv",
-            "uk",
-            "zh",
-        }
-        for lang in langs:
-            dump_file = f"{cf.DIR_DUMPS_DP}/labels_lang={lang}_uris=en.ttl.bz2"
-            for line in tqdm(
-                iw.read_line_from_file(dump_file), desc=f"DBpedia labels: {lang}"
+        buff_obj = ExternalGroupBy()
+        for lang in DP_LABEL_LANGS:
+            for dp_title, dp_value in tqdm(
+                iter_ttl_1_1(get_dump_labels_lang(lang)),
+                desc=f"DBpedia labels: {lang}",
             ):
-                if "dbpedia" not in str(line):
-                    continue
-
-                respond = parse_triple_line(line)
-                if not respond:
-                    continue
-                dp_title, _, dp_value = respond
-                dp_title = norm_wikipedia_title(dp_title, unquote=True)
-                if dp_title:
-                    dp_value = str(from_n3_fix(dp_value))
-                    if dp_value:
-                        buff_obj[dp_title].add(dp_value)
+                buff_obj.add(dp_title, dp_value)
 
         p_bar = tqdm(self.update_desc(COLUMN.ALIASES_ALL.value, "Aliases all"))
         for i, (k, v) in enumerate(buff_obj.items()):
@@ -624,6 +623,7 @@ class DBDBpedia(DBCore):
                 encode_key=True,
                 encode_value=True,
             )
+        buff_obj.close()
         self.save_buff_lid()
 
     def _parse_facts(self, step=10000):
@@ -632,81 +632,24 @@ class DBDBpedia(DBCore):
         :return:
         :rtype:
         """
-        buff_entities = defaultdict(set)
-        buff_strings = defaultdict(set)
-        buff_times = defaultdict(set)
-        buff_quantities = defaultdict(set)
-
-        def update_literal(dp_title, dp_prop, dp_value):
-            dp_value = from_n3_fix(dp_value)
-            if dp_value and isinstance(dp_value, str):
-                buff_strings[(dp_title, dp_prop)].add(dp_value)
-            if dp_value and isinstance(dp_value, Literal):
-                if isinstance(dp_value.value, datetime.date) or isinstance(
-                    dp_value.value, datetime.datetime
-                ):
-                    buff_times[(dp_title, dp_prop)].add(str(dp_value.value))
-                elif isinstance(dp_value.value, numbers.Number):
-                    buff_quantities[(dp_title, dp_prop)].add(dp_value.value)
-                else:
-                    if not dp_value.value:
-                        dp_value = str(dp_value.toPython())
-                    else:
-                        dp_value = str(dp_value.value)
-                    tmp = clean_text_brackets(dp_value)
-                    if tmp:
-                        buff_strings[(dp_title, dp_prop)].add(tmp)
-
-        for i, line in tqdm(
-            enumerate(iw.read_line_from_file(cf.DIR_DUMP_DP_INFOBOX)),
+        buff_entities = ExternalGroupBy()
+        buff_literals = defaultdict(ExternalGroupBy)
+
+        for dp_title, dp_prop, dp_value in tqdm(
+            iter_facts_entities(cf.DIR_DUMP_DP_INFOBOX),
             desc="DBpedia infobox",
             mininterval=3,
         ):
-            # if i and i % step == 0:
-            # break
-
-            respond = parse_triple_line(line, remove_prefix=False)
-            if not respond:
-                continue
-            dp_title, dp_prop, dp_value = respond
-            if dp_title and dp_value and dp_prop and cf.DBR in dp_title:
-                dp_title = dp_title.replace(cf.DBR, "")
-                dp_title = norm_wikipedia_title(dp_title, unquote=True)
-                if not dp_title:
-                    continue
-                dp_prop = remove_prefix(dp_prop)
-                if cf.DBR not in dp_value:
-                    continue
-                dp_value = dp_value.replace(cf.DBR, "")
-                dp_value = norm_wikipedia_title(dp_value, unquote=True)
-                dp_value = self.get_redirect(dp_value)
-                if dp_title and dp_value:
-                    buff_entities[(dp_title, dp_prop)].add(dp_value)
-                else:
-                    if not dp_value:
-                        continue
-                    update_literal(dp_title, dp_prop, dp_value)
+            dp_value = self.get_redirect(dp_value)
+            if dp_value:
+                buff_entities.add((dp_title, dp_prop), dp_value)
 
-        for i, line in tqdm(
-            enumerate(iw.read_line_from_file(cf.DIR_DUMP_DP_LITERALS)),
+        for column_name, dp_title, dp_prop, dp_value in tqdm(
+            iter_facts_literals(cf.DIR_DUMP_DP_LITERALS),
             desc="DBpedia mapping literals",
             mininterval=3,
         ):
-            # if i and i % step == 0:
-            # break
-            respond = parse_triple_line(line, remove_prefix=False)
-            if not respond:
-                continue
-            dp_title, dp_prop, dp_value = respond
-            if dp_title and cf.DBR in dp_title and dp_value and dp_prop:
-                dp_title = dp_title.replace(cf.DBR, "")
-                dp_title = norm_wikipedia_title(dp_title, unquote=True)
-                if not dp_title:
-                    continue
-                dp_prop = remove_prefix(dp_prop)
-                if not dp_value:
-                    continue
-                update_literal(dp_title, dp_prop, dp_value)
+            buff_literals[column_name].add((dp_title, dp_prop), dp_value)
 
         def save_data(column_name, buff, message, encode_key=True, encode_value=True):
             p_bar = tqdm(self.update_desc(column_name, message))
@@ -722,64 +665,139 @@ class DBDBpedia(DBCore):
                     encode_value=encode_value,
                 )
             p_bar.close()
+            buff.close()
+
+        for column_name, message in [
+            (COLUMN.CLAIMS_STR.value, "Strings"),
+            (COLUMN.CLAIMS_TIME.value, "Times"),
+            (COLUMN.CLAIMS_QUANTITY.value, "Quantities"),
+        ]:
+            save_data(
+                column_name,
+                buff_literals.pop(column_name, ExternalGroupBy()),
+                message=message,
+                encode_value=False,
+            )
+            gc.collect()
 
-        save_data(
-            COLUMN.CLAIMS_STR.value,
-            buff_strings,
-            message="Strings",
-            encode_value=False,
-        )
-        del buff_strings
-        gc.collect()
-        save_data(
-            COLUMN.CLAIMS_TIME.value,
-            buff_times,
-            message="Times",
-            encode_value=False,
-        )
-        del buff_times
-        gc.collect()
-
-        save_data(
-            COLUMN.CLAIMS_QUANTITY.value,
-            buff_quantities,
-            message="Quantities",
-            encode_value=False,
-        )
-        del buff_quantities
-        gc.collect()
-
-        for i, line in tqdm(
-            enumerate(iw.read_line_from_file(cf.DIR_DUMP_DP_OBJECTS)),
+        for dp_title, dp_prop, dp_value in tqdm(
+            iter_facts_entities(cf.DIR_DUMP_DP_OBJECTS, prop_prefix=cf.DBO),
             desc="DBpedia mapping objects",
             mininterval=3,
         ):
-            # if i and i % step == 0:
-            # break
-            respond = parse_triple_line(line, remove_prefix=False)
-            if not respond:
-                continue
-            dp_title, dp_prop, dp_value = respond
-            if (
-                dp_title
-                and cf.DBR in dp_title
-                and dp_prop
-                and cf.DBO in dp_prop
-                and dp_value
-            ):
-                dp_title = dp_title.replace(cf.DBR, "")
-                dp_title = norm_wikipedia_title(dp_title, unquote=True)
-                dp_value = dp_value.replace(cf.DBR, "")
-                dp_prop = dp_prop.replace(cf.DBO, "")
-                dp_value = norm_wikipedia_title(dp_value, unquote=True)
-                dp_value = self.get_redirect(dp_value)
-                if dp_title and dp_value:
-                    buff_entities[(dp_title, dp_prop)].add(dp_value)
+            dp_value = self.get_redirect(dp_value)
+            if dp_value:
+                buff_entities.add((dp_title, dp_prop), dp_value)
 
         save_data(COLUMN.CLAIMS_ENT.value, buff_entities, message="Entities")
 
         self.save_buff_lid()
 
+    def build_information_parallel(
+        self, n_cpu: int = os.cpu_count(), tmp_dir: str = cf.DIR_TEMP
+    ):
+        """
+        build_information with the dump files parsed concurrently:
+        1. Workers parse one dump file each, and spill its records grouped and
+        sorted by key to one run file per column
+        2. Titles, properties and entity values of all runs get their LIDs in one
+        pass over the k-way merge of the name runs: new names are numbered in
+        sorted order after the existing ones
+        3. Every column is written from the k-way merge of its runs
+        The largest dump files are parsed first, the wall-clock time of the parsing
+        is bounded by the largest file.
+        """
+        iw.create_dir(tmp_dir + "/")
+        run_dir = tempfile.mkdtemp(prefix="dbpedia_", dir=tmp_dir)
+        try:
+            tasks = [
+                (column_name, func, file, kwargs, f"{run_dir}/{i}")
+                for i, (column_name, func, file, kwargs) in enumerate(
+                    get_information_tasks()
+                )
+                if os.path.exists(file)
+            ]
+            tasks.sort(key=lambda task: os.path.getsize(task[2]), reverse=True)
+
+            # 1. Parse dump files
+            runs = defaultdict(list)
+            name_runs = []
+            with closing(Pool(processes=n_cpu)) as pool:
+                for task_runs, task_name_runs in tqdm(
+                    pool.imap_unordered(parse_dump_task, tasks),
+                    total=len(tasks),
+                    desc="Parse DBpedia dumps",
+                ):
+                    for column_name, run_files in task_runs.items():
+                        runs[column_name].extend(run_files)
+                    name_runs.extend(task_name_runs)
+
+            # 2. Assign LIDs
+            self._assign_lids(name_runs)
+
+            # 3. Write columns
+            for column_name, run_files in runs.items():
+                self._write_runs(column_name, run_files)
+        finally:
+            iw.delete_folder(run_dir)
+
+        self._parse_aliases()
+        self.compress()
+
+    def _assign_lids(self, name_runs: List[str], step: int = 100_000):
+        # Sorted names of the k-way merge of the name runs, in batches
+        names = (name for name, _ in merge_runs(name_runs))
+        p_bar = tqdm(desc="Assign LIDs", mininterval=3)
+        while True:
+            batch = list(islice(names, step))
+            if not batch:
+                break
+            p_bar.update(len(batch))
+            lids = self.get_values(COLUMN.ID_LID.value, batch)
+            for name in batch:
+                if name in lids:
+                    continue
+                self.add_buff(COLUMN.ID_LID.value, name, self.max_lid_id)
+                self.add_buff(COLUMN.LID_ID.value, self.max_lid_id, name)
+                self.max_lid_id += 1
+        p_bar.close()
+        self.save_buff()
+
+    def _write_runs(self, column_name, run_files, step: int = 10_000):
+        is_set, encode_value, redirect = INFORMATION_COLUMNS[column_name]
+        items = merge_runs(run_files, union_sets if is_set else None)
+        p_bar = tqdm(desc=self.update_desc(column_name, "Write"), mininterval=3)
+        while True:
+            batch = list(islice(items, step))
+            if not batch:
+                break
+            p_bar.update(len(batch))
+            names = set()
+            for key, value in batch:
+                names.update(key if isinstance(key, tuple) else [key])
+                if encode_value:
+                    names.update(value if is_set else [value])
+            lids = self.get_values(COLUMN.ID_LID.value, list(names))
+            redirects = dict()
+            if redirect:
+                redirects = self.get_values(
+                    COLUMN.REDIRECT.value,
+                    list({lids[v] for _, value in batch for v in value}),
+                )
+            for key, value in batch:
+                if isinstance(key, tuple):
+                    key = tuple(lids[k] for k in key)
+                else:
+                    key = lids[key]
+                if encode_value and is_set:
+                    value = {lids[v] for v in value}
+                    value = sorted({redirects.get(v, v) for v in value})
+                elif encode_value:
+                    value = lids[value]
+                self.add_buff(column_name, key, value)
+        p_bar.close()
+        self.save_buff()
+
     def get_item(
         self,
         title: str,
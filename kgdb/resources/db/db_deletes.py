@@ -1,11 +1,16 @@
 import gc
+import hashlib
+import heapq
 import os
 import re
 import string
+import tempfile
 import unicodedata
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import closing
 from enum import Enum
 from itertools import combinations
+from multiprocessing import Pool
 from typing import List, Optional
 
 import ftfy
@@ -15,13 +20,17 @@ from tqdm import tqdm
 
 from kgdb.config import config as cf
 from kgdb.resources.db.db_dbpedia import DBDBpedia
-from kgdb.resources.db.db_entity_labels import DBELabel
+from kgdb.resources.db.db_entity_labels import DBELabel, norm_text
 from kgdb.resources.db.db_wikidata import DBWikidata, is_wikidata_item
 from kgdb.resources.db.db_wikipedia import DBWikipedia
+from kgdb.resources.db.utils import read_run, write_run
+from kgdb.utils import io_worker as iw
+from kgdb.utils.similarities import dis_damerau_levenshtein_bounded
 
 
 class DB_DELETE_COLUMN_NAME(Enum):
     DELETE = "DELETE"
+    DELETE_HASH = "DELETE_HASH"
 
 
 DB_E_LABEL_SCHEMA = {
@@ -31,6 +40,35 @@ DB_E_LABEL_SCHEMA = {
 }
 
 
+def get_delete_hash_column(shard_id: int) -> str:
+    return f"{DB_DELETE_COLUMN_NAME.DELETE_HASH.value}_{shard_id:03d}"
+
+
+def get_deletes_hash_schema(n_shards: int = 16) -> List[DBSpec]:
+    # One 64-bit integer key column per shard, every shard is its own LMDB file
+    return [
+        DBSpec(
+            get_delete_hash_column(shard_id),
+            integerkey=True,
+            is_64bit=True,
+            bytes_value=ToBytes.INT_BITMAP,
+        )
+        for shard_id in range(n_shards)
+    ]
+
+
+def hash_delete(delete: str) -> int:
+    # Stable 64-bit hash (the built-in hash() is salted per process)
+    return int.from_bytes(
+        hashlib.blake2b(delete.encode(cf.ENCODING), digest_size=8).digest(), "big"
+    )
+
+
+def get_delete_shard(delete_hash: int, n_shards: int) -> int:
+    # Shard by the hash prefix, so hash-sorted runs fill the shards one by one
+    return (delete_hash >> 32) * n_shards >> 32
+
+
 def delete_edits_prefix(key, max_edit_dis, prefix_length, min_len=1):
     if len(key) > prefix_length:
         key = key[:prefix_length]
@@ -43,6 +81,34 @@ def delete_edits_prefix(key, max_edit_dis, prefix_length, min_len=1):
     return combine
 
 
+def write_deletes_run(args):
+    """
+    Worker: generate the deletes of a chunk of labels, and spill the sorted
+    (delete, label_id) pairs to a run file
+    """
+    labels, max_distance, prefix_len, run_file, hashed = args
+    pairs = []
+    for label, label_id_list in labels:
+        for delete in delete_edits_prefix(label, max_distance, prefix_len):
+            if not delete or set(delete) <= {" ", ".", ",", ":"}:
+                continue
+            if hashed:
+                delete = hash_delete(delete)
+            for label_id in label_id_list:
+                pairs.append((delete, label_id))
+    pairs.sort()
+    # Pickled chunks: labels can contain any character (e.g., new lines)
+    write_run(run_file, pairs)
+    return run_file, len(pairs)
+
+
+def merge_deletes_runs(run_files, merged_file):
+    write_run(merged_file, heapq.merge(*[read_run(r) for r in run_files]))
+    for run_file in run_files:
+        iw.delete_file(run_file)
+    return merged_file
+
+
 class DBDeletes(FReadDB):
     def __init__(
         self,
@@ -54,20 +120,58 @@ class DBDeletes(FReadDB):
         buff_limit: int = cf.BUFF_LIMIT,
         create_new: bool = False,
         buff_deletes_limit=32_000_000,
+        n_hash_shards: int = 0,
     ):
+        """
+        n_hash_shards: 0 stores the raw delete strings as keys (DELETE column).
+        Otherwise, deletes are stored as 64-bit hash keys in n_hash_shards
+        files. Hash collisions only add candidates, which are verified at lookup.
+        """
         db_file = f"{cf.DIR_DATABASES}/{lang}_{max_distance}_{prefix_len}"
-        super().__init__(db_file, db_schema, read_only, buff_limit, create_new)
+        if n_hash_shards:
+            db_file += f"_h{n_hash_shards}"
+            db_schema = get_deletes_hash_schema(n_hash_shards)
+        if create_new and not read_only:
+            iw.delete_folder(db_file)
+        super().__init__(
+            db_file=db_file,
+            db_schema=db_schema,
+            readonly=read_only,
+            buff_limit=buff_limit,
+            split_subdatabases=True,
+        )
         self.lang, self.max_distance, self.prefix_len = os.path.basename(db_file).split(
             "_"
-        )
+        )[:3]
         self.max_distance = int(self.max_distance)
         self.prefix_len = int(self.prefix_len)
+        self.n_hash_shards = n_hash_shards
         self.buff_deletes = defaultdict(BitMap)
         self.buff_size_deletes = 0
         self.buff_limit_deletes = buff_deletes_limit
+        self._db_labels = None
+
+    @property
+    def db_labels(self):
+        if self._db_labels is None:
+            self._db_labels = DBELabel()
+        return self._db_labels
+
+    def get_columns(self):
+        if self.n_hash_shards:
+            return [get_delete_hash_column(i) for i in range(self.n_hash_shards)]
+        return [DB_DELETE_COLUMN_NAME.DELETE.value]
+
+    def get_delete_key(self, term: str):
+        # Return the column and the key of a delete
+        if self.n_hash_shards:
+            delete_hash = hash_delete(term)
+            shard_id = get_delete_shard(delete_hash, self.n_hash_shards)
+            return get_delete_hash_column(shard_id), delete_hash
+        return DB_DELETE_COLUMN_NAME.DELETE.value, term
 
     def size(self):
-        return self.get_column_size(DB_DELETE_COLUMN_NAME.DELETE.value) + len(
+        return sum(self.get_number_items_from(c) for c in self.get_columns()) + len(
             self.buff_deletes
         )
 
@@ -75,7 +179,12 @@ class DBDeletes(FReadDB):
         for k, v in tqdm(
             self.buff_deletes.items(), desc="Save buff", total=len(self.buff_deletes)
         ):
-            self.merge_buff(DB_DELETE_COLUMN_NAME.DELETE.value, k, v)
+            # Merge with the posting of the previous saves
+            column, key = self.get_delete_key(k)
+            posting = self.get_value(column, key)
+            if posting:
+                v |= posting
+            self.add_buff(column, key, v)
         self.save_buff()
         self.buff_deletes.clear()
         self.buff_size_deletes = 0
@@ -84,7 +193,7 @@ class DBDeletes(FReadDB):
     def add_deletes(self, term, label_id_list):
         n_deletes = delete_edits_prefix(term, self.max_distance, self.prefix_len)
         for delete in n_deletes:
-            if not delete or set(delete) in {" ", ".", ",", ":"}:
+            if not delete or set(delete) <= {" ", ".", ",", ":"}:
                 continue
             for label_id in label_id_list:
                 self.buff_deletes[delete].add(label_id)
@@ -97,10 +206,9 @@ class DBDeletes(FReadDB):
     def get_frequency(self, term: str):
         if not term:
             return 0
-        results = self.get_value(
-            DB_DELETE_COLUMN_NAME.DELETE.value,
-            term[: self.prefix_len],
-            get_memory_size=True,
+        # Byte size of the posting bitmap
+        results = self.get_value_byte_size(
+            *self.get_delete_key(term[: self.prefix_len])
         )
         if not results:
             return None
@@ -109,12 +217,75 @@ class DBDeletes(FReadDB):
     def get_posting(self, term: str):
         if not term:
             return None
-        results = self.get_value(
-            DB_DELETE_COLUMN_NAME.DELETE.value,
-            term[: self.prefix_len],
-        )
+        results = self.get_value(*self.get_delete_key(term[: self.prefix_len]))
         return results
 
+    def lookup(
+        self,
+        query: str,
+        max_distance: Optional[int] = None,
+        limit: int = 20,
+        limit_candidates: int = cf.LIMIT_SEARCH_ES * 10,
+    ):
+        """
+        SymSpell lookup: return [(label_id, distance)] of labels within max_distance
+        (Damerau-Levenshtein) of the query, ranked by distance
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        query = norm_text(query, punctuations=False)
+        if not query:
+            return []
+
+        # Delete variants of the query, cheapest postings first
+        deletes = []
+        for delete in delete_edits_prefix(query, max_distance, self.prefix_len):
+            frequency = self.get_frequency(delete)
+            if frequency:
+                deletes.append((frequency, delete))
+        deletes.sort(key=lambda x: x[0])
+
+        candidates = BitMap()
+        for _, delete in deletes:
+            if limit_candidates and len(candidates) >= limit_candidates:
+                break
+            posting = self.get_posting(delete)
+            if posting:
+                candidates |= posting
+        if not candidates:
+            return []
+
+        # Verify candidates on the decoded labels
+        responds = []
+        labels = self.db_labels.get_labels_from_lid_list(list(candidates))
+        for label_id, label in labels.items():
+            if not label:
+                continue
+            distance = dis_damerau_levenshtein_bounded(query, label, max_distance)
+            if distance > max_distance:
+                continue
+            responds.append((label_id, distance, abs(len(label) - len(query))))
+
+        responds.sort(key=lambda x: (x[1], x[2], x[0]))
+        if limit:
+            responds = responds[:limit]
+        return [(label_id, distance) for label_id, distance, _ in responds]
+
+    def search_wd(self, input_text, limit=0, lang="en", expensive=False):
+        # Same output as ESearch.search_wd: [(label, score)]
+        max_distance = self.max_distance if expensive else min(2, self.max_distance)
+        responds = self.lookup(input_text, max_distance=max_distance, limit=limit)
+        if not responds:
+            return []
+        labels = self.db_labels.get_labels_from_lid_list(
+            [label_id for label_id, _ in responds]
+        )
+        return [
+            (labels[label_id], 1 - distance / (max_distance + 1))
+            for label_id, distance in responds
+            if labels.get(label_id)
+        ]
+
     def build_from_labels(self, iter_obj, len_iter=0, step=1_000, from_i=0):
         def update_desc():
             return f"{self.lang}|{self.max_distance}|{self.prefix_len}| Deletes: {self.size():,} | buff: {self.buff_size_deletes / self.buff_limit_deletes * 100:.0f}%"
@@ -152,14 +323,150 @@ class DBDeletes(FReadDB):
         self.save_deletes_buff()
         self.save_buff()
 
+    def iter_label_groups(self, iter_obj, from_i=0, p_bar=None, step=1_000):
+        # Group label ids of labels sharing the same prefix
+        label_pre = None
+        label_id_pre = set()
+        for i, (label, label_id) in enumerate(iter_obj):
+            if i < from_i:
+                continue
+            if p_bar is not None and i and i % step == 0:
+                p_bar.update(step)
+
+            if not label or is_wikidata_item(label):
+                continue
+
+            label = label[: self.prefix_len]
+            if label != label_pre:
+                if label_id_pre:
+                    yield label_pre, label_id_pre
+                label_pre = label
+                label_id_pre = {label_id}
+            else:
+                label_id_pre.add(label_id)
 
-def build_db_deletes(lang="en", prefix_len: int = 10, max_distance: int = 4, from_i=0):
+        if label_id_pre:
+            yield label_pre, label_id_pre
+
+    def build_from_labels_parallel(
+        self,
+        iter_obj,
+        len_iter=0,
+        n_cpu: int = os.cpu_count(),
+        labels_per_run: int = 5_000,
+        merge_fan_in: int = 256,
+        tmp_dir: str = cf.DIR_TEMP,
+    ):
+        """
+        Build the DELETE column into an empty database:
+        1. Workers generate deletes of label chunks and spill sorted
+        (delete, label_id) runs to disk
+        2. Runs are k-way merged, and every delete posting is written once,
+        in key order
+        """
+        iw.create_dir(tmp_dir + "/")
+        run_dir = tempfile.mkdtemp(prefix="deletes_", dir=tmp_dir)
+
+        def iter_chunks():
+            chunk = []
+            for label_group in self.iter_label_groups(iter_obj, p_bar=p_bar):
+                chunk.append(label_group)
+                if len(chunk) >= labels_per_run:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        def iter_args():
+            for i, chunk in enumerate(iter_chunks()):
+                yield (
+                    chunk,
+                    self.max_distance,
+                    self.prefix_len,
+                    f"{run_dir}/{i}.pkl",
+                    bool(self.n_hash_shards),
+                )
+
+        # 1. Spill sorted runs
+        p_bar = tqdm(
+            desc=f"{self.lang}|{self.max_distance}|{self.prefix_len}| Runs",
+            total=len_iter,
+        )
+        run_files = []
+        n_pairs = 0
+        with closing(Pool(processes=n_cpu)) as pool:
+            # Bound the number of in-flight chunks, labels are read in this process
+            pending = deque()
+            for args in iter_args():
+                pending.append(pool.apply_async(write_deletes_run, (args,)))
+                while len(pending) > n_cpu * 2 or (pending and pending[0].ready()):
+                    run_file, run_size = pending.popleft().get()
+                    run_files.append(run_file)
+                    n_pairs += run_size
+            while pending:
+                run_file, run_size = pending.popleft().get()
+                run_files.append(run_file)
+                n_pairs += run_size
+        p_bar.close()
+
+        # 2. Merge runs until they can be opened at once
+        i_merge = 0
+        while len(run_files) > merge_fan_in:
+            merge_args = []
+            for i in range(0, len(run_files), merge_fan_in):
+                merge_args.append(
+                    (
+                        run_files[i : i + merge_fan_in],
+                        f"{run_dir}/merge_{i_merge}.pkl",
+                    )
+                )
+                i_merge += 1
+            with closing(Pool(processes=n_cpu)) as pool:
+                run_files = pool.starmap(merge_deletes_runs, merge_args)
+
+        # 3. Write final postings sequentially
+        def add_posting(delete, posting):
+            if self.n_hash_shards:
+                shard_id = get_delete_shard(delete, self.n_hash_shards)
+                self.add_buff(get_delete_hash_column(shard_id), delete, posting)
+            else:
+                self.add_buff(DB_DELETE_COLUMN_NAME.DELETE.value, delete, posting)
+
+        delete_pre = None
+        posting = BitMap()
+        for delete, label_id in tqdm(
+            heapq.merge(*[read_run(r) for r in run_files]),
+            desc="Save deletes",
+            total=n_pairs,
+            mininterval=3,
+        ):
+            if delete != delete_pre:
+                if posting:
+                    add_posting(delete_pre, posting)
+                delete_pre = delete
+                posting = BitMap()
+            posting.add(label_id)
+        if posting:
+            add_posting(delete_pre, posting)
+        self.save_buff()
+        iw.delete_folder(run_dir)
+
+
+def build_db_deletes(
+    lang="en",
+    prefix_len: int = 10,
+    max_distance: int = 4,
+    from_i=0,
+    n_cpu: int = 1,
+    n_hash_shards: int = 0,
+):
     db = DBDeletes(
         read_only=False,
         prefix_len=prefix_len,
         lang=lang,
         max_distance=max_distance,
         buff_deletes_limit=150_000_000,
+        n_hash_shards=n_hash_shards,
     )
     db.compact(update_db_size=False)
     # return
@@ -171,10 +478,17 @@ def build_db_deletes(lang="en", prefix_len: int = 10, max_distance: int = 4, fro
         iter_obj = db_labels.iter_all()
         len_iter = db_labels.size_labels_all()
 
-    db.build_from_labels(iter_obj=iter_obj, len_iter=len_iter, from_i=from_i)
+    if n_cpu > 1 and not from_i:
+        db.build_from_labels_parallel(iter_obj=iter_obj, len_iter=len_iter, n_cpu=n_cpu)
+    else:
+        db.build_from_labels(iter_obj=iter_obj, len_iter=len_iter, from_i=from_i)
 
     db.close()
     # Compact db
     db = DBDeletes(
-        read_only=False, prefix_len=prefix_len, lang=lang, max_distance=max_distance
+        read_only=False,
+        prefix_len=prefix_len,
+        lang=lang,
+        max_distance=max_distance,
+        n_hash_shards=n_hash_shards,
     )
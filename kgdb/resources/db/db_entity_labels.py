@@ -1,4 +1,5 @@
 import gc
+import os
 import re
 import string
 import unicodedata
@@ -14,8 +15,10 @@ from tqdm import tqdm
 from kgdb.config import config as cf
 from kgdb.resources.db import db_rocks
 from kgdb.resources.db.db_dbpedia import DBDBpedia
+from kgdb.resources.db.db_stats import enable_stats
 from kgdb.resources.db.db_wikidata import DBWikidata, is_wikidata_item
 from kgdb.resources.db.db_wikipedia import DBWikipedia
+from kgdb.utils import io_worker as iw
 
 
 class DB_E_LABEL_COLUMN_NAME(Enum):
@@ -107,38 +110,98 @@ class DBELabel(FReadDB):
         buff_limit: int = cf.BUFF_LIMIT,
         create_new: bool = False,
     ):
-        super().__init__(db_file, db_schema, read_only, buff_limit, create_new)
+        if create_new and not read_only:
+            iw.delete_folder(db_file)
+        super().__init__(
+            db_file=db_file,
+            db_schema=db_schema,
+            readonly=read_only,
+            buff_limit=buff_limit,
+            split_subdatabases=True,
+        )
 
         self._buff_vocab = defaultdict(int)
         self._len_vocab = self.size_vocab()
+        self.file_en_lids = f"{db_file}_en_lids.bitmap"
+        self._en_lids = None
+
+        # Per-column access counters: self.db_stats.snapshot()
+        self.db_stats = None
+        if cf.DB_STATS:
+            enable_stats(self)
+
+    def build_en_lids(self):
+        # Ids of English labels (keys of LID_WDID_LABEL_EN_RANK)
+        en_lids = BitMap(
+            tqdm(
+                self.get_db_iter(
+                    DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value,
+                    get_values=False,
+                ),
+                total=self.size_labels_en(),
+                desc="Build English label ids",
+            )
+        )
+        with open(self.file_en_lids, "wb") as f:
+            f.write(en_lids.serialize())
+        self._en_lids = en_lids
+        return en_lids
+
+    def get_en_lids(self) -> BitMap:
+        if self._en_lids is None:
+            if os.path.exists(self.file_en_lids):
+                with open(self.file_en_lids, "rb") as f:
+                    self._en_lids = BitMap.deserialize(f.read())
+            else:
+                self.build_en_lids()
+        return self._en_lids
 
     def iter_en(self, from_i=0):
+        en_lids = self.get_en_lids()
         i = -1
-        for k, v in self.iter_db(DB_E_LABEL_COLUMN_NAME.LABEL_LID.value):
-            if self.is_available(
-                DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value, v
-            ):
+        for k, v in self.get_db_iter(DB_E_LABEL_COLUMN_NAME.LABEL_LID.value):
+            if v in en_lids:
                 i += 1
                 if i < from_i:
                     continue
                 yield k, v
 
+    def iter_labels(self, lang: str = "en", from_lid: int = 0):
+        # Iterate (label, lid) in the lid order, resume directly from from_lid
+        en_lids = self.get_en_lids() if lang == "en" else None
+        for k, v in self.get_iter_integerkey(
+            DB_E_LABEL_COLUMN_NAME.LID_LABEL.value, from_i=from_lid
+        ):
+            if en_lids is not None and k not in en_lids:
+                continue
+            yield v, k
+
+    def size_labels(self, lang: str = "en", from_lid: int = 0):
+        if lang == "en":
+            en_lids = self.get_en_lids()
+            if from_lid:
+                return len(en_lids) - en_lids.rank(from_lid - 1)
+            return len(en_lids)
+        return max(self.size_vocab() - from_lid, 0)
+
     def iter_all(self, from_i=0):
         for i, (k, v) in enumerate(
-            self.iter_db(DB_E_LABEL_COLUMN_NAME.LABEL_LID.value)
+            self.get_db_iter(DB_E_LABEL_COLUMN_NAME.LABEL_LID.value)
         ):
             if i < from_i:
                 continue
             yield k, v
 
     def size_vocab(self):
-        return self.get_column_size(DB_E_LABEL_COLUMN_NAME.LID_LABEL.value)
+        return self.get_number_items_from(DB_E_LABEL_COLUMN_NAME.LID_LABEL.value)
 
     def size_labels_en(self):
-        return self.get_column_size(DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value)
+        return self.get_number_items_from(
+            DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value
+        )
 
     def size_labels_all(self):
-        return self.get_column_size(
+        return self.get_number_items_from(
             DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_ALL_RANK.value
         )
 
@@ -178,6 +241,29 @@ class DBELabel(FReadDB):
         else:
             return lid
 
+    def get_lids(self, labels: List[str]):
+        # Batch version of get_lid(label): {label: lid}
+        labels_ = {
+            label: list(
+                {
+                    norm_text(label, punctuations=True),
+                    norm_text(label, punctuations=False),
+                }
+            )
+            for label in labels
+        }
+        lids = self.get_values(
+            DB_E_LABEL_COLUMN_NAME.LABEL_LID.value,
+            list({l for forms in labels_.values() for l in forms}),
+        )
+        responds = {}
+        for label, forms in labels_.items():
+            for label_ in forms:
+                if lids.get(label_) is not None:
+                    responds[label] = lids[label_]
+                    break
+        return responds
+
     def get_labels_en_from_wd_id(self, wd_id, get_labels=True):
         label_lids = self.get_value(DB_E_LABEL_COLUMN_NAME.WDID_LABEL_EN.value, wd_id)
         if not get_labels:
@@ -190,41 +276,84 @@ class DBELabel(FReadDB):
             return label_lids
         return self.get_labels_from_lid_list(label_lids)
 
+    def _get_labels_from_wd_ids(self, column_name: str, wd_ids: List[int]):
+        label_lids = self.get_values(column_name, list(wd_ids))
+        labels = self.get_labels_from_lid_list(
+            list({int(l) for lids in label_lids.values() for l in lids})
+        )
+        return {
+            wd_id: {int(l): labels[int(l)] for l in lids if int(l) in labels}
+            for wd_id, lids in label_lids.items()
+        }
+
+    def get_labels_en_from_wd_ids(self, wd_ids: List[int]):
+        # Batch version of get_labels_en_from_wd_id: {wd_id: {label_lid: label}}
+        return self._get_labels_from_wd_ids(
+            DB_E_LABEL_COLUMN_NAME.WDID_LABEL_EN.value, wd_ids
+        )
+
+    def get_labels_all_from_wd_ids(self, wd_ids: List[int]):
+        return self._get_labels_from_wd_ids(
+            DB_E_LABEL_COLUMN_NAME.WDID_LABEL_ALL.value, wd_ids
+        )
+
     def get_label_from_lid(self, lid: int):
         return self.get_value(DB_E_LABEL_COLUMN_NAME.LID_LABEL.value, lid)
 
     def get_labels_from_lid_list(self, lid_list: List[int]):
         return self.get_values(DB_E_LABEL_COLUMN_NAME.LID_LABEL.value, lid_list)
 
+    @staticmethod
+    def _get_ranking_column(lang: str = "en"):
+        if lang == "en":
+            return DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value
+        else:
+            return DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value
+
+    @staticmethod
+    def _get_ranking_objs(responds, search_objs: str = "entity"):
+        if not responds:
+            return responds
+
+        if search_objs == "entity":
+            responds = responds[0]
+        elif search_objs == "type":
+            responds = responds[1]
+        elif search_objs == "property":
+            responds = responds[2]
+        else:
+            responds = {
+                "entity": responds[0],
+                "type": responds[1],
+                "property": responds[2],
+            }
+        return responds
+
     def get_wd_ranking_from_label(
         self, label, lang: str = "en", search_objs: str = "entity"
     ):
         label_lid = self.get_lid(label)
         if label_lid is not None:
-            if lang == "en":
-                db_name = DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value
-            else:
-                db_name = DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_EN_RANK.value
-            responds = self.get_value(db_name, label_lid)
-            if not responds:
-                return responds
-
-            if search_objs == "entity":
-                responds = responds[0]
-            elif search_objs == "type":
-                responds = responds[1]
-            elif search_objs == "property":
-                responds = responds[2]
-            else:
-                responds = {
-                    "entity": responds[0],
-                    "type": responds[1],
-                    "property": responds[2],
-                }
-            return responds
+            responds = self.get_value(self._get_ranking_column(lang), label_lid)
+            return self._get_ranking_objs(responds, search_objs)
 
         return None
 
+    def get_wd_ranking_from_labels(
+        self, labels: List[str], lang: str = "en", search_objs: str = "entity"
+    ):
+        # Batch version of get_wd_ranking_from_label: {label: ranking}
+        label_lids = self.get_lids(labels)
+        rankings = self.get_values(
+            self._get_ranking_column(lang), list(set(label_lids.values()))
+        )
+        responds = {}
+        for label, label_lid in label_lids.items():
+            responds[label] = self._get_ranking_objs(
+                rankings.get(label_lid), search_objs
+            )
+        return responds
+
     def _call_back_is_available(self, column_name: str, label: str):
         lid = self.get_lid(label)
         if lid is None:
@@ -371,8 +500,8 @@ class DBELabel(FReadDB):
         ranking = defaultdict(BitMap)
 
         for k, values_list in tqdm(
-            self.iter_db(input_column),
-            total=self.get_column_size(input_column),
+            self.get_db_iter(input_column),
+            total=self.get_number_items_from(input_column),
             desc="Build WD entity ranking",
         ):
             for v in values_list:
@@ -386,8 +515,8 @@ class DBELabel(FReadDB):
     def build_label_wd_id_ranking_pagerank(self, column_name, limit=1000):
         db_wikidata = DBWikidata()
         for k, v in tqdm(
-            self.iter_db(column_name, deserialize_obj=False),
-            total=self.get_column_size(column_name),
+            self.get_db_iter(column_name, deserialize_obj=False),
+            total=self.get_number_items_from(column_name),
             desc="Build wd ranking with pagerank",
         ):
             v = BitMap.deserialize(v)
@@ -422,6 +551,7 @@ class DBELabel(FReadDB):
             DB_E_LABEL_COLUMN_NAME.WDID_LABEL_ALL.value,
             DB_E_LABEL_COLUMN_NAME.LID_WDID_LABEL_ALL_RANK.value,
         )
+        self.build_en_lids()
 
     def build_ranking_list_with_pagerank(self):
         self.build_label_wd_id_ranking_pagerank(
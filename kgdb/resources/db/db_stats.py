@@ -0,0 +1,132 @@
+import threading
+from collections import defaultdict
+from time import perf_counter
+from typing import Any, Dict, List
+
+from freaddb.db_lmdb import FReadDB
+
+from kgdb.resources.db.db_codecs import decode_value, decode_values
+from kgdb.utils import io_worker as iw
+
+# Counters of each column, times are in seconds
+STATS_FIELDS = {
+    "gets": "Single key reads",
+    "multi_gets": "Multi key reads",
+    "keys": "Keys requested",
+    "found": "Keys found",
+    "bytes_read": "Bytes of the values read",
+    "read_time": "Time spent in the read functions",
+    "deserialize_time": "Time spent deserializing values",
+    "cache_hits": "Reads answered by the in-memory buffers",
+    "redirect_fallbacks": "Missing keys retried with their redirect",
+}
+
+
+class DBStats(object):
+    """
+    Thread-safe per-column access counters of a database
+    """
+
+    def __init__(self, db_name: str = ""):
+        self.db_name = db_name
+        self.columns = defaultdict(lambda: dict.fromkeys(STATS_FIELDS, 0))
+        self._lock = threading.Lock()
+
+    def add(self, column: str, **counters):
+        with self._lock:
+            column_stats = self.columns[column]
+            for field, value in counters.items():
+                column_stats[field] += value
+
+    def reset(self):
+        with self._lock:
+            self.columns.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {column: dict(obj) for column, obj in self.columns.items()}
+
+    def to_prometheus(self, prefix: str = "kgdb_db") -> str:
+        """
+        Counters in the Prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for field, description in STATS_FIELDS.items():
+            name = f"{prefix}_{field}"
+            if field.endswith("_time"):
+                name += "_seconds"
+            name += "_total"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for column, obj in snapshot.items():
+                lines.append(
+                    f'{name}{{db="{self.db_name}",column="{column}"}} {obj[field]}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+def get_value(db: FReadDB, db_name: str, key_obj: Any, get_deserialize: bool = True):
+    # db_codecs.get_value with counters: the stored bytes are read, then decoded
+    start = perf_counter()
+    responds = FReadDB.get_value(db, db_name, key_obj, get_deserialize=False)
+    n_bytes = len(responds) if responds is not None else 0
+    deserialize_time = 0
+    if get_deserialize and responds is not None:
+        start_deserialize = perf_counter()
+        try:
+            responds = decode_value(db, db_name, responds)
+        except Exception as message:
+            iw.print_status(f"{db_name} {key_obj}: {message}", is_screen=False)
+            responds = None
+        deserialize_time = perf_counter() - start_deserialize
+    db.db_stats.add(
+        db_name,
+        gets=1,
+        keys=1,
+        found=int(responds is not None),
+        bytes_read=n_bytes,
+        read_time=perf_counter() - start,
+        deserialize_time=deserialize_time,
+    )
+    return responds
+
+
+def get_values(db: FReadDB, db_name: str, key_objs: List, get_deserialize=True):
+    # db_codecs.get_values with counters
+    start = perf_counter()
+    responds = FReadDB.get_values(db, db_name, key_objs, get_deserialize=False)
+    n_bytes = sum(len(v) for v in responds.values())
+    deserialize_time = 0
+    if get_deserialize:
+        start_deserialize = perf_counter()
+        responds = decode_values(db, db_name, responds)
+        deserialize_time = perf_counter() - start_deserialize
+    db.db_stats.add(
+        db_name,
+        multi_gets=1,
+        keys=len(key_objs) if hasattr(key_objs, "__len__") else 0,
+        found=len(responds),
+        bytes_read=n_bytes,
+        read_time=perf_counter() - start,
+        deserialize_time=deserialize_time,
+    )
+    return responds
+
+
+def enable_stats(db: FReadDB) -> DBStats:
+    """
+    Count the reads of a database. The counting read functions are bound to this
+    instance only, databases without stats keep the plain FReadDB functions.
+    """
+    if getattr(db, "db_stats", None) is None:
+        db.db_stats = DBStats(db.db_file.split("/")[-1])
+        db.get_value = get_value.__get__(db)
+        db.get_values = get_values.__get__(db)
+    return db.db_stats
+
+
+def disable_stats(db: FReadDB):
+    for attr in ["get_value", "get_values"]:
+        db.__dict__.pop(attr, None)
+    db.db_stats = None
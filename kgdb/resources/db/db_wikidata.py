@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import bz2
-import csv
 import gzip
 import os.path
 import queue
@@ -25,9 +24,10 @@ from tqdm import tqdm
 from kgdb.config import config as cf
 from kgdb.resources.db import db_dbpedia, db_wikipedia
 from kgdb.resources.db.db_core import DBCore
-from kgdb.resources.db.utils import is_wikidata_item
+from kgdb.resources.db.utils import ExternalGroupBy, is_wikidata_item
 from kgdb.utils import io_worker as iw
 from kgdb.utils.benchmark import profile
+from kgdb.utils.sql_dump import iter_sql_dump
 
 
 def compute_pagerank(
@@ -94,39 +94,6 @@ def boolean_search(db, params, print_top=3, get_qid=True):
     print()
 
 
-def parse_sql_values(line):
-    values = line[line.find("` VALUES ") + 9 :]
-    latest_row = []
-    reader = csv.reader(
-        [values],
-        delimiter=",",
-        doublequote=False,
-        escapechar="\\",
-        quotechar="'",
-        strict=True,
-    )
-    for reader_row in reader:
-        for column in reader_row:
-            if len(column) == 0 or column == "NULL":
-                latest_row.append(chr(0))
-                continue
-            if column[0] == "(":
-                new_row = False
-                if len(latest_row) > 0:
-                    if latest_row[-1][-1] == ")":
-                        latest_row[-1] = latest_row[-1][:-1]
-                        new_row = True
-                if new_row:
-                    yield latest_row
-                    latest_row = []
-                if len(latest_row) == 0:
-                    column = column[1:]
-            latest_row.append(column)
-        if latest_row[-1][-2:] == ");":
-            latest_row[-1] = latest_row[-1][:-2]
-            yield latest_row
-
-
 def reader_wikidata_dump(dir_dump):
     if ".bz2" in dir_dump:
         reader = bz2.BZ2File(dir_dump)
@@ -415,18 +382,19 @@ class DBWikidata(DBCore):
         # self.save_buff_lid()
         redirect = iw.load_obj_pkl(self.db_file + "_redirect.pkl")
 
-        redirect_of = defaultdict(set)
+        redirect_of = ExternalGroupBy()
         for k, v in tqdm(redirect.items(), total=len(redirect), mininterval=2):
             self.add_buff_with_lid(
                 COLUMN.REDIRECT.value, k, v, encode_key=True, encode_value=True
             )
-            redirect_of[v].add(k)
+            redirect_of.add(v, k)
         del redirect
 
-        for k, v in tqdm(redirect_of.items(), total=len(redirect_of), mininterval=2):
+        for k, v in tqdm(redirect_of.items(), mininterval=2):
             self.add_buff_with_lid(
                 COLUMN.REDIRECT_OF.value, k, v, encode_key=True, encode_value=True
             )
+        redirect_of.close()
         self.save_buff_lid()
 
     def build_information(self):
@@ -471,7 +439,12 @@ class DBWikidata(DBCore):
             self.add_buff_with_lid(COLUMN.DBPEDIA.value, wd_id, dp_id, encode_key=True)
         self.save_buff_lid()
 
-    def _build_lid(self, dump_wd_page: str = cf.DIR_DUMP_WD_PAGE, step: int = 100_000):
+    def _build_lid(
+        self,
+        dump_wd_page: str = cf.DIR_DUMP_WD_PAGE,
+        step: int = 100_000,
+        n_cpu: int = 1,
+    ):
         if not os.path.exists(cf.DIR_DUMP_WD_PAGE):
             raise Exception(f"Please download file {cf.DIR_DUMP_WD_PAGE}")
 
@@ -480,74 +453,64 @@ class DBWikidata(DBCore):
                 f"Wikidata pages | Buff: {self.buff_size / self.buff_limit * 100:.0f}%"
             )
 
-        with gzip.open(dump_wd_page, "rt", encoding="utf-8", newline="\n") as f:
-            p_bar = tqdm(desc=update_desc())
-            i = 0
-            for line in f:
-                if not line.startswith("INSERT INTO"):
-                    continue
-                for v in parse_sql_values(line):
-                    if is_wikidata_item(v[2]):
-                        i += 1
-                        if i and i % step == 0:
-                            p_bar.update(step)
-                            p_bar.set_description(update_desc())
-                        self.add_buff(
-                            COLUMN.QID_LID.value,
-                            v[2],
-                            int(v[0]),
-                            is_serialize_value=False,
-                        )
-                        self.add_buff(
-                            COLUMN.LID_QID.value,
-                            int(v[0]),
-                            v[2],
-                            is_serialize_value=False,
-                        )
-            p_bar.update(i % step)
-            p_bar.close()
+        p_bar = tqdm(desc=update_desc())
+        i = 0
+        # page_id, page_title
+        for lid, qid in iter_sql_dump(dump_wd_page, [0, 2], [0], n_cpu=n_cpu):
+            if is_wikidata_item(qid):
+                i += 1
+                if i and i % step == 0:
+                    p_bar.update(step)
+                    p_bar.set_description(update_desc())
+                self.add_buff(
+                    COLUMN.QID_LID.value,
+                    qid,
+                    lid,
+                    is_serialize_value=False,
+                )
+                self.add_buff(
+                    COLUMN.LID_QID.value,
+                    lid,
+                    qid,
+                    is_serialize_value=False,
+                )
+        p_bar.update(i % step)
+        p_bar.close()
         self.save_buff()
 
     def _build_redirects(
         self,
         dump_wd_redirect=cf.DIR_DUMP_WD_REDIRECT,
         step=1_000,
+        n_cpu: int = 1,
     ):
         if not os.path.exists(dump_wd_redirect):
             raise Exception(f"Please download file {dump_wd_redirect}")
 
-        redirect_of = defaultdict(set)
-        with gzip.open(
-            dump_wd_redirect,
-            "rt",
-            encoding="utf-8",
-            newline="\n",
-        ) as f:
-            i = 0
-            p_bar = tqdm(desc="Wikidata redirects")
-            for line in f:
-                if not line.startswith("INSERT INTO"):
+        redirect_of = ExternalGroupBy()
+        i = 0
+        p_bar = tqdm(desc="Wikidata redirects")
+        # rd_from, rd_title
+        for lid, qid in iter_sql_dump(dump_wd_redirect, [0, 2], [0], n_cpu=n_cpu):
+            if is_wikidata_item(qid):
+                lid_redirect = self.get_lid(qid)
+                if lid_redirect is None:
                     continue
-                for v in parse_sql_values(line):
-                    if is_wikidata_item(v[2]):
-                        lid = int(v[0])
-                        lid_redirect = self.get_lid(v[2])
-                        if lid_redirect is None:
-                            continue
-                        redirect_of[lid_redirect].add(lid)
-                        self.add_buff(
-                            COLUMN.REDIRECT.value,
-                            lid,
-                            lid_redirect,
-                            is_serialize_value=False,
-                        )
-                        i += 1
-                        if i and i % step == 0:
-                            p_bar.update(step)
-            p_bar.update(i % step)
-            p_bar.close()
+                redirect_of.add(lid_redirect, lid)
+                self.add_buff(
+                    COLUMN.REDIRECT.value,
+                    lid,
+                    lid_redirect,
+                    is_serialize_value=False,
+                )
+                i += 1
+                if i and i % step == 0:
+                    p_bar.update(step)
+        p_bar.update(i % step)
+        p_bar.close()
         for k, v in redirect_of.items():
             self.add_buff(COLUMN.REDIRECT_OF.value, k, v)
+        redirect_of.close()
         self.save_buff()
 
     def build_from_json_dump(self, json_dump=cf.DIR_DUMP_WD_JSON, step=1_000):
@@ -721,11 +684,11 @@ class DBWikidata(DBCore):
         reverse=True,
         step=10000,
     ):
-        from kgdb.resources.db.db_dbpedia import DBDP
-        from kgdb.resources.db.db_wikipedia import DBWP
+        from kgdb.resources.db.db_dbpedia import DBDBpedia
+        from kgdb.resources.db.db_wikipedia import DBWikipedia
 
-        dbpedia = DBDP()
-        wikipedia = DBWP()
+        dbpedia = DBDBpedia(readonly=True)
+        wikipedia = DBWikipedia(readonly=True)
         row, col, data = [], [], []
         # keys = []
         # for i, k in enumerate(self.keys()):
@@ -746,15 +709,16 @@ class DBWikidata(DBCore):
 
             wp_id = self.get_wikipedia(wd_lid)
             if wp_id:
-                wp_obj = wikipedia.get_item(wp_id)
-                if wp_obj and wp_obj["claims_wd"]:
-                    for wd_prop, wp_entities in wp_obj["claims_wd"].items():
+                # Outlinks are redirected Wikipedia LIDs
+                wp_links = wikipedia.get_page_links(wp_id, decode_value=False)
+                if wp_links:
+                    for wd_prop, wp_entities in wp_links.items():
                         if "Section" in wd_prop:
                             weight_prop = cf.WEIGHT_W_OTHERS
                         else:
                             weight_prop = cf.WEIGHT_WD
                         for wp_entity in wp_entities:
-                            map_wd_id = wikipedia.get_wikidata(wp_entity)
+                            map_wd_id = wikipedia.get_wikidata(int(wp_entity))
                             if not map_wd_id or not is_wikidata_item(map_wd_id):
                                 continue
                             redirect_wd = self.get_redirect(map_wd_id)
@@ -930,11 +894,16 @@ class DBWikidata(DBCore):
         item_id: Union[str, int],
         lang: Optional[str] = None,
     ):
+        if lang:
+            # Only the value of lang is decoded in the binary columns
+            return self._call_back_get_item_with_lid_qid(
+                lambda db_name, lid: self.get_value_field(db_name, lid, lang),
+                column_name,
+                item_id,
+            )
         result = self._call_back_get_item_with_lid_qid(func, column_name, item_id)
         if not result:
             return None
-        if lang:
-            return result.get(lang)
         return result
 
     def get_wikipedia(self, item_id: Union[str, int]):
@@ -958,6 +927,10 @@ class DBWikidata(DBCore):
             item_id=item_id,
         )
 
+    def get_label_batch(self, item_ids: List[int]):
+        # Batch version of get_label for lids: {lid: label}
+        return self.get_values(COLUMN.LABEL.value, list(item_ids))
+
     def get_pagerank(self, item_id: Union[str, int]):
         return self._call_back_get_item_with_lid_qid(
             func=self.get_value,
@@ -1,13 +1,17 @@
 import bz2
 import csv
-import gzip
+import os
 import re
 import urllib
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import closing
 from enum import Enum
-from typing import List, Optional
-from xml.etree.ElementTree import iterparse
+from multiprocessing import Pool
+from numbers import Number
+from typing import Dict, List, Optional
+from xml.etree.ElementTree import XMLPullParser
 
+import numpy as np
 import six
 import wikitextparser as wtp
 from freaddb.db_lmdb import DBSpec, FReadDB
@@ -16,8 +20,9 @@ from tqdm import tqdm
 
 from kgdb.config import config as cf
 from kgdb.resources.db.db_core import DBCore
-from kgdb.resources.db.utils import ToBytes, is_wikidata_item
+from kgdb.resources.db.utils import ExternalGroupBy, ToBytes, is_wikidata_item
 from kgdb.utils import io_worker as iw
+from kgdb.utils.sql_dump import iter_sql_dump
 
 
 class COLUMN(Enum):
@@ -29,7 +34,10 @@ class COLUMN(Enum):
 
     WIKIDATA = "WIKIDATA"
 
-    PAGES = "PAGES"
+    # (page, property) -> outlink LIDs, property: infobox argument or section
+    PAGE_LINKS = "PAGE_LINKS"
+    # (page, property) -> infobox literals
+    PAGE_INFOBOX = "PAGE_INFOBOX"
 
 
 DBWP_SCHEMA = {
@@ -39,44 +47,14 @@ DBWP_SCHEMA = {
     COLUMN.REDIRECT_OF: DBSpec(
         COLUMN.REDIRECT_OF.value, integerkey=True, bytes_value=ToBytes.INT_NUMPY
     ),
-    COLUMN.PAGES: DBSpec(COLUMN.PAGES.value),
+    COLUMN.PAGE_LINKS: DBSpec(
+        COLUMN.PAGE_LINKS.value, combinekey=True, bytes_value=ToBytes.INT_NUMPY
+    ),
+    COLUMN.PAGE_INFOBOX: DBSpec(COLUMN.PAGE_INFOBOX.value, combinekey=True),
     COLUMN.WIKIDATA: DBSpec(COLUMN.WIKIDATA.value, integerkey=True),
 }
 
 
-def parse_sql_values(line):
-    values = line[line.find("` VALUES ") + 9 :]
-    latest_row = []
-    reader = csv.reader(
-        [values],
-        delimiter=",",
-        doublequote=False,
-        escapechar="\\",
-        quotechar="'",
-        strict=True,
-    )
-    for reader_row in reader:
-        for column in reader_row:
-            if len(column) == 0 or column == "NULL":
-                latest_row.append(chr(0))
-                continue
-            if column[0] == "(":
-                new_row = False
-                if len(latest_row) > 0:
-                    if latest_row[-1][-1] == ")":
-                        latest_row[-1] = latest_row[-1][:-1]
-                        new_row = True
-                if new_row:
-                    yield latest_row
-                    latest_row = []
-                if len(latest_row) == 0:
-                    column = column[1:]
-            latest_row.append(column)
-        if latest_row[-1][-2:] == ");":
-            latest_row[-1] = latest_row[-1][:-2]
-            yield latest_row
-
-
 def parse_reader(responds):
     title, lang, wiki_text, redirect = responds
     wiki_page = WPPage(title, lang, wiki_text, redirect)
@@ -112,9 +90,16 @@ def wiki_plain_text(org_text, next_parse=1):
 
 
 class WPDumpReader(object):
-    def __init__(self, dump_file, ignored_ns=cf.WP_IGNORED_NS):
+    """
+    Pages of a Wikipedia XML dump (bz2). offset: byte offset of a stream of a
+    multistream dump (see the multistream index), the pages are read from this
+    stream to the end of the dump.
+    """
+
+    def __init__(self, dump_file, ignored_ns=cf.WP_IGNORED_NS, offset: int = 0):
         self._dump_file = dump_file
         self._ignored_ns = ignored_ns
+        self._offset = offset
         with bz2.BZ2File(self._dump_file) as f:
             self._lang = re.search(
                 r'xml:lang="(.*)"', six.text_type(f.readline())
@@ -129,52 +114,64 @@ class WPDumpReader(object):
         return self._lang
 
     def __iter__(self):
-        with bz2.BZ2File(self._dump_file) as f:
-            for (title, wiki_text, redirect) in self._extract_pages(f):
-                lower_title = title.lower()
-                if any([lower_title.startswith(ns) for ns in self._ignored_ns]):
-                    continue
-
-                yield [title, self._lang, wiki_text, redirect]
+        with open(self._dump_file, "rb") as raw_file:
+            raw_file.seek(self._offset)
+            with bz2.BZ2File(raw_file) as f:
+                for title, wiki_text, redirect in self._extract_pages(
+                    f, wrap_root=self._offset > 0
+                ):
+                    lower_title = title.lower()
+                    if any([lower_title.startswith(ns) for ns in self._ignored_ns]):
+                        continue
+
+                    yield [title, self._lang, wiki_text, redirect]
 
     @staticmethod
-    def _extract_pages(in_file):
-        def _get_namespace(_tag):
-            match_obj = cf.WP_NAMESPACE_RE.match(_tag)
-            if match_obj:
-                ns = match_obj.group(1)
-                if not ns.startswith("http://www.mediawiki.org/xml/export-"):
-                    raise ValueError("%s not recognized as MediaWiki namespace" % ns)
-                return ns
-            else:
-                return ""
-
-        def _to_unicode(s):
-            if isinstance(s, str):
-                return s
-            return s.decode(cf.ENCODING)
-
-        elems = (elem for (_, elem) in iterparse(in_file, events=(b"end",)))
-        elem = next(elems)
-
-        tag = six.text_type(elem.tag)
-        namespace = _get_namespace(tag)
-        page_tag = "{%s}page" % namespace
-        text_path = "./{%s}revision/{%s}text" % (namespace, namespace)
-        title_path = "./{%s}title" % namespace
-        redirect_path = "./{%s}redirect" % namespace
-        for elem in elems:
-            if elem.tag == page_tag:
-                title = elem.find(title_path).text
-                text = elem.find(text_path).text or ""
-                redirect = elem.find(redirect_path)
-                if redirect is not None:
-                    redirect = norm_wikipedia_title(
-                        _to_unicode(redirect.attrib["title"])
-                    )
+    def _extract_pages(in_file, wrap_root: bool = False, chunk_size=cf.SIZE_1MB):
+        """
+        Pull parser of the page elements: (title, text, redirect). Pages are
+        removed from the root once they are read, the memory is bounded by the
+        largest page. wrap_root: the input starts at a page (multistream offset),
+        a root element is added.
+        """
+        parser = XMLPullParser(events=("start", "end"))
+        if wrap_root:
+            parser.feed(b"<mediawiki>")
+        root, tags = None, None
+        while True:
+            chunk = in_file.read(chunk_size)
+            if chunk:
+                parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if root is None:
+                    root = elem
+                    match_obj = cf.WP_NAMESPACE_RE.match(root.tag)
+                    ns = match_obj.group(0) if match_obj else ""
+                    if ns and not ns.startswith(
+                        "{http://www.mediawiki.org/xml/export-"
+                    ):
+                        raise ValueError(
+                            "%s not recognized as MediaWiki namespace" % ns[1:-1]
+                        )
+                    tags = [ns + t for t in ["page", "title", "redirect", "revision"]]
+                    text_tag = ns + "text"
+                if event != "end" or elem.tag != tags[0]:
+                    continue
 
-                yield _to_unicode(title), _to_unicode(text), redirect
-                elem.clear()
+                title, text, redirect = None, None, None
+                for child in elem:
+                    if child.tag == tags[1]:
+                        title = child.text
+                    elif child.tag == tags[2]:
+                        redirect = norm_wikipedia_title(child.attrib["title"])
+                    elif child.tag == tags[3] and text is None:
+                        text_elem = child.find(text_tag)
+                        if text_elem is not None:
+                            text = text_elem.text
+                yield title, text or "", redirect
+                root.clear()
+            if not chunk:
+                break
 
 
 class WPPage(object):
@@ -265,6 +262,76 @@ class WPPage(object):
         return wp_obj, wp_wd
 
 
+def parse_pages_task(pages):
+    """
+    Worker: parse dump pages [title, lang, wiki_text, redirect] to
+    (title, redirect, wp_obj). WPPage is not returned, it is pickled as its
+    arguments and would be parsed again when unpickled.
+    """
+    responds = []
+    for page in pages:
+        wp_page = parse_reader(page)
+        responds.append((wp_page.title, wp_page.redirect, wp_page.wp_obj))
+    return responds
+
+
+def iter_parsed_pages(
+    pages, n_cpu: int = 1, batch_size: int = 100, queue_size: int = 0
+):
+    """
+    (title, redirect, wp_obj) of the dump pages in the dump order. With n_cpu > 1,
+    batches of pages are parsed by a pool of processes, at most queue_size batches
+    (default: 4 per process) are read ahead of the writer.
+    """
+    if n_cpu <= 1:
+        for page in pages:
+            yield from parse_pages_task([page])
+        return
+
+    queue_size = queue_size or 4 * n_cpu
+    pending = deque()
+    with closing(Pool(processes=n_cpu)) as pool:
+        batch = []
+        for title, lang, wiki_text, redirect in pages:
+            # Redirect pages are not parsed
+            batch.append([title, lang, "" if redirect else wiki_text, redirect])
+            if len(batch) < batch_size:
+                continue
+            pending.append(pool.apply_async(parse_pages_task, (batch,)))
+            batch = []
+            if len(pending) >= queue_size:
+                yield from pending.popleft().get()
+        if batch:
+            pending.append(pool.apply_async(parse_pages_task, (batch,)))
+        while pending:
+            yield from pending.popleft().get()
+
+
+# Memory-mapped CSR adjacency of the page links (indices: LIDs), out: forward links,
+# in: reverse links
+LINK_GRAPH_ARRAYS = [
+    "out_indptr",
+    "out_indices",
+    "out_degree",
+    "in_indptr",
+    "in_indices",
+    "in_degree",
+]
+
+
+def build_csr(heads: np.ndarray, tails: np.ndarray, n: int):
+    """
+    CSR of the edges heads -> tails (sorted, without duplicates): indptr (n + 1),
+    indices (tails sorted by head then tail), degree (n)
+    """
+    order = np.lexsort((tails, heads))
+    heads, tails = heads[order], tails[order]
+    degree = np.bincount(heads, minlength=n).astype(np.uint32)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    return indptr, tails, degree
+
+
 class DBWikipedia(DBCore):
     def __init__(
         self,
@@ -283,135 +350,281 @@ class DBWikipedia(DBCore):
             map_size=map_size,
             split_subdatabases=split_subdatabases,
         )
+        self.file_link_graph = f"{db_file}_link_graph"
+        self._link_graph = None
+
+    @property
+    def link_graph(self) -> Dict[str, np.ndarray]:
+        if self._link_graph is None:
+            self._link_graph = {
+                name: np.load(f"{self.file_link_graph}_{name}.npy", mmap_mode="r")
+                for name in LINK_GRAPH_ARRAYS
+            }
+        return self._link_graph
 
     def get_wikidata(self, item_id: str):
         return self._get_db_item(COLUMN.WIKIDATA.value, item_id, decode_value=False)
 
-    @staticmethod
-    def _is_insert(line):
-        return line.startswith("INSERT INTO")
+    def get_page_links(self, title, decode_value: bool = True):
+        return self._get_db_item_prefix(
+            COLUMN.PAGE_LINKS.value, (title,), decode_value=decode_value
+        )
+
+    def get_page_links_with_property(self, title, prop, decode_value: bool = True):
+        return self._get_db_item(
+            COLUMN.PAGE_LINKS.value, (title, prop), decode_value=decode_value
+        )
+
+    def get_page_infobox(self, title):
+        return self._get_db_item_prefix(
+            COLUMN.PAGE_INFOBOX.value, (title,), decode_value=False
+        )
+
+    def _get_link_graph_lid(self, title) -> Optional[int]:
+        # Link targets are redirected pages
+        lid = title if isinstance(title, Number) else self.get_lid(title)
+        if lid is None:
+            return None
+        lid = int(self.get_redirect(lid, decode_value=False))
+        if lid >= len(self.link_graph["out_degree"]):
+            return None
+        return lid
+
+    def _get_links(self, title, direction: str, limit: int, decode_value: bool):
+        lid = self._get_link_graph_lid(title)
+        if lid is None:
+            return None
+        indptr = self.link_graph[f"{direction}_indptr"]
+        start, end = indptr[lid], indptr[lid + 1]
+        if limit:
+            end = min(end, start + limit)
+        lids = self.link_graph[f"{direction}_indices"][start:end].tolist()
+        if decode_value:
+            return self.get_ids(lids)
+        return lids
+
+    def get_outlinks(self, title, limit: int = 0, decode_value: bool = True):
+        """
+        Pages linked from the page (sorted by LID), limit: 0 is no limit
+        """
+        return self._get_links(title, "out", limit, decode_value)
+
+    def get_inlinks(self, title, limit: int = 0, decode_value: bool = True):
+        """
+        Pages linking to the page (sorted by LID), limit: 0 is no limit
+        """
+        return self._get_links(title, "in", limit, decode_value)
+
+    def get_outlinks_count(self, title) -> Optional[int]:
+        lid = self._get_link_graph_lid(title)
+        if lid is None:
+            return None
+        return int(self.link_graph["out_degree"][lid])
+
+    def get_inlinks_count(self, title) -> Optional[int]:
+        lid = self._get_link_graph_lid(title)
+        if lid is None:
+            return None
+        return int(self.link_graph["in_degree"][lid])
 
-    def build_redirects_and_wikidata_mapping(self, step=100000):
+    def build_redirects_and_wikidata_mapping(
+        self, step=100000, n_cpu: int = os.cpu_count()
+    ):
+        """
+        Page, redirect and page_props SQL dumps. Only the needed columns are
+        parsed, the INSERT lines of a dump are parsed by n_cpu processes.
+        """
         from kgdb.resources.db.db_wikidata import DBWikidata
 
         dbwd = DBWikidata(readonly=True)
-        map_wp_id_title = defaultdict()
-        with gzip.open(
-            cf.DIR_DUMP_WP_PAGE, "rt", encoding=cf.ENCODING, newline="\n"
-        ) as f:
-            p_bar = tqdm(desc="Wikipedia IDs", mininterval=2)
-            i = 0
-            for line in f:
-                if not self._is_insert(line):
-                    continue
-                # if i > step:
-                #     break
-                for v in parse_sql_values(line):
-                    if v[1] == "0":
-                        wp_id = v[0]
-                        wp_title = norm_wikipedia_title(v[2])
-                        map_wp_id_title[wp_id] = wp_title
-                        self.get_lid(wp_title, create_new=True)
-
-                        i += 1
-                        p_bar.update()
-                        # if i > step:
-                        #     break
-            p_bar.close()
-
-        buff_obj_inv = defaultdict(set)
-        with gzip.open(
-            cf.DIR_DUMP_WP_REDIRECT, "rt", encoding="utf-8", newline="\n"
-        ) as f:
-            p_bar = tqdm(desc="Wikipedia redirects", mininterval=2)
-            i = 0
-
-            for line in f:
-                if not self._is_insert(line):
-                    continue
-                # if i > 1000:
-                #     break
-                for v in parse_sql_values(line):
-                    wp_source_id = v[0]
-                    wp_source_title = map_wp_id_title.get(wp_source_id)
-                    if wp_source_title:
-                        wp_target_title = norm_wikipedia_title(v[2])
-                        self.add_buff_with_lid(
-                            COLUMN.REDIRECT.value,
-                            wp_source_title,
-                            wp_target_title,
-                            encode_key=True,
-                            encode_value=True,
-                        )
-
-                        buff_obj_inv[wp_target_title].add(wp_source_title)
-                        p_bar.update()
-                        i += 1
-                        # if i > 1000:
-                        #     break
-            p_bar.close()
+        map_wp_id_title = dict()
+        p_bar = tqdm(desc="Wikipedia IDs", mininterval=2)
+        # page_id, page_namespace, page_title
+        for wp_id, wp_namespace, wp_title in iter_sql_dump(
+            cf.DIR_DUMP_WP_PAGE, [0, 1, 2], [0, 1], n_cpu=n_cpu
+        ):
+            if wp_namespace == 0:
+                wp_title = norm_wikipedia_title(wp_title)
+                map_wp_id_title[wp_id] = wp_title
+                self.get_lid(wp_title, create_new=True)
+                p_bar.update()
+        p_bar.close()
 
-            for k, v in tqdm(
-                buff_obj_inv.items(), desc="Wikipedia redirects of", mininterval=2
-            ):
+        buff_obj_inv = ExternalGroupBy()
+        p_bar = tqdm(desc="Wikipedia redirects", mininterval=2)
+        # rd_from, rd_title
+        for wp_source_id, wp_target_title in iter_sql_dump(
+            cf.DIR_DUMP_WP_REDIRECT, [0, 2], [0], n_cpu=n_cpu
+        ):
+            wp_source_title = map_wp_id_title.get(wp_source_id)
+            if wp_source_title:
+                wp_target_title = norm_wikipedia_title(wp_target_title)
                 self.add_buff_with_lid(
-                    COLUMN.REDIRECT_OF.value,
-                    k,
-                    v,
+                    COLUMN.REDIRECT.value,
+                    wp_source_title,
+                    wp_target_title,
                     encode_key=True,
                     encode_value=True,
                 )
 
-        with gzip.open(cf.DIR_DUMP_WP_PROPS, "r") as f:
-            p_bar = tqdm(desc="Mapping Wikipedia title -> Wikidata ID")
-            for line in f:
-                line = line.decode("utf-8", "ignore")
-                if not self._is_insert(line):
+                buff_obj_inv.add(wp_target_title, wp_source_title)
+                p_bar.update()
+        p_bar.close()
+
+        for k, v in tqdm(
+            buff_obj_inv.items(), desc="Wikipedia redirects of", mininterval=2
+        ):
+            self.add_buff_with_lid(
+                COLUMN.REDIRECT_OF.value,
+                k,
+                v,
+                encode_key=True,
+                encode_value=True,
+            )
+        buff_obj_inv.close()
+
+        p_bar = tqdm(desc="Mapping Wikipedia title -> Wikidata ID")
+        # pp_page, pp_propname, pp_value
+        for wp_id, wp_prop, wd_id in iter_sql_dump(
+            cf.DIR_DUMP_WP_PROPS, [0, 1, 2], [0], n_cpu=n_cpu, errors="ignore"
+        ):
+            if wp_prop == "wikibase_item" and is_wikidata_item(wd_id):
+                wp_title = map_wp_id_title.get(wp_id)
+                if not wp_title:
                     continue
-                for v in parse_sql_values(line):
-                    wd_id = v[2]
-                    if v[1] == "wikibase_item" and is_wikidata_item(wd_id):
-                        wp_title = map_wp_id_title.get(v[0])
-                        if not wp_title:
-                            continue
-                        # Mapping from Wikipedia title to Wikidata ID
-                        wp_title = self.get_redirect(wp_title)
-                        wd_id_redirect = dbwd.get_redirect(wd_id)
-                        self.add_buff_with_lid(
-                            COLUMN.WIKIDATA.value,
-                            wp_title,
-                            wd_id_redirect,
-                            encode_key=True,
-                        )
-                        p_bar.update()
-            p_bar.close()
+                # Mapping from Wikipedia title to Wikidata ID
+                wp_title = self.get_redirect(wp_title)
+                wd_id_redirect = dbwd.get_redirect(wd_id)
+                self.add_buff_with_lid(
+                    COLUMN.WIKIDATA.value,
+                    wp_title,
+                    wd_id_redirect,
+                    encode_key=True,
+                )
+                p_bar.update()
+        p_bar.close()
         self.save_buff_lid()
 
-    def build_information(self, step= 1000):
+    def build_information(self, step=1000, n_cpu: int = os.cpu_count()):
+        """
+        Parse the Wikipedia XML dump: the pages are parsed by n_cpu processes and
+        written in the dump order
+        """
         c_ok = 0
         c_redirect = 0
         iter_items = WPDumpReader(cf.DIR_DUMP_WP_EN)
 
-        p_bar = tqdm(desc=self.update_desc(COLUMN.PAGES.value, "Wikipedia"))
-        for i, iter_item in enumerate(iter_items):
-            responds = parse_reader(iter_item)
+        p_bar = tqdm(desc=self.update_desc(COLUMN.PAGE_LINKS.value, "Wikipedia"))
+        for i, (title, redirect, wp_obj) in enumerate(
+            iter_parsed_pages(iter_items, n_cpu=n_cpu)
+        ):
             if i and i % step == 0:
-                p_bar.set_description(self.update_desc(COLUMN.PAGES.value, "Wikipedia"))
+                p_bar.set_description(
+                    self.update_desc(COLUMN.PAGE_LINKS.value, "Wikipedia")
+                )
                 p_bar.update(step)
-            if not responds:
-                continue
-            if responds.redirect:
+            if redirect:
                 c_redirect += 1
-            else:
+            elif wp_obj:
                 c_ok += 1
-                self.add_buff_with_lid(
-                    COLUMN.PAGES.value, responds.title, responds.wp_obj, encode_key=True
-                )
+                self._add_page(title, wp_obj)
         p_bar.close()
 
         self.save_buff_lid()
         self.compress()
 
+    def build_link_graph(self, step: int = 10_000_000):
+        """
+        Page links (PAGE_LINKS of all properties, without self links) as forward
+        and reverse CSR adjacency arrays with their degrees, saved next to the
+        LMDB files and memory-mapped by get_outlinks, get_inlinks
+        """
+        heads, tails = [], []
+        buff_heads, buff_tails = [], []
+
+        def save_chunk():
+            if buff_heads:
+                heads.append(np.concatenate(buff_heads))
+                tails.append(np.concatenate(buff_tails))
+            buff_heads.clear()
+            buff_tails.clear()
+
+        n_buff = 0
+        for (wp_lid, _), wp_lids in tqdm(
+            self.get_db_iter(COLUMN.PAGE_LINKS.value),
+            total=self.get_number_items_from(COLUMN.PAGE_LINKS.value),
+            desc="Wikipedia link graph",
+            mininterval=3,
+        ):
+            wp_lids = wp_lids[wp_lids != wp_lid]
+            buff_heads.append(np.full(len(wp_lids), wp_lid, dtype=np.uint32))
+            buff_tails.append(wp_lids)
+            n_buff += len(wp_lids)
+            if n_buff >= step:
+                save_chunk()
+                n_buff = 0
+        save_chunk()
+        heads = np.concatenate(heads) if heads else np.zeros(0, dtype=np.uint32)
+        tails = np.concatenate(tails) if tails else np.zeros(0, dtype=np.uint32)
+
+        # Links of several properties are counted once
+        shift = np.uint64(32)
+        edges = np.unique((heads.astype(np.uint64) << shift) | tails)
+        heads = (edges >> shift).astype(np.uint32)
+        tails = (edges & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        del edges
+
+        n = self.max_lid_id
+        link_graph = dict()
+        for direction, (i_heads, i_tails) in [
+            ("out", (heads, tails)),
+            ("in", (tails, heads)),
+        ]:
+            indptr, indices, degree = build_csr(i_heads, i_tails, n)
+            link_graph[f"{direction}_indptr"] = indptr
+            link_graph[f"{direction}_indices"] = indices
+            link_graph[f"{direction}_degree"] = degree
+        for name in LINK_GRAPH_ARRAYS:
+            np.save(f"{self.file_link_graph}_{name}.npy", link_graph[name])
+        self._link_graph = None
+        iw.print_status(f"Wikipedia link graph: {n:,} pages, {len(heads):,} links")
+
+    def _add_page(self, title, wp_obj):
+        """
+        Links are stored as the LIDs of their redirected pages, links to pages
+        without LIDs (not in the page dump) are ignored. The link titles of a page
+        are resolved with one read of ID_LID and one read of REDIRECT.
+        """
+        wp_titles = {t for titles in wp_obj["claims_wd"].values() for t in titles}
+        # New LIDs of the buffer are not in ID_LID yet
+        lids = {t: self.buff_lid[t] for t in wp_titles if t in self.buff_lid}
+        lids.update(
+            self.get_values(
+                COLUMN.ID_LID.value, [t for t in wp_titles if t not in lids]
+            )
+        )
+        redirects = self.get_values(COLUMN.REDIRECT.value, list(set(lids.values())))
+        for wp_prop, wp_titles in wp_obj["claims_wd"].items():
+            wp_lids = {
+                redirects.get(lids[wp_title], lids[wp_title])
+                for wp_title in wp_titles
+                if wp_title in lids
+            }
+            if wp_lids:
+                self.add_buff_with_lid(
+                    COLUMN.PAGE_LINKS.value,
+                    (title, wp_prop),
+                    sorted(wp_lids),
+                    encode_key=True,
+                )
+        for wp_prop, wp_values in wp_obj["claims_literal"].items():
+            self.add_buff_with_lid(
+                COLUMN.PAGE_INFOBOX.value,
+                (title, wp_prop),
+                sorted(wp_values),
+                encode_key=True,
+            )
+
 
 def check_overlapping():
     db_wp = DBWikipedia()
@@ -436,7 +649,7 @@ def check_overlapping():
     n_luke_vocab = 0
     for k in luke_vocab:
         re_item = db_wp.get_redirect(k)
-        if db_wp.is_available(COLUMN.PAGES.value, re_item):
+        if db_wp.get_lid(re_item) is not None:
             n_luke_vocab += 1
         # else:
         #     print(k)
@@ -447,7 +660,7 @@ def check_overlapping():
     n_turl_vocab = 0
     for k in turl_vocab:
         re_item = db_wp.get_redirect(k)
-        if db_wp.is_available(COLUMN.PAGES.value, re_item):
+        if db_wp.get_lid(re_item) is not None:
             n_turl_vocab += 1
         # else:
         #     print(k)
@@ -1,7 +1,12 @@
+import heapq
 import pickle
 import struct
+import tempfile
 from dataclasses import dataclass
-from typing import Any
+from itertools import groupby
+from operator import itemgetter
+from sys import getsizeof
+from typing import Any, Callable, Iterable, Iterator, List, Optional
 
 import msgpack
 import numpy
@@ -9,6 +14,7 @@ from lz4 import frame
 from pyroaring import BitMap
 
 from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
 
 # from rocksdb.interfaces import AssociativeMergeOperator, Comparator, SliceTransform
 
@@ -295,6 +301,148 @@ def is_wikidata_item(wd_id):
     return True
 
 
+def write_run(run_file: str, items: Iterable, chunk_size: int = 10_000) -> int:
+    """
+    Spill (key, value) items, sorted by key, to a run file of pickled chunks
+    """
+    n_items = 0
+    with open(run_file, "wb") as f:
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+                n_items += len(chunk)
+                chunk = []
+        if chunk:
+            pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+            n_items += len(chunk)
+    return n_items
+
+
+def read_run(run_file: str) -> Iterator:
+    with open(run_file, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                break
+            yield from chunk
+
+
+def merge_runs(run_files: List[str], merge_group: Callable = None) -> Iterator:
+    """
+    k-way merge of sorted runs, items of the same key are merged with
+    merge_group(values) (default: the last value)
+    """
+    items = heapq.merge(*[read_run(r) for r in run_files], key=itemgetter(0))
+    for key, group in groupby(items, key=itemgetter(0)):
+        values = [value for _, value in group]
+        yield key, merge_group(values) if merge_group else values[-1]
+
+
+def union_sets(values):
+    return set().union(*values)
+
+
+class ExternalGroupBy(object):
+    """
+    Group (key, value) items by key with bounded memory. The groups are kept in
+    memory until their estimated size reaches buff_limit bytes, then they are
+    spilled sorted by key to a run file. items() merges the runs on output.
+    is_set: the values of a key are collected in a set, otherwise the last added
+    value is kept.
+    run_prefix: prefix of the run files, the caller owns them (get_runs). By
+    default, they are written to a temporary folder deleted by close().
+    buff_limit and tmp_dir default to the config values when the group is created.
+    """
+
+    # Approximate bytes of a dict entry with its empty set, and of a set entry
+    GROUP_OVERHEAD = 320
+    VALUE_OVERHEAD = 32
+
+    def __init__(
+        self,
+        is_set: bool = True,
+        buff_limit: Optional[int] = None,
+        run_prefix: Optional[str] = None,
+        tmp_dir: Optional[str] = None,
+    ):
+        self.is_set = is_set
+        self.buff_limit = cf.GROUP_BY_BUFF_LIMIT if buff_limit is None else buff_limit
+        self.run_prefix = run_prefix
+        self.tmp_dir = cf.DIR_TEMP if tmp_dir is None else tmp_dir
+        self.run_dir = None
+        self.run_files = []
+        self.groups = dict()
+        self.buff_size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, key: Any, value: Any):
+        if self.is_set:
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = set()
+                self.buff_size += getsizeof(key) + self.GROUP_OVERHEAD
+            elif value in group:
+                return
+            group.add(value)
+        else:
+            if key not in self.groups:
+                self.buff_size += getsizeof(key) + self.GROUP_OVERHEAD
+            self.groups[key] = value
+        self.buff_size += getsizeof(value) + self.VALUE_OVERHEAD
+        if self.buff_size >= self.buff_limit:
+            self.spill()
+
+    def update(self, key: Any, values: Iterable):
+        for value in values:
+            self.add(key, value)
+
+    def spill(self):
+        if not self.groups:
+            return
+        run_prefix = self.run_prefix
+        if run_prefix is None:
+            if self.run_dir is None:
+                iw.create_dir(self.tmp_dir + "/")
+                self.run_dir = tempfile.mkdtemp(prefix="group_by_", dir=self.tmp_dir)
+            run_prefix = f"{self.run_dir}/run"
+        run_file = f"{run_prefix}_{len(self.run_files)}.pkl"
+        write_run(run_file, sorted(self.groups.items(), key=itemgetter(0)))
+        self.run_files.append(run_file)
+        self.groups = dict()
+        self.buff_size = 0
+
+    def get_runs(self) -> List[str]:
+        # Spill the remaining groups, and return all run files
+        self.spill()
+        return list(self.run_files)
+
+    def items(self) -> Iterator:
+        """
+        (key, values) sorted by key
+        """
+        if not self.run_files:
+            yield from sorted(self.groups.items(), key=itemgetter(0))
+            return
+        self.spill()
+        yield from merge_runs(self.run_files, union_sets if self.is_set else None)
+
+    def close(self):
+        self.groups = dict()
+        self.buff_size = 0
+        self.run_files = []
+        if self.run_dir:
+            iw.delete_folder(self.run_dir)
+            self.run_dir = None
+
+
 # def preprocess_data_before_dump(
 #     data,
 #     integerkey=False,
@@ -1,9 +1,11 @@
+import asyncio
 import http.client
+import os
 import re
 from collections import defaultdict
 
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk, streaming_bulk
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from elasticsearch.helpers import bulk, parallel_bulk, streaming_bulk
 from tqdm import tqdm
 
 from kgdb.config import config as cf
@@ -16,9 +18,7 @@ http.client._MAXLINE = 655360
 
 class ESearch(object):
     def __init__(self):
-        self.client = Elasticsearch(
-            [{"host": "localhost", "port": 9200, "timeout": 300}]
-        )
+        self.client = Elasticsearch(cf.ES_HOSTS, request_timeout=cf.ES_TIMEOUT)
 
         self.index_en = cf.ES_INDEX_NAME_EN
         self.index_all = cf.ES_INDEX_NAME_ALL
@@ -35,7 +35,7 @@ class ESearch(object):
     def ping(self):
         respond = self.client.ping()
         if respond:
-            print("Elastic Search is running at localhost:9200")
+            print(f"Elastic Search is running at {', '.join(cf.ES_HOSTS)}")
             return True
         else:
             print("Could not connect Elastic Search")
@@ -51,98 +51,274 @@ class ESearch(object):
 
     @staticmethod
     def gen_index_docs(iter_items, index_name):
+        # Label ids are the document ids, resuming an index does not duplicate labels
         for label, label_id in iter_items:
-            yield {"_op_type": "index", "_index": index_name, "label": label}
+            yield {
+                "_op_type": "index",
+                "_index": index_name,
+                "_id": label_id,
+                "label": label,
+            }
+
+    @staticmethod
+    def get_checkpoint_file(index_name):
+        return f"{cf.DIR_DATABASES}/es_{index_name}_checkpoint.json"
+
+    def save_checkpoint(self, index_name, label_id):
+        iw.save_json_file(self.get_checkpoint_file(index_name), {"label_id": label_id})
+
+    def load_checkpoint(self, index_name):
+        # Return the last indexed label id
+        file_checkpoint = self.get_checkpoint_file(index_name)
+        if not os.path.exists(file_checkpoint):
+            return None
+        return iw.read_json_file(file_checkpoint).get("label_id")
 
-    def build_index(self, index_name, buff_size=100000, from_i=None):
-        if from_i is None:
-            from_i = 0
+    def build_index(
+        self,
+        index_name,
+        chunk_size=cf.ES_BULK_CHUNK_SIZE,
+        thread_count=cf.ES_BULK_THREADS,
+        from_lid=None,
+    ):
+        """
+        Index labels in the label id order with parallel_bulk.
+        from_lid: None resumes after the label id of the checkpoint file.
+        The checkpoint stops before the first failed label, resuming the index
+        retries the failed labels (label ids are the document ids).
+        """
+        if from_lid is None:
+            from_lid = self.load_checkpoint(index_name)
+            from_lid = 0 if from_lid is None else from_lid + 1
+        lang = "en" if index_name == cf.ES_INDEX_NAME_EN else "all"
         db_labels = DBELabel()
-        if index_name == cf.ES_INDEX_NAME_EN:
-            iter_items = db_labels.iter_en(from_i)
-            total = db_labels.size_labels_en()
-        else:
-            iter_items = db_labels.iter_all()
-            total = db_labels.size_labels_all()
+        iter_items = db_labels.iter_labels(lang, from_lid=from_lid)
+        total = db_labels.size_labels(lang, from_lid=from_lid)
         obj_gen = self.gen_index_docs(iter_items, index_name)
-        if from_i:
-            total -= from_i
 
-        for status, response in tqdm(
-            streaming_bulk(self.client, chunk_size=buff_size, actions=obj_gen),
-            total=total,
-            desc=f"{index_name}",
-        ):
-            if not status:
-                iw.print_status(response)
+        # No refresh while loading
+        self.client.indices.put_settings(
+            index=index_name, body={"index": {"refresh_interval": "-1"}}
+        )
+        label_id, failed_ids, is_done = None, [], False
+        try:
+            for i, (status, response) in enumerate(
+                tqdm(
+                    parallel_bulk(
+                        self.client,
+                        actions=obj_gen,
+                        thread_count=thread_count,
+                        chunk_size=chunk_size,
+                        raise_on_error=False,
+                    ),
+                    total=total,
+                    desc=f"{index_name}",
+                )
+            ):
+                if not status:
+                    iw.print_status(response)
+                    failed_ids.append(response["index"].get("_id"))
+                    continue
+                if failed_ids:
+                    continue
+                # parallel_bulk keeps the order of actions
+                label_id = int(response["index"]["_id"])
+                if i and i % chunk_size == 0:
+                    self.save_checkpoint(index_name, label_id)
+            is_done = True
+        finally:
+            if label_id is not None:
+                self.save_checkpoint(index_name, label_id)
+            try:
+                self.client.indices.put_settings(
+                    index=index_name, body={"index": {"refresh_interval": None}}
+                )
+                self.client.indices.refresh(index=index_name)
+            except Exception as message:
+                # Do not hide the indexing error
+                if is_done:
+                    raise
+                iw.print_status(message)
+        if failed_ids:
+            iw.print_status(
+                f"{index_name}: {len(failed_ids)} labels failed, the checkpoint is "
+                f"label {label_id}. Build the index again to retry them."
+            )
+        return failed_ids
+
+    @staticmethod
+    def get_query_body(input_text, is_fuzzy=False):
+        if is_fuzzy:
+            query = {"fuzzy": {"label": input_text}}
+        else:
+            query = {"match": {"label": input_text}}
+        return {"size": cf.LIMIT_SEARCH_ES, "_source": ["label"], "query": query}
 
-    def search_label(self, input_text, lang="en", fuzzy=False):
-        input_text = norm_text(input_text, punctuations=False)
+    @staticmethod
+    def parse_hits(response):
+        # Return {label: raw score} of a search response
+        res = defaultdict(float)
+        # _max_score = 0
+        if response.get("hits", []):
+            # if response["hits"].get("max_score"):
+            #     _max_score = response["hits"]["max_score"]
+            for hit in response["hits"].get("hits", []):
+                if not hit.get("_source"):
+                    continue
+                res[hit["_source"]["label"]] = max(
+                    res[hit["_source"]["label"]], hit["_score"]
+                )
+        return res
+
+    @classmethod
+    def get_msearch_body(cls, queries, index_name):
+        body = []
+        for input_text, is_fuzzy in queries:
+            body.append({"index": index_name})
+            body.append(cls.get_query_body(input_text, is_fuzzy))
+        return body
 
-        def combine_result(is_fuzzy=False):
-            res = defaultdict(float)
-            index_name = self.index_en if lang == "en" else self.index_all
+    def search_hits_batch(self, queries, lang="en", batch_size=cf.ES_MSEARCH_SIZE):
+        # queries: [(input_text, is_fuzzy)], one _msearch request per batch_size queries
+        index_name = self.index_en if lang == "en" else self.index_all
+        responds = []
+        for i in range(0, len(queries), batch_size):
+            batch = queries[i : i + batch_size]
+            body = self.get_msearch_body(batch, index_name)
             try:
-                if is_fuzzy:
-                    q_text = {
-                        "size": cf.LIMIT_SEARCH_ES,
-                        "query": {"fuzzy": {"label": input_text}},
-                    }
-                else:
-                    q_text = {
-                        "size": cf.LIMIT_SEARCH_ES,
-                        "query": {"match": {"label": input_text}},
-                    }
-                response = self.client.search(index=index_name, body=q_text)
+                responses = self.client.msearch(body=body).get("responses", [])
             except Exception as message:
                 iw.print_status(message)
-                response = {}
-            # _max_score = 0
-            if response.get("hits", []):
-                # if response["hits"].get("max_score"):
-                #     _max_score = response["hits"]["max_score"]
-                for hit in response["hits"].get("hits", []):
-                    if not hit.get("_source"):
-                        continue
-                    res[hit["_source"]["label"]] = max(
-                        res[hit["_source"]["label"]], hit["_score"]
-                    )
-            if res:
-                min_scores = min(res.values())
-                div_scores = max(res.values()) - min_scores
-                if div_scores:
-                    res = {k: ((v - min_scores) / div_scores) for k, v in res.items()}
-                else:
-                    res = {k: (v / min_scores) for k, v in res.items()}
-            return res
-
-        responds = combine_result(is_fuzzy=False)
+                responses = []
+            if len(responses) != len(batch):
+                responses = [{}] * len(batch)
+            responds.extend(self.parse_hits(response) for response in responses)
+        return responds
 
-        # responds = defaultdict(float)
-        # for res_i, res_s in res_bm25.items():
-        #     responds[res_i] += res_s
+    def search_hits(self, input_text, lang="en", is_fuzzy=False):
+        return self.search_hits_batch([(input_text, is_fuzzy)], lang=lang)[0]
+
+    @staticmethod
+    def norm_scores(res):
+        if res:
+            min_scores = min(res.values())
+            div_scores = max(res.values()) - min_scores
+            if div_scores:
+                res = {k: ((v - min_scores) / div_scores) for k, v in res.items()}
+            else:
+                res = {k: (v / min_scores) for k, v in res.items()}
+        return res
+
+    def search_labels(self, input_texts, lang="en", fuzzy=False):
+        # Return {input_text: (responds, max_score)}, all match (and fuzzy) queries
+        # of the inputs are sent together
+        texts, queries = self.get_label_queries(input_texts, fuzzy=fuzzy)
+        hits = self.search_hits_batch(queries, lang=lang)
+        return self.combine_label_hits(texts, hits, fuzzy=fuzzy)
+
+    @staticmethod
+    def get_label_queries(input_texts, fuzzy=False):
+        # Return {input_text: normalized text}, and the [(text, is_fuzzy)] queries
+        texts = {
+            input_text: norm_text(input_text, punctuations=False)
+            for input_text in input_texts
+        }
+        norm_texts = list(dict.fromkeys(texts.values()))
+        queries = [(norm_text_, False) for norm_text_ in norm_texts]
         if fuzzy:
-            res_fuzzy = None
-            try:
-                res_fuzzy = combine_result(is_fuzzy=True)
-            except Exception as message:
-                iw.print_status(message, is_screen=False)
-            if res_fuzzy:
-                for res_i, res_s in res_fuzzy.items():
-                    if responds.get(res_i):
-                        responds[res_i] = max(res_s, responds[res_i])
-                    else:
-                        responds[res_i] = res_s
-                    # responds = {k: v / 2. for k, v in responds.items()}
-        if responds:
-            max_score = max(responds.values())
-        else:
-            max_score = 0
-        # if max_score:
-        #     res = {k: (v / max_score) for k, v in res.items()}
-        return responds, max_score
+            queries += [(norm_text_, True) for norm_text_ in norm_texts]
+        return texts, queries
+
+    @classmethod
+    def combine_label_hits(cls, texts, hits, fuzzy=False):
+        norm_texts = list(dict.fromkeys(texts.values()))
+        results = dict()
+        for i, norm_text_ in enumerate(norm_texts):
+            responds = cls.norm_scores(hits[i])
+
+            # responds = defaultdict(float)
+            # for res_i, res_s in res_bm25.items():
+            #     responds[res_i] += res_s
+            if fuzzy:
+                res_fuzzy = cls.norm_scores(hits[i + len(norm_texts)])
+                if res_fuzzy:
+                    for res_i, res_s in res_fuzzy.items():
+                        if responds.get(res_i):
+                            responds[res_i] = max(res_s, responds[res_i])
+                        else:
+                            responds[res_i] = res_s
+                        # responds = {k: v / 2. for k, v in responds.items()}
+            if responds:
+                max_score = max(responds.values())
+            else:
+                max_score = 0
+            # if max_score:
+            #     res = {k: (v / max_score) for k, v in res.items()}
+            results[norm_text_] = (responds, max_score)
+        return {
+            input_text: results[norm_text_] for input_text, norm_text_ in texts.items()
+        }
+
+    def search_label(self, input_text, lang="en", fuzzy=False):
+        return self.search_labels([input_text], lang=lang, fuzzy=fuzzy)[input_text]
+
+    @staticmethod
+    def get_query_variants(input_text):
+        # All texts search_wd may query for an input
+        variants = [input_text]
+        if "(" in input_text:
+            variants.append(re.sub(r"\((.*)\)", "", input_text).strip())
+        if "[" in input_text:
+            variants.append(re.sub(r"\([.*]\)", "", input_text).strip())
+            variants.append(re.sub(r"\[(.*)\]", "", input_text))
+        if '("' in input_text:
+            new_query_string = re.search(r"\(\"(.*)\"\)", input_text)
+            if new_query_string:
+                variants.append(new_query_string.group(1))
+        return variants
 
     def search_wd(self, input_text, limit=0, lang="en", fuzzy=False):
+        return self.search_wd_batch([input_text], limit=limit, lang=lang, fuzzy=fuzzy)[
+            0
+        ]
+
+    def search_wd_batch(self, input_texts, limit=0, lang="en", fuzzy=False):
+        """
+        Batch version of search_wd: the queries of all inputs and their variants
+        (bracket and quote stripped) are sent in a few _msearch requests.
+        Return the list of search_wd results in the input order.
+        """
+        variants = self.get_wd_variants(input_texts)
+        results = dict()
+        if variants:
+            results = self.search_labels(variants, lang=lang, fuzzy=fuzzy)
+        return self.merge_wd_variants(input_texts, results, limit=limit)
+
+    @classmethod
+    def get_wd_variants(cls, input_texts):
+        return list(
+            {
+                variant
+                for input_text in input_texts
+                if input_text and not is_wikidata_item(input_text)
+                for variant in cls.get_query_variants(input_text)
+            }
+        )
+
+    @classmethod
+    def merge_wd_variants(cls, input_texts, results, limit=0):
+        # results: {variant: (responds, max_score)} of search_labels
+        def search_label(query_text):
+            responds_label, max_score = results[query_text]
+            return dict(responds_label), max_score
+
+        return [
+            cls.merge_variants(input_text, search_label, limit=limit)
+            for input_text in input_texts
+        ]
+
+    @staticmethod
+    def merge_variants(input_text, search_label, limit=0):
         if not input_text:
             return defaultdict(float)
         responds_label = defaultdict(float)
@@ -154,33 +330,25 @@ class ESearch(object):
         query_text = input_text
 
         if not responds_label:
-            responds_label, max_score = self.search_label(
-                query_text, lang=lang, fuzzy=fuzzy
-            )
+            responds_label, max_score = search_label(query_text)
 
         if not responds_label:
             if "(" in query_text:
                 new_query_string = re.sub(r"\((.*)\)", "", query_text).strip()
                 if new_query_string != query_text:
-                    responds_label, max_score = self.search_label(
-                        new_query_string, lang=lang, fuzzy=fuzzy
-                    )
+                    responds_label, max_score = search_label(new_query_string)
 
             if "[" in query_text:
                 new_query_string = re.sub(r"\([.*]\)", "", query_text).strip()
                 if new_query_string != query_text:
-                    responds_label, max_score = self.search_label(
-                        new_query_string, lang=lang, fuzzy=fuzzy
-                    )
+                    responds_label, max_score = search_label(new_query_string)
 
         if '("' in input_text:
             new_query_string = re.search(r"\(\"(.*)\"\)", input_text)
             if new_query_string:
                 new_query_string = new_query_string.group(1)
                 if new_query_string != input_text:
-                    extra, extra_max_score = self.search_label(
-                        new_query_string, lang=lang, fuzzy=fuzzy
-                    )
+                    extra, extra_max_score = search_label(new_query_string)
                     if extra:
                         for e_i, e_s in extra.items():
                             if not responds_label.get(e_i):
@@ -189,9 +357,7 @@ class ESearch(object):
         if "[" in input_text:
             new_query_string = re.sub(r"\[(.*)\]", "", input_text)
             if new_query_string != input_text:
-                extra, extra_max_score = self.search_label(
-                    new_query_string, lang=lang, fuzzy=fuzzy
-                )
+                extra, extra_max_score = search_label(new_query_string)
                 if extra:
                     responds_label = {k: v * 0.99 for k, v in responds_label.items()}
                     # responds_label_set = set(responds_label.keys())
@@ -227,3 +393,72 @@ class ESearch(object):
         if limit:
             responds = responds[:limit]
         return responds
+
+
+class AsyncESearch(ESearch):
+    """
+    asyncio version of the ESearch queries (search_label, search_wd and their
+    batch versions are coroutines) with AsyncElasticsearch
+    """
+
+    def __init__(self):
+        # AsyncElasticsearch runs on aiohttp (elasticsearch[async])
+        self.client = AsyncElasticsearch(cf.ES_HOSTS, request_timeout=cf.ES_TIMEOUT)
+
+        self.index_en = cf.ES_INDEX_NAME_EN
+        self.index_all = cf.ES_INDEX_NAME_ALL
+
+    async def close(self):
+        await self.client.close()
+
+    async def search_hits_batch(
+        self, queries, lang="en", batch_size=cf.ES_MSEARCH_SIZE
+    ):
+        index_name = self.index_en if lang == "en" else self.index_all
+
+        async def _msearch(batch):
+            body = self.get_msearch_body(batch, index_name)
+            try:
+                response = await self.client.msearch(body=body)
+                responses = response.get("responses", [])
+            except Exception as message:
+                iw.print_status(message)
+                responses = []
+            if len(responses) != len(batch):
+                responses = [{}] * len(batch)
+            return [self.parse_hits(response) for response in responses]
+
+        responds = await asyncio.gather(
+            *[
+                _msearch(queries[i : i + batch_size])
+                for i in range(0, len(queries), batch_size)
+            ]
+        )
+        return [hits for batch in responds for hits in batch]
+
+    async def search_hits(self, input_text, lang="en", is_fuzzy=False):
+        return (await self.search_hits_batch([(input_text, is_fuzzy)], lang=lang))[0]
+
+    async def search_labels(self, input_texts, lang="en", fuzzy=False):
+        texts, queries = self.get_label_queries(input_texts, fuzzy=fuzzy)
+        hits = await self.search_hits_batch(queries, lang=lang)
+        return self.combine_label_hits(texts, hits, fuzzy=fuzzy)
+
+    async def search_label(self, input_text, lang="en", fuzzy=False):
+        return (await self.search_labels([input_text], lang=lang, fuzzy=fuzzy))[
+            input_text
+        ]
+
+    async def search_wd_batch(self, input_texts, limit=0, lang="en", fuzzy=False):
+        variants = self.get_wd_variants(input_texts)
+        results = dict()
+        if variants:
+            results = await self.search_labels(variants, lang=lang, fuzzy=fuzzy)
+        return self.merge_wd_variants(input_texts, results, limit=limit)
+
+    async def search_wd(self, input_text, limit=0, lang="en", fuzzy=False):
+        return (
+            await self.search_wd_batch(
+                [input_text], limit=limit, lang=lang, fuzzy=fuzzy
+            )
+        )[0]
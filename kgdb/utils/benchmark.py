@@ -2,13 +2,13 @@ import os
 from datetime import datetime
 from typing import Callable
 
-import psutil
-
 from kgdb.utils import io_worker as iw
 
 
 def profile(func: Callable):
     def wrapper(*args, **kwargs):
+        import psutil
+
         process = psutil.Process(os.getpid())
         mem_before = process.memory_info()
         start = datetime.now()
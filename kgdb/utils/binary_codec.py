@@ -0,0 +1,176 @@
+"""
+Schema-aware binary codec of the dict values of the database columns.
+
+The values of the hot columns are dicts of a few shapes: the literals of Wikidata
+claims {type: {prop_lid: [values]}}, the labels {lang: label}, the sitelinks
+{site: title}. They are encoded with an index of their keys:
+- tag (1 byte), number of keys (varint)
+- keys: unsigned integer keys (e.g., property LIDs), or interned string keys
+  (e.g., claim types, languages, sites) stored as their index in the key table of
+  the column, packed in a little-endian array of the smallest width (1, 2, 4, 8)
+- offsets of the values (packed array), and the values as one msgpack array
+A whole value is decoded with one msgpack call (C), one key of a value is decoded
+without the other values (loads_field). Other values are stored as msgpack.
+"""
+
+import struct
+from itertools import accumulate
+from typing import Any, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import msgpack
+
+MSGPACK = 0
+KEYS_INT = 1
+KEYS_STR = 2
+
+# Width of the packed arrays: struct format
+WIDTH_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+def get_width(max_value: int) -> int:
+    for width in (1, 2, 4):
+        if max_value < 1 << (8 * width):
+            return width
+    return 8
+
+
+def write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = buf[pos]
+    if result < 0x80:
+        return result, pos + 1
+    result &= 0x7F
+    shift = 7
+    while True:
+        pos += 1
+        byte = buf[pos]
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos + 1
+        shift += 7
+
+
+def write_ints(out: bytearray, values: Sequence[int]):
+    width = get_width(max(values))
+    out.append(width)
+    out += struct.pack(f"<{len(values)}{WIDTH_FORMATS[width]}", *values)
+
+
+def read_ints(buf: bytes, pos: int, n: int) -> Tuple[Sequence[int], int]:
+    width = buf[pos]
+    pos += 1
+    if width == 1:
+        # Bytes are sequences of integers (buf can be a memoryview of LMDB)
+        return bytes(buf[pos : pos + n]), pos + n
+    values = struct.unpack_from(f"<{n}{WIDTH_FORMATS[width]}", buf, pos)
+    return values, pos + n * width
+
+
+def set_default(obj):
+    # Sets are stored as sorted lists, as the freaddb values
+    if isinstance(obj, set):
+        return sorted(obj)
+    raise TypeError
+
+
+def packb(value: Any) -> bytes:
+    return msgpack.packb(value, default=set_default)
+
+
+def unpackb(buf: bytes) -> Any:
+    # Same options as the freaddb values
+    return msgpack.unpackb(buf, strict_map_key=False)
+
+
+def is_uint(value: Any) -> bool:
+    return type(value) is int and value >= 0
+
+
+class BinaryCodec(object):
+    """
+    Encoder and decoder of the values of a column. keys: key table of the column,
+    dicts with other string keys are stored as msgpack.
+    """
+
+    def __init__(self, keys: Optional[List[str]] = None):
+        self.keys = list(keys) if keys else []
+        self.key_ids = {key: i for i, key in enumerate(self.keys)}
+
+    def dumps(self, value: Any) -> bytes:
+        keys = list(value.keys()) if isinstance(value, dict) else None
+        if not keys:
+            tag = MSGPACK
+        elif all(is_uint(k) for k in keys):
+            tag = KEYS_INT
+        elif all(type(k) is str and k in self.key_ids for k in keys):
+            tag = KEYS_STR
+            keys = [self.key_ids[k] for k in keys]
+        else:
+            tag = MSGPACK
+        if tag == MSGPACK:
+            return bytes([MSGPACK]) + packb(value)
+
+        values = [packb(v) for v in value.values()]
+        header = msgpack.Packer().pack_array_header(len(values))
+        out = bytearray([tag])
+        write_varint(out, len(keys))
+        write_ints(out, keys)
+        write_ints(out, list(accumulate([len(header)] + [len(v) for v in values[:-1]])))
+        out += header
+        for v in values:
+            out += v
+        return bytes(out)
+
+    def loads(self, buf: bytes) -> Any:
+        tag = buf[0]
+        if tag == MSGPACK:
+            return unpackb(buf[1:])
+        n, pos = read_varint(buf, 1)
+        keys, pos = read_ints(buf, pos, n)
+        # Offsets of the values are only read by loads_field
+        pos += 1 + n * buf[pos]
+        if tag == KEYS_STR:
+            keys = map(self.keys.__getitem__, keys)
+        return dict(zip(keys, unpackb(buf[pos:])))
+
+    def loads_field(self, buf: bytes, key: Hashable) -> Any:
+        """
+        value.get(key) of a dict value, the other values are not decoded
+        """
+        tag = buf[0]
+        if tag == MSGPACK:
+            value = unpackb(buf[1:])
+            return value.get(key) if isinstance(value, dict) else None
+        if tag == KEYS_STR:
+            key = self.key_ids.get(key)
+        if not isinstance(key, int):
+            return None
+        n, pos = read_varint(buf, 1)
+        keys, pos = read_ints(buf, pos, n)
+        try:
+            i = keys.index(key)
+        except ValueError:
+            return None
+        starts, pos = read_ints(buf, pos, n)
+        end = pos + starts[i + 1] if i + 1 < n else len(buf)
+        return unpackb(buf[pos + starts[i] : end])
+
+
+def get_key_table(values: Iterable[Any], max_keys: int) -> List[str]:
+    """
+    Key table of a column: the most frequent string keys of its dict values
+    """
+    counter = dict()
+    for value in values:
+        if isinstance(value, dict):
+            for key in value:
+                if type(key) is str:
+                    counter[key] = counter.get(key, 0) + 1
+    keys = sorted(counter, key=lambda k: counter[k], reverse=True)
+    return keys[:max_keys]
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import lmdb
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+
+
+def get_files_version(dirs: List[str]) -> str:
+    """
+    Version of the database builds in dirs: hash of the size and modification time of
+    their data files. The metadata files of FReadDB are rewritten each time a database
+    is opened, they are skipped.
+    """
+    stamps = []
+    for db_dir in dirs:
+        if not os.path.isdir(db_dir):
+            continue
+        for root, _, files in sorted(os.walk(db_dir)):
+            for file in sorted(files):
+                if file.endswith("_metadata.json") or file.endswith("-lock"):
+                    continue
+                stat = os.stat(os.path.join(root, file))
+                stamps.append(f"{root}/{file}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.blake2b(
+        "\n".join(stamps).encode(cf.ENCODING), digest_size=8
+    ).hexdigest()
+
+
+class LRUCache(object):
+    """
+    Thread-safe in-process LRU cache, entries expire after ttl seconds (0: never).
+    Values are returned as stored, not copied.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: Any):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expire, value = item
+            if expire and expire < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any):
+        expire = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._items[key] = (expire, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class DiskCache(object):
+    """
+    LMDB cache shared by processes, keys are hashed, values are pickled with their
+    expire time
+    """
+
+    def __init__(self, db_file: str, ttl: float = 0, map_size: int = cf.SIZE_1GB):
+        iw.create_dir(db_file)
+        self.ttl = ttl
+        self.env = lmdb.open(db_file, map_size=map_size, subdir=False, lock=True)
+
+    def get(self, key: bytes):
+        with self.env.begin() as txn:
+            value = txn.get(key)
+        if value is None:
+            return None
+        expire, value = pickle.loads(value)
+        if expire and expire < time.time():
+            return None
+        return value
+
+    def set(self, key: bytes, value: Any):
+        expire = time.time() + self.ttl if self.ttl else 0
+        value = pickle.dumps((expire, value), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            with self.env.begin(write=True) as txn:
+                txn.put(key, value)
+        except lmdb.MapFullError:
+            # Full cache: start over
+            self.clear()
+
+    def clear(self):
+        with self.env.begin(write=True) as txn:
+            txn.drop(self.env.open_db(), delete=False)
+
+    def close(self):
+        self.env.close()
+
+
+class QueryCache(object):
+    """
+    Two-tier query result cache: in-process LRU, then an optional LMDB file.
+    Entries of other versions (e.g., another database build) are never returned.
+    """
+
+    def __init__(
+        self,
+        version: str = "",
+        max_size: int = 100_000,
+        ttl: float = 0,
+        db_file: Optional[str] = None,
+    ):
+        self.version = version
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.disk = DiskCache(db_file, ttl=ttl) if db_file else None
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def get_disk_key(self, key: Any) -> bytes:
+        return hashlib.blake2b(
+            repr((self.version, key)).encode(cf.ENCODING), digest_size=16
+        ).digest()
+
+    def get(self, key: Any):
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits_memory += 1
+            return value
+        if self.disk is not None:
+            value = self.disk.get(self.get_disk_key(key))
+            if value is not None:
+                self.hits_disk += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def get_many(self, keys: List[Any]) -> List[Any]:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: Any, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(self.get_disk_key(key), value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        n_requests = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "version": self.version,
+            "size_memory": len(self.memory),
+            "requests": n_requests,
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (
+                (self.hits_memory + self.hits_disk) / n_requests if n_requests else 0
+            ),
+        }
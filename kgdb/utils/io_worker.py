@@ -8,7 +8,6 @@ import pickle
 import shutil
 import zlib
 
-import numpy
 import ujson
 
 
@@ -177,6 +176,8 @@ def load_object_csv(file_name, encoding="utf-8"):
 
 
 def save_object_csv(file_name, rows):
+    import numpy
+
     create_dir(file_name)
     temp_file = "%s.temp" % file_name
     with open(temp_file, "w") as f:
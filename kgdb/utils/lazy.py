@@ -0,0 +1,46 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from kgdb.utils import io_worker as iw
+
+
+class Singletons(object):
+    """
+    Shared instances created on first use (thread-safe), and released with
+    release(), e.g. to close databases and free memory. Released instances are
+    created again on next use.
+    """
+
+    def __init__(self):
+        self._instances: Dict[str, Any] = dict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, name: str):
+        return name in self._instances
+
+    def get(self, name: str, create: Callable[[], Any]):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = create()
+                    self._instances[name] = instance
+        return instance
+
+    def pop(self, name: str):
+        with self._lock:
+            return self._instances.pop(name, None)
+
+    def release(self, name: Optional[str] = None):
+        with self._lock:
+            names = list(self._instances.keys()) if name is None else [name]
+            for name_ in names:
+                instance = self._instances.pop(name_, None)
+                close = getattr(instance, "close", None)
+                if not callable(close):
+                    continue
+                try:
+                    close()
+                except Exception as message:
+                    iw.print_status(message, is_screen=False)
@@ -0,0 +1,163 @@
+"""
+Streaming N-Triples tokenizer working on the bytes of the dump lines.
+
+Subjects and predicates are returned as IRI strings, objects are kept as bytes and
+decoded on demand: IRIs with get_iri, literals with parse_literal. Typed literals of
+the common XSD datatypes are decoded to Python values without rdflib.
+"""
+
+import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterator, Optional, Tuple
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+def parse_boolean(value: str) -> bool:
+    if value in {"true", "1"}:
+        return True
+    if value in {"false", "0"}:
+        return False
+    raise ValueError(value)
+
+
+LITERAL_PARSERS = {
+    f"{XSD}{datatype}".encode(cf.ENCODING): parser
+    for datatypes, parser in [
+        (
+            [
+                "integer",
+                "int",
+                "long",
+                "short",
+                "byte",
+                "nonNegativeInteger",
+                "nonPositiveInteger",
+                "positiveInteger",
+                "negativeInteger",
+                "unsignedLong",
+                "unsignedInt",
+                "unsignedShort",
+                "unsignedByte",
+            ],
+            int,
+        ),
+        (["double", "float"], float),
+        (["decimal"], Decimal),
+        (["boolean"], parse_boolean),
+        (["date"], datetime.date.fromisoformat),
+        (["dateTime"], datetime.datetime.fromisoformat),
+    ]
+    for datatype in datatypes
+}
+
+
+def split_triple(line: bytes) -> Optional[Tuple[str, str, bytes]]:
+    """
+    <subject> <predicate> object . -> (subject IRI, predicate IRI, object bytes)
+    Comments, blank lines and blank node subjects return None.
+    """
+    if line[:1] != b"<":
+        return None
+    # IRIs do not contain spaces, terms of the dumps are separated by one space
+    triple = line.split(b" ", 2)
+    if len(triple) < 3 or triple[1][:1] != b"<":
+        return None
+    subject, predicate, obj = triple
+    obj = obj.rstrip()
+    if obj[-1:] == b".":
+        obj = obj[:-1].rstrip()
+    if not obj:
+        return None
+    return (
+        subject[1:-1].decode(cf.ENCODING),
+        predicate[1:-1].decode(cf.ENCODING),
+        obj,
+    )
+
+
+def iter_triples(
+    file: str, subject_prefix: Optional[str] = None
+) -> Iterator[Tuple[str, str, bytes]]:
+    # Lines of other subjects are skipped before they are split
+    prefix = b"<" + subject_prefix.encode(cf.ENCODING) if subject_prefix else b"<"
+    for line in iw.read_line_from_file(file, mode="rb"):
+        if not line.startswith(prefix):
+            continue
+        triple = split_triple(line)
+        if triple:
+            yield triple
+
+
+def get_iri(obj: bytes) -> Optional[str]:
+    if obj[:1] != b"<":
+        return None
+    return obj[1:-1].decode(cf.ENCODING)
+
+
+def remove_iri_prefix(iri: str) -> str:
+    # Local name of the IRIs of the known namespaces (cf.PREFIX_LIST)
+    if iri.startswith(cf.DBR):
+        return iri[len(cf.DBR) :]
+    for prefix in cf.PREFIX_LIST:
+        if iri.startswith(prefix):
+            return iri[len(prefix) :]
+    return iri
+
+
+def unescape(value: bytes) -> str:
+    if b"\\" not in value:
+        return value.decode(cf.ENCODING)
+    # Same as rdflib: \uXXXX, \" and the other string escapes, \x is not one
+    value = value.decode(cf.ENCODING).replace(r"\"", '"').replace(r"\x", r"\\x")
+    try:
+        return value.encode("raw-unicode-escape").decode("unicode-escape")
+    except UnicodeDecodeError:
+        return value
+
+
+def parse_literal(obj: bytes) -> Any:
+    """
+    Value of a literal: str for plain, language-tagged and unknown datatypes, and
+    int, float, Decimal, bool, date, datetime for the XSD datatypes. Values that
+    do not match their datatype are returned as text. Non-literals return None.
+    """
+    if obj[:1] != b'"':
+        return None
+    end = obj.rfind(b'"')
+    if end < 1:
+        return None
+    value = unescape(obj[1:end])
+    if obj[end + 1 : end + 4] == b"^^<":
+        parser = LITERAL_PARSERS.get(obj[end + 4 : -1])
+        if parser is not None:
+            try:
+                return parser(value)
+            except (ValueError, InvalidOperation):
+                pass
+    return value
+
+
+def to_text(value: Any) -> str:
+    # Canonical lexical form of a literal value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def get_object_text(obj: bytes) -> str:
+    """
+    IRIs: local name of the known namespaces, literals: text of their value
+    """
+    iri = get_iri(obj)
+    if iri is not None:
+        return remove_iri_prefix(iri)
+    value = parse_literal(obj)
+    if value is None:
+        return obj.decode(cf.ENCODING)
+    return to_text(value)
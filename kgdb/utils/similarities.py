@@ -1,4 +1,5 @@
 import jellyfish as jf
+import numpy as np
 from rapidfuzz import fuzz, process
 
 
@@ -89,6 +90,72 @@ def dis_hamming(str_1, str_2, is_lower=False):
     return dis_func(jf.hamming_distance, str_1, str_2, is_lower=is_lower)
 
 
+def dis_damerau_levenshtein_bounded(str_1, str_2, max_distance, is_lower=False):
+    """Calculate Damerau Levenshtein distance (optimal string alignment) with an
+    upper bound. The computation stops as soon as the distance exceeds max_distance
+
+    Args:
+        str_1 (str): string 1
+        str_2 (str): string 2
+        max_distance (int): maximum distance
+        is_lower (bool, optional): lower two strings. Defaults to False.
+
+    Returns:
+        int: distance, or max_distance + 1 if the distance is larger than max_distance
+    """
+    if is_lower:
+        str_1 = str_1.lower()
+        str_2 = str_2.lower()
+    if str_1 == str_2:
+        return 0
+
+    # Strip common prefix and suffix
+    len_1, len_2 = len(str_1), len(str_2)
+    start = 0
+    while start < len_1 and start < len_2 and str_1[start] == str_2[start]:
+        start += 1
+    while len_1 > start and len_2 > start and str_1[len_1 - 1] == str_2[len_2 - 1]:
+        len_1 -= 1
+        len_2 -= 1
+    str_1, str_2 = str_1[start:len_1], str_2[start:len_2]
+    if len(str_1) > len(str_2):
+        str_1, str_2 = str_2, str_1
+    len_1, len_2 = len(str_1), len(str_2)
+
+    if len_2 - len_1 > max_distance:
+        return max_distance + 1
+    if not len_1:
+        return len_2
+
+    row_pre_pre = None
+    row_pre = list(range(len_2 + 1))
+    for i in range(1, len_1 + 1):
+        row = [i] + [0] * len_2
+        row_min = i
+        c_1 = str_1[i - 1]
+        for j in range(1, len_2 + 1):
+            cost = 0 if c_1 == str_2[j - 1] else 1
+            value = min(row_pre[j] + 1, row[j - 1] + 1, row_pre[j - 1] + cost)
+            if (
+                row_pre_pre is not None
+                and j > 1
+                and c_1 == str_2[j - 2]
+                and str_1[i - 2] == str_2[j - 1]
+            ):
+                value = min(value, row_pre_pre[j - 2] + 1)
+            row[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        row_pre_pre, row_pre = row_pre, row
+
+    distance = row_pre[len_2]
+    if distance > max_distance:
+        return max_distance + 1
+    return distance
+
+
 def sim_jaro(str_1, str_2, is_lower=False):
     """Calculate Jaro similarity
 
@@ -211,6 +278,67 @@ def get_closest(str_1, str_list):
         return None
 
 
+def sim_fuzz_ratio_list(str_1, str_list, workers=-1, processor=None):
+    """Calculate Fuzz Levenshtein similarity of str_1 and every string in the list
+
+    Args:
+        str_1 (str): string 1
+        str_list (list): list of compared strings
+        workers (int, optional): number of threads, -1 uses all cores. Defaults to -1.
+        processor (function, optional): applied to all strings before the
+            comparison, e.g., rapidfuzz.utils.default_process. Defaults to None.
+
+    Returns:
+        np.ndarray: similarities, 0 means dissimilar or empty string, 1 means similar
+    """
+    if not str_1 or not len(str_list):
+        return np.zeros(len(str_list), dtype=np.float64)
+    str_list = [str_i if str_i else "" for str_i in str_list]
+    responds = process.cdist(
+        [str_1],
+        str_list,
+        scorer=fuzz.ratio,
+        processor=processor,
+        dtype=np.float64,
+        workers=workers,
+    )[0]
+    responds[[not str_i for str_i in str_list]] = 0
+    return responds / 100.0
+
+
+def get_closest_scores(str_1, str_groups, workers=-1, processor=None):
+    """Get the score of the closest string of each group, similar to
+    get_closest(str_1, group)[1] for all groups in one call
+
+    Args:
+        str_1 (str): string 1
+        str_groups (list): list of groups (lists) of compared strings
+        workers (int, optional): number of threads, -1 uses all cores. Defaults to -1.
+        processor (function, optional): applied to all strings before the
+            comparison. Defaults to None.
+
+    Returns:
+        np.ndarray: closest scores, 0 for empty groups
+    """
+    responds = np.zeros(len(str_groups), dtype=np.float64)
+    sizes = np.fromiter((len(group) for group in str_groups), dtype=np.int64)
+    str_list = [str_i for group in str_groups for str_i in group]
+    if not str_list:
+        return responds
+    sims = process.cdist(
+        [str_1],
+        str_list,
+        scorer=fuzz.ratio,
+        processor=processor,
+        dtype=np.float64,
+        workers=workers,
+    )[0]
+    non_empty = sizes > 0
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))[non_empty]
+    responds[non_empty] = np.maximum.reduceat(sims, offsets) / 100.0
+    return responds
+
+
 def get_closest_1(func, str_1, str_list):
     """Get the most relevant item to str_1 from the list of string
 
@@ -0,0 +1,139 @@
+"""
+Streaming parser of the rows of MySQL dumps (Wikipedia and Wikidata SQL dumps).
+
+The rows of the INSERT INTO ... VALUES (...),(...); lines are matched on bytes with
+one regular expression per row, only the projected columns are decoded. Lines are
+independent, they can be parsed in several processes (iter_sql_dump n_cpu).
+"""
+
+import re
+from contextlib import closing
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Iterator, Optional, Sequence, Tuple
+
+from kgdb.config import config as cf
+from kgdb.utils import io_worker as iw
+
+SQL_INSERT = b"INSERT INTO"
+SQL_VALUES = b"` VALUES "
+# Possessive quantifiers (Python 3.11+) avoid backtracking into the matched strings
+try:
+    re.compile(rb"a*+")
+    _P = rb"+"
+except re.error:
+    _P = rb""
+SQL_STRING = rb"'[^'\\]*" + _P + rb"(?:\\.[^'\\]*" + _P + rb")*" + _P + rb"'"
+# Projected field: (content of a quoted string, bare value: number, NULL)
+SQL_FIELD = (
+    rb"(?:'([^'\\]*" + _P + rb"(?:\\.[^'\\]*" + _P + rb")*" + _P + rb")'"
+    rb"|([^,()']*" + _P + rb"))"
+)
+SQL_SKIP = rb"(?:" + SQL_STRING + rb"|[^,()']*" + _P + rb")"
+SQL_ROW = re.compile(rb"\((?:" + SQL_STRING + rb"|[^,()']|,)*\)", re.S)
+SQL_ESCAPE = re.compile(rb"\\(.)", re.S)
+SQL_ESCAPES = {
+    b"0": b"\0",
+    b"b": b"\b",
+    b"n": b"\n",
+    b"r": b"\r",
+    b"t": b"\t",
+    b"Z": b"\x1a",
+}
+
+
+@lru_cache(maxsize=None)
+def get_row_pattern(n_columns: int, columns: Tuple[int, ...]):
+    # Only the projected columns are captured: (quoted string, bare value)
+    fields = [SQL_FIELD if c in columns else SQL_SKIP for c in range(n_columns)]
+    return re.compile(rb"\(" + rb",".join(fields) + rb"\)", re.S)
+
+
+def get_n_columns(values: bytes) -> int:
+    row = SQL_ROW.search(values)
+    if not row:
+        return 0
+    return re.sub(SQL_STRING, b"", row.group()).count(b",") + 1
+
+
+def unescape(value: bytes, errors: str = "strict") -> str:
+    if b"\\" in value:
+        value = SQL_ESCAPE.sub(lambda m: SQL_ESCAPES.get(m.group(1), m.group(1)), value)
+    return value.decode(cf.ENCODING, errors)
+
+
+def get_text(quoted: bytes, bare: bytes, errors: str = "strict") -> Optional[str]:
+    if quoted:
+        return unescape(quoted, errors)
+    if bare == b"NULL":
+        return None
+    return bare.decode(cf.ENCODING)
+
+
+def get_int(quoted: bytes, bare: bytes, errors: str = "strict") -> Optional[int]:
+    if quoted:
+        return int(quoted)
+    if bare == b"NULL":
+        return None
+    return int(bare)
+
+
+def iter_sql_rows(
+    line: bytes,
+    columns: Optional[Sequence[int]] = None,
+    int_columns: Sequence[int] = (),
+    errors: str = "strict",
+) -> Iterator[Tuple]:
+    """
+    Rows of an INSERT line as tuples of the projected columns (default: all)
+    Strings are unescaped and decoded, NULL is None, int_columns are converted
+    to int, other bare values (e.g., floats) are returned as text.
+    """
+    start = line.find(SQL_VALUES)
+    if start < 0:
+        return
+    values = line[start + len(SQL_VALUES) :]
+    n_columns = get_n_columns(values)
+    if not n_columns:
+        return
+    columns = tuple(range(n_columns) if columns is None else columns)
+    # The groups of the columns are in the order of the row
+    order = sorted(set(columns))
+    converters = [
+        (get_int if c in int_columns else get_text, 2 * order.index(c)) for c in columns
+    ]
+    for fields in get_row_pattern(n_columns, tuple(order)).findall(values):
+        yield tuple([func(fields[i], fields[i + 1], errors) for func, i in converters])
+
+
+def parse_sql_line(args):
+    return list(iter_sql_rows(*args))
+
+
+def iter_sql_dump(
+    file: str,
+    columns: Optional[Sequence[int]] = None,
+    int_columns: Sequence[int] = (),
+    n_cpu: int = 1,
+    errors: str = "strict",
+) -> Iterator[Tuple]:
+    """
+    Rows of a MySQL dump file in the dump order, see iter_sql_rows. With n_cpu > 1,
+    INSERT lines are parsed by a pool of processes.
+    """
+    lines = (
+        line
+        for line in iw.read_line_from_file(file, mode="rb")
+        if line.startswith(SQL_INSERT)
+    )
+    if n_cpu <= 1:
+        for line in lines:
+            yield from iter_sql_rows(line, columns, int_columns, errors)
+        return
+
+    with closing(Pool(processes=n_cpu)) as pool:
+        for rows in pool.imap(
+            parse_sql_line,
+            ((line, columns, int_columns, errors) for line in lines),
+        ):
+            yield from rows
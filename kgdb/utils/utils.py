@@ -1,4 +1,3 @@
-import csv
 import math
 import os
 import pickle
@@ -138,39 +137,6 @@ def isEnglish(s):
         return True
 
 
-def parse_sql_values(line):
-    values = line[line.find("` VALUES ") + 9 :]
-    latest_row = []
-    reader = csv.reader(
-        [values],
-        delimiter=",",
-        doublequote=False,
-        escapechar="\\",
-        quotechar="'",
-        strict=True,
-    )
-    for reader_row in reader:
-        for column in reader_row:
-            if len(column) == 0 or column == "NULL":
-                latest_row.append(chr(0))
-                continue
-            if column[0] == "(":
-                new_row = False
-                if len(latest_row) > 0:
-                    if latest_row[-1][-1] == ")":
-                        latest_row[-1] = latest_row[-1][:-1]
-                        new_row = True
-                if new_row:
-                    yield latest_row
-                    latest_row = []
-                if len(latest_row) == 0:
-                    column = column[1:]
-            latest_row.append(column)
-        if latest_row[-1][-2:] == ");":
-            latest_row[-1] = latest_row[-1][:-2]
-            yield latest_row
-
-
 #
 # def quote_url(input_str):
 #     return urllib.parse.quote(input_str,
@@ -69,6 +69,7 @@ def step_2_build_resources():
 
     # Build other information
     # wikipedia.build_information()
+    # wikipedia.build_link_graph()
     # dbpedia.build_information()
 
     # --> Wikidata
@@ -118,6 +119,8 @@ def run_build_db_wikipedia():
 
     def compact_db():
         db = DBWikipedia(readonly=False)
+        db.compress(zstd_columns=["PAGE_INFOBOX"])
+        db.close()
 
     @profile
     def run_speed(db: DBWikipedia, size=20_000):
@@ -150,6 +153,8 @@ def run_build_db_dbpedia():
 
     def compact_db():
         db = DBDBpedia(readonly=False)
+        db.compress(zstd_columns=["LABEL", "DESC", "ALIASES_ALL", "CLAIMS_STR"])
+        db.close()
 
     def run_examples():
         db_readonly = DBDBpedia(readonly=True)
@@ -204,6 +209,15 @@ def run_build_db_wikidata():
             DBPEDIA: 6,447,454
             WIKIPEDIA: 6,688,898
         """
+        db.close()
+        compact_db()
+
+    def compact_db():
+        db = DBWikidata(readonly=False)
+        # CLAIMS_LIT is kept in msgpack: its values have a few keys, get_item decodes
+        # them whole, and whole values decode faster in msgpack
+        db.compress(binary_columns=["LABELS", "DESC", "ALIASES", "SITELINKS"])
+        db.close()
 
     def run_examples():
         db_readonly = DBWikidata()
@@ -355,7 +369,7 @@ def run_build_db_labels():
 
 def run_build_db_deletes():
     def build():
-        build_db_deletes("en", prefix_len=10, max_distance=4)
+        build_db_deletes("en", prefix_len=10, max_distance=4, n_cpu=os.cpu_count())
         # DELETE: 1,642,420,151
 
         build_db_deletes("en", prefix_len=14, max_distance=2)
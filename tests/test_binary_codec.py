@@ -0,0 +1,45 @@
+import msgpack
+
+from kgdb.utils.binary_codec import (
+    BinaryCodec,
+    get_key_table,
+    read_varint,
+    unpackb,
+    write_varint,
+)
+
+
+def test_binary_codec():
+    values = [
+        {"string": {31: ["Q5"], 300: ["a", "b"]}, "quantity": {1082: [["+12", 7]]}},
+        {"en": "Tokyo", "ja": "東京", "vi": "Tô-ky-ô"},
+        {1: "a", 70_000: [1.5, None], 2**40: {"x": True}},
+        {"en": "Paris", "unknown": "not in the key table"},
+        {"en": "", "de": None},
+        {},
+        ["not", "a", "dict"],
+        "text",
+    ]
+    codec = BinaryCodec(get_key_table(values[:3], max_keys=100))
+    assert "unknown" not in codec.keys
+    for value in values:
+        buf = codec.dumps(value)
+        assert codec.loads(buf) == unpackb(msgpack.packb(value))
+        assert codec.loads(memoryview(buf)) == codec.loads(buf)
+        if isinstance(value, dict):
+            for key in list(value) + ["fr", 2, -1, None]:
+                assert codec.loads_field(buf, key) == unpackb(
+                    msgpack.packb(value.get(key))
+                )
+        else:
+            assert codec.loads_field(buf, "en") is None
+
+    buf = codec.dumps({"ja": "東京"})
+    assert codec.loads_field(memoryview(buf), "ja") == "東京"
+
+
+def test_read_varint():
+    for value in [0, 1, 127, 128, 300, 2**35]:
+        out = bytearray(b"\xff")
+        write_varint(out, value)
+        assert read_varint(out, 1) == (value, len(out))
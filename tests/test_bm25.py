@@ -0,0 +1,41 @@
+import numpy as np
+from pyroaring import BitMap
+
+from kgdb.resources.db.db_bm25 import bm25_top_k, get_fuzziness, tokenize
+
+
+def test_tokenize():
+    assert tokenize("new york new york") == ["new", "york"]
+    assert tokenize("") == []
+
+
+def test_get_fuzziness():
+    assert get_fuzziness("us") == 0
+    assert get_fuzziness("tokyo") == 1
+    assert get_fuzziness("kanagawa") == 2
+
+
+def test_bm25_top_k():
+    k1 = 1.2
+    norms = np.array([0.6, 1.2, 1.8, 1.0, 0.9], dtype=np.float32)
+    terms = [(2.0, BitMap([0, 1, 2])), (0.5, BitMap([1, 2, 3, 4])), (1.0, BitMap([4]))]
+    expected = np.zeros(len(norms))
+    for weight, posting in terms:
+        for label_id in posting:
+            expected[label_id] += weight * (k1 + 1) / (1 + norms[label_id])
+    expected_top = sorted(range(len(norms)), key=lambda i: -expected[i])
+
+    for limit in [0, 1, 2, 3]:
+        label_ids, scores = bm25_top_k(
+            terms, norms, k1=k1, min_norm=float(norms.min()), limit=limit
+        )
+        top = expected_top[:limit] if limit else expected_top
+        assert label_ids.tolist() == top
+        assert np.allclose(scores, expected[top])
+
+    # Ties are broken by label id: a term whose upper bound equals the k-th score
+    # can still add a better label
+    norms = np.ones(6, dtype=np.float32)
+    terms = [(1.0, BitMap([5])), (1.0, BitMap([0]))]
+    label_ids, scores = bm25_top_k(terms, norms, k1=k1, min_norm=1.0, limit=1)
+    assert label_ids.tolist() == [0]
@@ -0,0 +1,71 @@
+import time
+
+from kgdb.benchmarks.startup import build_synthetic_db, open_db
+from kgdb.utils.cache import LRUCache, QueryCache, get_files_version
+
+
+def test_lru_cache():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    # "b" is the least recently used item
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_query_cache(tmp_path):
+    key = ("tokyo", "en", "a", 20, False, False)
+    cache = QueryCache(version="1", db_file=str(tmp_path / "cache.lmdb"))
+    assert cache.get(key) is None
+    cache.set(key, [("Q1490", 0.9)])
+    assert cache.get(key) == [("Q1490", 0.9)]
+
+    # New process: served by the disk cache
+    cache.disk.close()
+    cache = QueryCache(version="1", db_file=str(tmp_path / "cache.lmdb"))
+    assert cache.get(key) == [("Q1490", 0.9)]
+    assert cache.stats()["hits_disk"] == 1
+
+    # Another database build
+    cache.disk.close()
+    cache = QueryCache(version="2", db_file=str(tmp_path / "cache.lmdb"))
+    assert cache.get(key) is None
+    assert cache.stats()["hit_rate"] == 0
+
+
+def test_get_files_version(tmp_path):
+    db_dir = str(tmp_path / "wikidata")
+    build_synthetic_db("DBWikidata", db_dir, n_items=10)
+    version = get_files_version([db_dir, str(tmp_path / "missing")])
+
+    # Opening the database rewrites its metadata, not its data files
+    db = open_db("DBWikidata", db_dir)
+    db.get_value("ID_LID", "q1")
+    db.close()
+    assert get_files_version([db_dir]) == version
+
+    # Another database build, later than the file timestamp granularity
+    time.sleep(0.05)
+    db = open_db("DBWikidata", db_dir, readonly=False)
+    db.add_buff("ID_LID", "q100", 100)
+    db.save_buff()
+    db.close()
+    new_version = get_files_version([db_dir])
+    assert new_version != version
+
+    key = ("tokyo", "en", "a", 20, False, False)
+    cache = QueryCache(version=version, db_file=str(tmp_path / "cache.lmdb"))
+    cache.set(key, [("Q1490", 0.9)])
+    cache.disk.close()
+    cache = QueryCache(version=new_version, db_file=str(tmp_path / "cache.lmdb"))
+    assert cache.get(key) is None
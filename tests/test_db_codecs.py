@@ -0,0 +1,106 @@
+import numpy as np
+
+from kgdb.benchmarks.startup import build_synthetic_db, open_db
+
+
+def test_compress_columns(tmp_path):
+    db_dir = str(tmp_path / "dbpedia")
+    build_synthetic_db("DBDBpedia", db_dir, n_items=10)
+
+    db = open_db("DBDBpedia", db_dir, readonly=False)
+    langs = ["en", "fr", "de", "ja", "vi"]
+    descs = {
+        i: {lang: f"Description {i} of item q{i} ({lang})" for lang in langs[: i % 5]}
+        for i in range(2000)
+    }
+    for lid, desc in descs.items():
+        db.add_buff("DESC", lid, desc)
+    db.save_buff()
+    db.compress(zstd_columns=["DESC"], print_status=False)
+    db.close()
+
+    db = open_db("DBDBpedia", db_dir)
+    stats = db.stats(head=0)["value_codecs"]["DESC"]
+    assert stats["zstd"]["size_zstd"] < stats["zstd"]["size"]
+    assert db.get_value("DESC", 7) == descs[7]
+    assert db.get_values("DESC", [1, 2, 3000]) == {1: descs[1], 2: descs[2]}
+    assert dict(db.get_db_iter("DESC")) == descs
+
+    assert db.get_values("DESC", np.array([1, 2])) == {1: descs[1], 2: descs[2]}
+
+    db.enable_stats()
+    assert db.get_value("DESC", 7) == descs[7]
+    assert db.get_values("DESC", [1, 2]) == {1: descs[1], 2: descs[2]}
+    assert db.get_values("DESC", np.array([1, 2])) == {1: descs[1], 2: descs[2]}
+    assert db.get_values("DESC", [1, 2], get_deserialize=False).keys() == {1, 2}
+    access = db.stats(access_only=True)["access"]["DESC"]
+    assert access["keys"] == 7 and access["found"] == 7
+    assert access["bytes_read"] > 0
+    db.disable_stats()
+    assert db.get_value("DESC", 7) == descs[7]
+    db.close()
+
+    # Values added to a compressed column are compressed with its dictionary
+    db = open_db("DBDBpedia", db_dir, readonly=False)
+    db.add_buff("DESC", 5000, {"en": "Description 5000 of item q5000 (en)"})
+    db.add_buff("DESC", 5001, {"fr": "Description"}, is_serialize_value=False)
+    db.add_buff_with_lid("DESC", 5002, {"de": "Beschreibung"})
+    db.save_buff()
+    db.close()
+    db = open_db("DBDBpedia", db_dir)
+    assert db.get_values("DESC", [5000, 5001, 5002]) == {
+        5000: {"en": "Description 5000 of item q5000 (en)"},
+        5001: {"fr": "Description"},
+        5002: {"de": "Beschreibung"},
+    }
+    assert db.get_value("DESC", 7) == descs[7]
+    db.close()
+
+
+def test_convert_columns(tmp_path):
+    db_dir = str(tmp_path / "dbpedia")
+    build_synthetic_db("DBDBpedia", db_dir, n_items=10)
+
+    db = open_db("DBDBpedia", db_dir, readonly=False)
+    langs = ["en", "fr", "de", "ja", "vi"]
+    descs = {
+        i: {lang: f"Description {i} ({lang})" for lang in langs[: i % 5]}
+        for i in range(2000)
+    }
+    for lid, desc in descs.items():
+        db.add_buff("DESC", lid, desc)
+    db.save_buff()
+    db.compress(binary_columns=["DESC"], zstd_columns=["DESC"], print_status=False)
+    db.close()
+
+    db = open_db("DBDBpedia", db_dir)
+    assert db.value_codecs["DESC"].format == "binary"
+    stats = db.stats(head=0)["value_codecs"]["DESC"]
+    assert stats["binary"]["keys"] == len(langs) - 1
+    assert db.get_value("DESC", 7) == descs[7]
+    assert dict(db.get_db_iter("DESC")) == descs
+    assert db.get_value_field("DESC", 7, "fr") == descs[7]["fr"]
+    assert db.get_value_field("DESC", 7, "vi") is None
+    assert db.get_value_field("DESC", 3000, "fr") is None
+    assert db.get_value_field("LABEL", 3000, "fr") is None
+
+    db.enable_stats()
+    assert db.get_value_field("DESC", 8, "de") == descs[8]["de"]
+    assert db.stats(access_only=True)["access"]["DESC"]["gets"] == 1
+    db.close()
+
+    # Values added to a binary column are encoded with its key table
+    db = open_db("DBDBpedia", db_dir, readonly=False)
+    db.add_buff("DESC", 5000, {"en": "Description 5000", "xx": "Unknown key"})
+    db.add_buff("DESC", 5001, {"fr": "Description"}, is_serialize_value=False)
+    db.add_buff_with_lid("DESC", 5002, ["not", "a", "dict"])
+    db.save_buff()
+    db.close()
+    db = open_db("DBDBpedia", db_dir)
+    assert db.get_values("DESC", [5000, 5001, 5002]) == {
+        5000: {"en": "Description 5000", "xx": "Unknown key"},
+        5001: {"fr": "Description"},
+        5002: ["not", "a", "dict"],
+    }
+    assert db.get_value_field("DESC", 5001, "fr") == "Description"
+    db.close()
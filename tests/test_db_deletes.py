@@ -0,0 +1,188 @@
+import pytest
+
+from kgdb.config import config as cf
+from kgdb.resources.db.db_deletes import (
+    DBDeletes,
+    get_delete_hash_column,
+    get_delete_shard,
+    get_deletes_hash_schema,
+    hash_delete,
+    merge_deletes_runs,
+    write_deletes_run,
+)
+from kgdb.resources.db.db_entity_labels import DB_E_LABEL_COLUMN_NAME, DBELabel
+from kgdb.resources.db.utils import read_run
+
+LABELS = [
+    "tokyo",
+    "kyoto",
+    "toky",
+    "tokio",
+    "tokyo tower",
+    "osaka",
+    "paris",
+    "parish",
+    "pairs",
+    "london",
+    "londen",
+    "lyon",
+    "berlin",
+    "bern",
+    "new york",
+    "york",
+    "a b",
+]
+QUERIES = ["tokyo", "Tokoy", "kyoto", "prais", "londn", "brlin", "yrok", "tokyo towr"]
+
+
+def dis_osa(str_1, str_2):
+    # Brute-force optimal string alignment distance
+    d = [[j for j in range(len(str_2) + 1)]]
+    d += [[i] + [0] * len(str_2) for i in range(1, len(str_1) + 1)]
+    for i in range(1, len(str_1) + 1):
+        for j in range(1, len(str_2) + 1):
+            cost = int(str_1[i - 1] != str_2[j - 1])
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if (
+                i > 1
+                and j > 1
+                and str_1[i - 1] == str_2[j - 2]
+                and str_1[i - 2] == str_2[j - 1]
+            ):
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def brute_force_lookup(query, max_distance):
+    query = query.lower()
+    responds = []
+    for lid, label in enumerate(LABELS, 1):
+        distance = dis_osa(query, label)
+        if distance <= max_distance:
+            responds.append((lid, distance))
+    return responds
+
+
+@pytest.fixture
+def db_labels(tmp_path):
+    db = DBELabel(db_file=str(tmp_path / "labels"), read_only=False, create_new=True)
+    for lid, label in enumerate(LABELS, 1):
+        db.add_buff(DB_E_LABEL_COLUMN_NAME.LABEL_LID.value, label, lid)
+        db.add_buff(DB_E_LABEL_COLUMN_NAME.LID_LABEL.value, lid, label)
+    db.save_buff()
+    db.close()
+    db = DBELabel(db_file=str(tmp_path / "labels"))
+    yield db
+    db.close()
+
+
+def build_db_deletes(db_labels, n_cpu=1, **kwargs):
+    # In cf.DIR_DATABASES
+    db = DBDeletes(max_distance=2, read_only=False, create_new=True, **kwargs)
+    iter_obj = db_labels.get_db_iter(DB_E_LABEL_COLUMN_NAME.LABEL_LID.value)
+    if n_cpu > 1:
+        # Small runs and fan-in: several merge rounds
+        db.build_from_labels_parallel(
+            iter_obj=iter_obj,
+            len_iter=len(LABELS),
+            n_cpu=n_cpu,
+            labels_per_run=3,
+            merge_fan_in=2,
+            tmp_dir=f"{cf.DIR_DATABASES}/tmp",
+        )
+    else:
+        db.build_from_labels(iter_obj=iter_obj, len_iter=len(LABELS))
+    db.close()
+    db = DBDeletes(max_distance=2, **kwargs)
+    db._db_labels = db_labels
+    return db
+
+
+@pytest.fixture
+def db_deletes(tmp_path, db_labels, monkeypatch):
+    monkeypatch.setattr(cf, "DIR_DATABASES", str(tmp_path))
+    db = build_db_deletes(db_labels)
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2])
+def test_lookup(db_deletes, max_distance):
+    for query in QUERIES:
+        responds = db_deletes.lookup(query, max_distance=max_distance, limit=0)
+        assert sorted(responds) == sorted(brute_force_lookup(query, max_distance))
+        distances = [distance for _, distance in responds]
+        assert distances == sorted(distances)
+        limited = db_deletes.lookup(query, max_distance=max_distance, limit=2)
+        assert limited == responds[:2]
+    assert db_deletes.lookup("", limit=0) == []
+    assert db_deletes.lookup("zzzzzz", max_distance=1) == []
+
+
+def test_search_wd(db_deletes):
+    # Cheap search: at most 2 edits, scores decrease with the distance
+    responds = db_deletes.search_wd("Tokoy")
+    assert sorted(responds) == sorted(
+        (LABELS[lid - 1], 1 - distance / 3)
+        for lid, distance in brute_force_lookup("tokoy", 2)
+    )
+    scores = [score for _, score in responds]
+    assert scores == sorted(scores, reverse=True)
+    assert len(db_deletes.search_wd("Tokoy", limit=1)) == 1
+    assert db_deletes.search_wd("zzzzzz") == []
+
+
+def test_build_from_labels_parallel(tmp_path, db_labels, monkeypatch):
+    columns = []
+    for n_cpu in [1, 2]:
+        monkeypatch.setattr(cf, "DIR_DATABASES", str(tmp_path / f"cpu_{n_cpu}"))
+        db = build_db_deletes(db_labels, n_cpu=n_cpu)
+        columns.append(dict(db.get_db_iter("DELETE")))
+        db.close()
+    assert columns[0] == columns[1]
+    assert "tokyo" in columns[0] and "" not in columns[0]
+    assert not any(set(delete) <= {" ", ".", ",", ":"} for delete in columns[0])
+
+
+def test_deletes_runs(tmp_path):
+    # Labels with line breaks and tabs survive the run files
+    labels = [[("ab\rcd", [7]), ("x\ny", [3])], [("tab\tz", [5, 9])]]
+    run_files = []
+    for i, chunk in enumerate(labels):
+        run_file, n_pairs = write_deletes_run(
+            (chunk, 1, 10, str(tmp_path / f"{i}.pkl"), False)
+        )
+        assert len(list(read_run(run_file))) == n_pairs
+        run_files.append(run_file)
+    merged = merge_deletes_runs(run_files, str(tmp_path / "merged.pkl"))
+    pairs = list(read_run(merged))
+    assert pairs == sorted(pairs)
+    assert ("ab\rcd", 7) in pairs and ("x\ny", 3) in pairs
+    assert ("tab\tz", 5) in pairs and ("tab\tz", 9) in pairs
+    assert ("abcd", 7) in pairs
+
+
+def test_delete_shards():
+    for n_shards in [1, 3, 16, 255]:
+        shards = [get_delete_shard(hash_delete(str(i)), n_shards) for i in range(2000)]
+        assert min(shards) >= 0 and max(shards) < n_shards
+        assert len(set(shards)) == n_shards
+    assert get_delete_shard(2**64 - 1, 16) == 15
+    assert get_delete_shard(0, 16) == 0
+    assert hash_delete("tokyo") == hash_delete("tokyo") < 2**64
+    schema = get_deletes_hash_schema(4)
+    assert [spec.name for spec in schema] == [
+        get_delete_hash_column(i) for i in range(4)
+    ]
+
+
+@pytest.mark.parametrize("n_cpu", [1, 2])
+def test_lookup_hashed(tmp_path, db_labels, db_deletes, monkeypatch, n_cpu):
+    monkeypatch.setattr(cf, "DIR_DATABASES", str(tmp_path / "hashed"))
+    db = build_db_deletes(db_labels, n_cpu=n_cpu, n_hash_shards=4)
+    assert db.get_columns() == [get_delete_hash_column(i) for i in range(4)]
+    assert db.size() == db_deletes.size()
+    for query in QUERIES:
+        assert db.lookup(query, limit=0) == db_deletes.lookup(query, limit=0)
+        assert db.search_wd(query) == db_deletes.search_wd(query)
+    db.close()
@@ -0,0 +1,67 @@
+import logging
+
+from kgdb.benchmarks.startup import build_synthetic_db, open_db
+from kgdb.resources.db.db_core import ID_LID, LID_ID
+
+
+def test_db_stats(tmp_path):
+    db_dir = str(tmp_path / "dbpedia")
+    build_synthetic_db("DBDBpedia", db_dir, n_items=10)
+
+    db = open_db("DBDBpedia", db_dir)
+    assert db.db_stats is None
+    assert "get_value" not in db.__dict__
+    assert "access" not in db.stats(head=0)
+    assert db.get_lid("q1") == 1
+
+    db.enable_stats()
+    assert db.get_lid("q1") == 1
+    assert db.get_lid("missing") is None
+    assert len(db.get_ids([1, 2, 100])) == 2
+    assert db.get_redirect_of(100) is None
+
+    access = db.stats(access_only=True)["access"]
+    assert access[ID_LID]["gets"] == 2
+    assert access[ID_LID]["found"] == 1
+    assert access[ID_LID]["bytes_read"] > 0
+    assert access[LID_ID]["multi_gets"] == 1
+    assert access[LID_ID]["keys"] == 3
+    assert access[LID_ID]["found"] == 2
+    assert access["REDIRECT_OF"]["redirect_fallbacks"] == 1
+
+    prometheus = db.stats_prometheus()
+    assert "# TYPE kgdb_db_gets_total counter" in prometheus
+    assert 'kgdb_db_gets_total{db="dbpedia",column="ID_LID"} 2' in prometheus
+    assert "kgdb_db_deserialize_time_seconds_total" in prometheus
+
+    db.disable_stats()
+    assert db.stats_prometheus() == ""
+    assert db.get_lid("q1") == 1
+    db.close()
+
+
+def test_db_stats_get_values(tmp_path, caplog):
+    db_dir = str(tmp_path / "dbpedia")
+    build_synthetic_db("DBDBpedia", db_dir, n_items=10)
+    db = open_db("DBDBpedia", db_dir, readonly=False)
+    # Invalid msgpack value
+    db.add_buff(LID_ID, 100, b"\xc1", is_serialize_value=False)
+    db.save_buff()
+    db.close()
+
+    db = open_db("DBDBpedia", db_dir)
+    db.enable_stats()
+    assert db.get_values(LID_ID, None) == {}
+    assert db.get_values(LID_ID, iter([1, 2])) == {}
+    assert db.get_values(LID_ID, [1, 2], get_deserialize=False).keys() == {1, 2}
+    with caplog.at_level(logging.INFO):
+        responds = db.get_values(LID_ID, [1, 100])
+        assert list(responds) == [1] and isinstance(responds[1], list)
+        assert db.get_value(LID_ID, 100) is None
+    assert sum("LID_ID" in record.getMessage() for record in caplog.records) == 2
+
+    access = db.stats(access_only=True)["access"]
+    assert access[LID_ID]["multi_gets"] == 4
+    assert access[LID_ID]["keys"] == 5
+    assert access[LID_ID]["found"] == 3
+    db.close()
@@ -0,0 +1,41 @@
+import os
+import random
+
+from kgdb.resources.db.utils import ExternalGroupBy
+
+
+def test_external_group_by(tmp_path):
+    random.seed(1)
+    items = [(random.randint(0, 100), random.randint(0, 20)) for _ in range(5000)]
+    expected = dict()
+    for key, value in items:
+        expected.setdefault(key, set()).add(value)
+
+    with ExternalGroupBy(buff_limit=10_000, tmp_dir=str(tmp_path)) as group:
+        for key, value in items:
+            group.add(key, value)
+        assert len(group.run_files) > 1
+        run_dir = group.run_dir
+        responds = list(group.items())
+    assert [key for key, _ in responds] == sorted(expected)
+    assert dict(responds) == expected
+    assert not os.path.exists(run_dir)
+
+    # In memory only, the last value of a key is kept
+    group = ExternalGroupBy(is_set=False, tmp_dir=str(tmp_path))
+    for key, value in items:
+        group.add(key, value)
+    assert not group.run_files
+    assert dict(group.items()) == dict(items)
+
+    # Runs of the caller
+    group = ExternalGroupBy(
+        is_set=False, buff_limit=10_000, run_prefix=f"{tmp_path}/last"
+    )
+    for key, value in items:
+        group.add(key, value)
+    run_files = group.get_runs()
+    assert all(os.path.exists(run_file) for run_file in run_files)
+    assert dict(group.items()) == dict(items)
+    group.close()
+    assert all(os.path.exists(run_file) for run_file in run_files)
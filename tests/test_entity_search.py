@@ -0,0 +1,193 @@
+import asyncio
+import time
+
+import pytest
+
+from kgdb.benchmarks.startup import build_synthetic_db, open_db
+from kgdb.config import config as cf
+from kgdb.modules import entity_search, entity_search_async
+
+
+def test_get_db_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(cf, "DIR_WIKIDB", str(tmp_path / "wikidata"))
+    monkeypatch.setattr(cf, "DIR_DB_LABELS", str(tmp_path / "labels"))
+    build_synthetic_db("DBWikidata", str(tmp_path), n_items=10)
+    version = entity_search.get_db_version()
+
+    db = open_db("DBWikidata", str(tmp_path))
+    db.close()
+    assert entity_search.get_db_version() == version
+
+    # Rebuild, later than the file timestamp granularity
+    time.sleep(0.05)
+    build_synthetic_db("DBWikidata", str(tmp_path), n_items=20)
+    assert entity_search.get_db_version() != version
+
+
+def get_msearch_responses(body):
+    # Two labels per query: the query text, and a longer label with a lower score
+    responses = []
+    for query in body[1::2]:
+        text = list(query["query"].values())[0]["label"]
+        hits = [
+            {"_source": {"label": text}, "_score": 2.0},
+            {"_source": {"label": f"{text} city"}, "_score": 1.0},
+        ]
+        responses.append({"hits": {"hits": hits}})
+    return {"responses": responses}
+
+
+class MockClient:
+    def msearch(self, body):
+        return get_msearch_responses(body)
+
+
+class MockAsyncClient:
+    async def msearch(self, body):
+        return get_msearch_responses(body)
+
+    async def close(self):
+        pass
+
+
+class MockLabels:
+    def get_wd_ranking_from_labels(self, labels, lang, search_objs="entity"):
+        return {
+            label: [(f"Q{len(label)}", 0.5), (f"Q{len(label) + 100}", 0.1)]
+            for label in labels
+        }
+
+    def get_labels_en_from_wd_ids(self, wd_ids):
+        return {wd_id: f"label {wd_id}" for wd_id in wd_ids}
+
+    get_labels_all_from_wd_ids = get_labels_en_from_wd_ids
+
+
+class MockItems:
+    def get_label_batch(self, wd_ids):
+        return {wd_id: f"label {wd_id}" for wd_id in wd_ids}
+
+
+class MockFuzzySearch:
+    def search_wd(self, query, limit=20, lang="en", expensive=False):
+        return [(query.lower(), 0.8)]
+
+
+@pytest.fixture
+def mock_backends(monkeypatch):
+    from kgdb.resources.db_elasticsearch import ESearch
+
+    monkeypatch.setattr(cf, "SEARCH_CACHE_SIZE", 0)
+    search_e = ESearch()
+    search_e.client = MockClient()
+    mocks = {
+        "wiki_items": MockItems(),
+        "wiki_labels": MockLabels(),
+        "search_e_es": search_e,
+        "search_e_bm25": search_e,
+        "search_f_en": MockFuzzySearch(),
+        "search_f_all": MockFuzzySearch(),
+    }
+    for name, mock in mocks.items():
+        entity_search.singletons.get(name, lambda: mock)
+    yield
+    asyncio.run(entity_search_async.close())
+
+
+@pytest.mark.parametrize("backend", ["es", "bm25"])
+@pytest.mark.parametrize("mode", ["a", "b", "f"])
+def test_async_search_batch(mock_backends, monkeypatch, backend, mode):
+    monkeypatch.setattr(cf, "LABEL_SEARCH_BACKEND", backend)
+    search_e = entity_search_async.get_search_e()
+    if backend == "es":
+        # AsyncESearch with the default settings, on a mocked client
+        search_e.client = MockAsyncClient()
+    else:
+        # Embedded backend: the sync search runs in the LMDB thread pool
+        assert search_e is None
+
+    queries = ["Tokyo", "tokyo", "New York (city)", "q42", "東京", ""]
+    expected = entity_search.search_batch(queries, mode=mode, limit=5)
+    responds = asyncio.run(
+        entity_search_async.search_batch(queries, mode=mode, limit=5)
+    )
+    assert responds == expected
+    assert responds[3] == [["Q42", 1]]
+    assert responds[0] and responds[0] == responds[1]
+    assert all(len(respond) <= 5 for respond in responds)
+
+
+def test_search_cache_case(mock_backends, monkeypatch):
+    # Labels in their own case: the scores must not depend on the query case
+    monkeypatch.setattr(
+        MockItems,
+        "get_label_batch",
+        lambda self, wd_ids: dict.fromkeys(wd_ids, "Tokyo"),
+    )
+    queries = ["TOKYO", "Tokyo", " tokyo "]
+    expected = [entity_search.search(query) for query in queries]
+    assert expected[0] == expected[1] == expected[2]
+
+    monkeypatch.setattr(cf, "SEARCH_CACHE_SIZE", 100)
+    entity_search.release("search_cache")
+    try:
+        for query in queries:
+            respond = entity_search.search(query)
+            assert respond == expected[0]
+            respond.clear()
+        assert entity_search.get_search_cache().stats()["hits_memory"] == 2
+        assert entity_search.search("Tokyo") == expected[0]
+    finally:
+        entity_search.release("search_cache")
+
+
+class MockIndices:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def put_settings(self, index, body):
+        if self.fail and body["index"]["refresh_interval"] is None:
+            raise ConnectionError("Connection lost")
+
+    def refresh(self, index):
+        pass
+
+
+class MockIndexClient:
+    def __init__(self, fail=False):
+        self.indices = MockIndices(fail)
+
+
+class MockIndexLabels:
+    def iter_labels(self, lang, from_lid=0):
+        return ((f"label {i}", i) for i in range(from_lid, 10))
+
+    def size_labels(self, lang, from_lid=0):
+        return 10 - from_lid
+
+
+def test_build_index_failures(tmp_path, monkeypatch):
+    from kgdb.resources import db_elasticsearch
+
+    def mock_parallel_bulk(client, actions, failed=(3, 6), **kwargs):
+        for doc in actions:
+            response = {"index": {"_id": doc["_id"]}}
+            yield doc["_id"] not in failed, response
+        if client.indices.fail:
+            raise ConnectionError("Bulk failed")
+
+    monkeypatch.setattr(cf, "DIR_DATABASES", str(tmp_path))
+    monkeypatch.setattr(db_elasticsearch, "DBELabel", MockIndexLabels)
+    monkeypatch.setattr(db_elasticsearch, "parallel_bulk", mock_parallel_bulk)
+    search_e = db_elasticsearch.ESearch()
+    search_e.client = MockIndexClient()
+
+    # The checkpoint stops before the first failed label
+    assert search_e.build_index("index", chunk_size=2) == [3, 6]
+    assert search_e.load_checkpoint("index") == 2
+
+    # The indexing error is raised, not the error of the settings reset
+    search_e.client = MockIndexClient(fail=True)
+    with pytest.raises(ConnectionError, match="Bulk failed"):
+        search_e.build_index("index", chunk_size=2)
+    assert search_e.load_checkpoint("index") == 2
@@ -0,0 +1,25 @@
+from kgdb.benchmarks.hot_path import compare_results, run_ops, summarize
+
+
+def test_summarize():
+    result = summarize([i / 1000 for i in range(1, 101)], wall_time=2)
+    assert result["ops"] == 100
+    assert result["ops_per_sec"] == 50
+    assert round(result["p50_ms"], 2) == 50.5
+    assert round(result["p99_ms"], 2) == 99.01
+    assert result["max_ms"] == 100
+    assert summarize([], wall_time=1) == {"ops": 0, "ops_per_sec": 0}
+
+
+def test_run_ops_and_compare():
+    seen = []
+    base = {"workloads": {"get_lid": {}}}
+    for n_threads in [1, 3]:
+        result = run_ops(seen.append, list(range(10)), n_threads)
+        assert result["ops"] == 10
+        base["workloads"]["get_lid"][f"threads_{n_threads}"] = result
+    assert sorted(seen) == sorted(list(range(10)) * 2)
+
+    ratios = compare_results(base, base)
+    assert set(ratios) == {"get_lid/threads_1", "get_lid/threads_3"}
+    assert ratios["get_lid/threads_1"]["ops_per_sec"] == 1
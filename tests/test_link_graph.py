@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+
+from kgdb.benchmarks.startup import open_db
+from kgdb.resources.db.db_wikipedia import build_csr
+
+
+def test_build_csr():
+    heads = np.array([2, 0, 2, 0], dtype=np.uint32)
+    tails = np.array([1, 2, 0, 1], dtype=np.uint32)
+    indptr, indices, degree = build_csr(heads, tails, 4)
+    assert indptr.tolist() == [0, 2, 2, 4, 4]
+    assert indices.tolist() == [1, 2, 0, 1]
+    assert degree.tolist() == [2, 0, 2, 0]
+
+    # Reverse direction
+    indptr, indices, degree = build_csr(tails, heads, 4)
+    assert indptr.tolist() == [0, 1, 3, 4, 4]
+    assert indices.tolist() == [2, 0, 2, 0]
+    assert degree.tolist() == [1, 2, 1, 0]
+
+
+def test_build_link_graph(tmp_path):
+    db = open_db("DBWikipedia", str(tmp_path / "wikipedia"), readonly=False)
+    titles = ["A", "B", "C", "D", "E"] + [f"P{i}" for i in range(30)]
+    for title in titles + ["R"]:
+        db.get_lid(title, create_new=True)
+    db.add_buff_with_lid("REDIRECT", "R", "B", encode_key=True, encode_value=True)
+    db.save_buff_lid()
+
+    pages = {
+        # B is linked by two properties and through the redirect R, A links itself
+        "A": {"p1": {"B", "C"}, "p2": {"R", "A"}},
+        "B": {"p1": {"C"}},
+        "C": {"p1": {"A", "B"}},
+        "D": {"p1": {"A"}, "p2": {"A", "E"}},
+    }
+    rand = random.Random(1)
+    for title in titles[5:]:
+        pages[title] = {
+            f"p{i}": set(rand.sample(titles, rand.randint(1, 5))) for i in range(3)
+        }
+    for title, links in pages.items():
+        db._add_page(title, {"claims_wd": links, "claims_literal": {}})
+    db.save_buff_lid()
+    db.build_link_graph(step=7)
+    db.close()
+
+    db = open_db("DBWikipedia", str(tmp_path / "wikipedia"))
+    assert db.get_outlinks("A") == ["B", "C"]
+    assert db.get_outlinks_count("A") == 2
+    assert db.get_inlinks("A", limit=1) == ["C"]
+    assert db.get_inlinks("R") == db.get_inlinks("B")
+    assert db.get_outlinks("R") == db.get_outlinks("B") == ["C"]
+    assert db.get_inlinks_count("R") == db.get_inlinks_count("B")
+    assert db.get_outlinks("Missing") is None
+
+    # Degrees and adjacency against a brute-force count of the redirected links
+    edges = {
+        (title, "B" if link == "R" else link)
+        for title, links in pages.items()
+        for props in links.values()
+        for link in props
+    }
+    edges = {(head, tail) for head, tail in edges if head != tail}
+    for title in titles:
+        outlinks = sorted((t for h, t in edges if h == title), key=db.get_lid)
+        inlinks = sorted((h for h, t in edges if t == title), key=db.get_lid)
+        assert db.get_outlinks(title) == outlinks
+        assert db.get_inlinks(title) == inlinks
+        assert db.get_inlinks(title, limit=2) == inlinks[:2]
+        assert db.get_outlinks_count(title) == len(outlinks)
+        assert db.get_inlinks_count(db.get_lid(title)) == len(inlinks)
+        assert db.get_outlinks(db.get_lid(title), decode_value=False) == [
+            db.get_lid(t) for t in outlinks
+        ]
+    db.close()
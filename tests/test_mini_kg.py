@@ -0,0 +1,294 @@
+import bz2
+import os
+from collections import defaultdict
+
+import pytest
+
+from kgdb.benchmarks.mini_kg import MiniKGGenerator
+from kgdb.benchmarks.startup import open_db
+from kgdb.config import config as cf
+from kgdb.resources.db.db_dbpedia import (
+    INFORMATION_COLUMNS,
+    DBDBpedia,
+    iter_facts_entities,
+    iter_facts_literals,
+    parse_dump_task,
+    union_sets,
+)
+from kgdb.resources.db.db_wikidata import parse_json_dump, reader_wikidata_dump
+from kgdb.resources.db.db_wikipedia import (
+    WPDumpReader,
+    iter_parsed_pages,
+    parse_reader,
+)
+from kgdb.resources.db.utils import ExternalGroupBy, merge_runs, read_run
+from kgdb.utils import io_worker as iw
+from kgdb.utils.ntriples import split_triple
+from kgdb.utils.sql_dump import iter_sql_dump
+
+
+def test_mini_kg_dumps(tmp_path):
+    generator = MiniKGGenerator(n_entities=100, n_properties=5, seed=1)
+    dump_files = generator.write_dumps(str(tmp_path), n_cpu=1)
+
+    items = [
+        parse_json_dump(line)
+        for line in reader_wikidata_dump(dump_files["DIR_DUMP_WD_JSON"])
+    ]
+    items = dict(item for item in items if item)
+    assert len(items) == 100 + len(list(generator.iter_wikidata_properties()))
+    assert items["Q10"]["label"] == generator.labels[9]
+
+    pages = list(iter_sql_dump(dump_files["DIR_DUMP_WP_PAGE"], [1], [1]))
+    assert pages.count((0,)) == 100 + len(generator.redirects)
+    props = list(iter_sql_dump(dump_files["DIR_DUMP_WP_PROPS"]))
+    assert ("1", "wikibase_item", "Q1", None) == props[0]
+
+    wp_pages = list(WPDumpReader(dump_files["DIR_DUMP_WP_EN"]))
+    assert len(wp_pages) == 100 + len(generator.redirects)
+    wp_page = parse_reader(wp_pages[0])
+    assert wp_page.wp_wd == "Q1"
+
+    for line in iw.read_line_from_file(dump_files["DIR_DUMP_DP_OBJECTS"], mode="rb"):
+        head, _, tail = split_triple(line)
+        assert head and tail
+
+
+def test_dbpedia_parse_dump_task(tmp_path):
+    generator = MiniKGGenerator(n_entities=100, n_properties=5, seed=1)
+    dump_files = generator.write_dumps(str(tmp_path / "dumps"), n_cpu=1)
+
+    # Entity facts of two dumps are merged from their runs
+    expected = defaultdict(lambda: defaultdict(set))
+    run_files = defaultdict(list)
+    name_runs = []
+    for i, (dump_file, kwargs) in enumerate(
+        [("DIR_DUMP_DP_INFOBOX", {}), ("DIR_DUMP_DP_OBJECTS", {"prop_prefix": cf.DBO})]
+    ):
+        for title, prop, value in iter_facts_entities(dump_files[dump_file], **kwargs):
+            expected["CLAIMS_ENT"][(title, prop)].add(value)
+        runs, task_name_runs = parse_dump_task(
+            (
+                "CLAIMS_ENT",
+                iter_facts_entities,
+                dump_files[dump_file],
+                kwargs,
+                f"{tmp_path}/{i}",
+            )
+        )
+        run_files["CLAIMS_ENT"].extend(runs["CLAIMS_ENT"])
+        name_runs.extend(task_name_runs)
+
+    dump_file = dump_files["DIR_DUMP_DP_LITERALS"]
+    for column_name, title, prop, value in iter_facts_literals(dump_file):
+        expected[column_name][(title, prop)].add(value)
+    runs, task_name_runs = parse_dump_task(
+        (None, iter_facts_literals, dump_file, {}, f"{tmp_path}/2")
+    )
+    for column_name, column_runs in runs.items():
+        run_files[column_name].extend(column_runs)
+    name_runs.extend(task_name_runs)
+
+    assert set(run_files) == set(expected)
+    assert expected["CLAIMS_TIME"] and expected["CLAIMS_QUANTITY"]
+    for column_name, column_runs in run_files.items():
+        assert dict(merge_runs(column_runs, union_sets)) == expected[column_name]
+
+    # Name runs are sorted and de-duplicated, literal values are not names
+    names = {
+        v for (title, prop), values in expected["CLAIMS_ENT"].items() for v in values
+    }
+    for column_name in expected:
+        names.update(name for key in expected[column_name] for name in key)
+    for run_file in name_runs:
+        run_names = [name for name, _ in read_run(run_file)]
+        assert run_names == sorted(set(run_names))
+    assert [name for name, _ in merge_runs(name_runs)] == sorted(names)
+
+    # LIDs: existing names keep theirs, new names are numbered in sorted order
+    db = open_db("DBDBpedia", str(tmp_path / "dbpedia"), readonly=False)
+    existing = sorted(names)[len(names) // 2]
+    assert db.get_lid(existing, create_new=True) == 0
+    db.save_buff_lid()
+    db._assign_lids(name_runs, step=7)
+    db._assign_lids(name_runs, step=7)
+    lids = db.get_values("ID_LID", sorted(names))
+    assert lids[existing] == 0
+    assert [lids[name] for name in sorted(names) if name != existing] == list(
+        range(1, len(names))
+    )
+    assert db.max_lid_id == len(names)
+
+    db._write_runs("CLAIMS_ENT", run_files["CLAIMS_ENT"], step=7)
+    ids = db.get_values("LID_ID", list(range(len(names))))
+    claims = {
+        (ids[title], ids[prop]): {ids[v] for v in values}
+        for (title, prop), values in db.get_db_iter("CLAIMS_ENT")
+    }
+    db.close()
+    assert claims == expected["CLAIMS_ENT"]
+
+
+def get_dbpedia_columns(db):
+    # Columns with names instead of LIDs: LIDs depend on the build order
+    encoded = {column: obj[1] for column, obj in INFORMATION_COLUMNS.items()}
+    encoded.update(REDIRECT=True, REDIRECT_OF=True, ALIASES_EN=True)
+    names = dict(db.get_db_iter("LID_ID"))
+    columns = dict()
+    for column in db.db_schema:
+        if column in ["ID_LID", "LID_ID"]:
+            continue
+        decode = names.get if encoded.get(column) else lambda v: v
+        items = dict()
+        for key, value in db.get_db_iter(column):
+            key = tuple(names[k] for k in key) if isinstance(key, tuple) else names[key]
+            if isinstance(value, (str, int, float)):
+                items[key] = decode(value)
+            else:
+                items[key] = {decode(v) for v in list(value)}
+        columns[column] = items
+    return columns
+
+
+@pytest.mark.parametrize("buff_limit", [None, 2_000])
+def test_dbpedia_build_information_parallel(tmp_path, monkeypatch, buff_limit):
+    generator = MiniKGGenerator(n_entities=100, n_properties=5, seed=1)
+    dump_files = generator.write_dumps(str(tmp_path / "dumps"), n_cpu=1)
+    for name, file in dump_files.items():
+        if hasattr(cf, name):
+            monkeypatch.setattr(cf, name, file)
+    dumps_dp = f"{tmp_path}/dumps{cf.DIR_DUMPS_DP[len(cf.DIR_DUMP):]}"
+    monkeypatch.setattr(cf, "DIR_DUMPS_DP", dumps_dp)
+    monkeypatch.setattr(cf, "DIR_TEMP", str(tmp_path / "tmp"))
+    if buff_limit:
+        # Groups are spilled to runs
+        monkeypatch.setattr(cf, "GROUP_BY_BUFF_LIMIT", buff_limit)
+        assert ExternalGroupBy().buff_limit == buff_limit
+
+    columns = []
+    for n_cpu in [1, 2]:
+        db = DBDBpedia(db_file=str(tmp_path / f"dbpedia_{n_cpu}"), readonly=False)
+        db.build_redirects()
+        if n_cpu == 1:
+            db.build_information()
+        else:
+            db.build_information_parallel(n_cpu=n_cpu, tmp_dir=cf.DIR_TEMP)
+        columns.append(get_dbpedia_columns(db))
+        db.close()
+    assert columns[0] == columns[1]
+    assert all(columns[0][column] for column in INFORMATION_COLUMNS)
+    # Runs of the parallel build are deleted
+    assert os.listdir(cf.DIR_TEMP) == []
+
+
+def test_wikipedia_iter_parsed_pages(tmp_path):
+    generator = MiniKGGenerator(n_entities=50, n_properties=5, seed=1)
+    dump_files = generator.write_dumps(str(tmp_path), n_cpu=1)
+    pages = WPDumpReader(dump_files["DIR_DUMP_WP_EN"])
+
+    responds = list(iter_parsed_pages(pages, n_cpu=1))
+    assert len(responds) == 50 + len(generator.redirects)
+    title, redirect, wp_obj = responds[0]
+    assert title == generator.titles[0] and redirect is None
+    assert wp_obj["claims_wd"]
+    assert list(iter_parsed_pages(pages, n_cpu=2, batch_size=7, queue_size=2)) == (
+        responds
+    )
+
+
+def test_wikipedia_dump_reader_multistream(tmp_path):
+    generator = MiniKGGenerator(n_entities=50, n_properties=5, seed=1)
+    dump_files = generator.write_dumps(str(tmp_path), n_cpu=1)
+    pages = list(WPDumpReader(dump_files["DIR_DUMP_WP_EN"]))
+
+    # Multistream dump: header, streams of 10 pages, footer
+    with bz2.open(dump_files["DIR_DUMP_WP_EN"], "rb") as f:
+        xml = f.read()
+    header, *page_xmls = xml.split(b"  <page>")
+    page_xmls[-1], footer = page_xmls[-1].split(b"</mediawiki>")
+    page_xmls = [b"  <page>" + page_xml for page_xml in page_xmls]
+    multistream_file = str(tmp_path / "multistream.xml.bz2")
+    offsets = []
+    with open(multistream_file, "wb") as f:
+        f.write(bz2.compress(header))
+        for i in range(0, len(page_xmls), 10):
+            offsets.append(f.tell())
+            f.write(bz2.compress(b"".join(page_xmls[i : i + 10])))
+        f.write(bz2.compress(b"</mediawiki>" + footer))
+
+    assert list(WPDumpReader(multistream_file)) == pages
+    assert list(WPDumpReader(multistream_file, offset=offsets[2])) == pages[20:]
+
+
+def test_wikipedia_page_columns(tmp_path):
+    generator = MiniKGGenerator(n_entities=50, n_properties=5, seed=1)
+    dump_files = generator.write_dumps(str(tmp_path / "dumps"), n_cpu=1)
+    pages = [
+        (title, wp_obj)
+        for title, redirect, wp_obj in iter_parsed_pages(
+            WPDumpReader(dump_files["DIR_DUMP_WP_EN"])
+        )
+        if not redirect and wp_obj
+    ]
+
+    # Pages missing from the page dump, links are rewritten to redirect titles
+    missing = set(generator.titles[5::7])
+    redirects = {
+        title: generator.titles[target]
+        for title, target in generator.redirects.items()
+        if generator.titles[target] not in missing
+    }
+    redirect_titles = {target: title for title, target in redirects.items()}
+
+    db = open_db("DBWikipedia", str(tmp_path / "wikipedia"), readonly=False)
+    for title in generator.titles + list(redirects):
+        if title not in missing:
+            db.get_lid(title, create_new=True)
+    for title, target in redirects.items():
+        db.add_buff_with_lid(
+            "REDIRECT", title, target, encode_key=True, encode_value=True
+        )
+    db.save_buff_lid()
+
+    expected_links, expected_infobox = dict(), dict()
+    n_redirected, n_dropped = 0, 0
+    db.enable_stats()
+    for title, wp_obj in pages:
+        if title in missing:
+            continue
+        wp_obj["claims_wd"] = {
+            prop: {redirect_titles.get(t, t) for t in titles}
+            for prop, titles in wp_obj["claims_wd"].items()
+        }
+        db._add_page(title, wp_obj)
+        links = dict()
+        for prop, titles in wp_obj["claims_wd"].items():
+            n_redirected += len(titles & set(redirects))
+            n_dropped += len(titles & missing)
+            titles = {redirects.get(t, t) for t in titles if t not in missing}
+            if titles:
+                links[prop] = titles
+        expected_links[title] = links
+        expected_infobox[title] = {
+            prop: sorted(values) for prop, values in wp_obj["claims_literal"].items()
+        }
+    # One batched read of the link redirects per page
+    access = db.stats(access_only=True)["access"]["REDIRECT"]
+    assert access["multi_gets"] == len(expected_links) and access["gets"] == 0
+    db.save_buff_lid()
+    db.close()
+    assert n_redirected and n_dropped
+
+    db = open_db("DBWikipedia", str(tmp_path / "wikipedia"))
+    for title, links in expected_links.items():
+        responds = db.get_page_links(title) or dict()
+        assert {prop: set(titles) for prop, titles in responds.items()} == links
+        responds = db.get_page_links(db.get_lid(title), decode_value=False) or {}
+        assert {prop: set(db.get_ids(lids)) for prop, lids in responds.items()} == (
+            links
+        )
+        assert (db.get_page_infobox(title) or dict()) == expected_infobox[title]
+    title, links = next((t, links) for t, links in expected_links.items() if links)
+    prop = next(iter(links))
+    assert set(db.get_page_links_with_property(title, prop)) == links[prop]
+    db.close()
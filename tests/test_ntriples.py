@@ -0,0 +1,51 @@
+import datetime
+from decimal import Decimal
+
+from kgdb.config import config as cf
+from kgdb.utils.ntriples import (
+    get_iri,
+    get_object_text,
+    parse_literal,
+    remove_iri_prefix,
+    split_triple,
+)
+
+
+def test_split_triple():
+    line = (
+        b"<http://dbpedia.org/resource/Caf%C3%A9> "
+        b"<http://dbpedia.org/ontology/type> "
+        b"<http://dbpedia.org/resource/Coffeehouse> .\n"
+    )
+    subject, predicate, obj = split_triple(line)
+    assert subject == f"{cf.DBR}Caf%C3%A9"
+    assert remove_iri_prefix(predicate) == "type"
+    assert get_iri(obj) == f"{cf.DBR}Coffeehouse"
+    assert get_object_text(obj) == "Coffeehouse"
+
+    _, _, obj = split_triple(b'<a> <b> "x y ." .\n')
+    assert obj == b'"x y ."'
+    assert split_triple(b"# comment\n") is None
+    assert split_triple(b'_:b0 <b> "x" .\n') is None
+
+
+def test_parse_literal():
+    xsd = "http://www.w3.org/2001/XMLSchema#"
+    literals = {
+        f'"12"^^<{xsd}nonNegativeInteger>': 12,
+        f'"1.5E3"^^<{xsd}double>': 1500.0,
+        f'"12.50"^^<{xsd}decimal>': Decimal("12.50"),
+        f'"true"^^<{xsd}boolean>': True,
+        f'"2001-02-03"^^<{xsd}date>': datetime.date(2001, 2, 3),
+        f'"2001-02-30"^^<{xsd}date>': "2001-02-30",
+        f'"1999"^^<{xsd}gYear>': "1999",
+        '"12.5"^^<http://dbpedia.org/datatype/squareKilometre>': "12.5",
+        '"a \\"b\\" \\u00e9"@en': 'a "b" é',
+        '"Café"@fr': "Café",
+    }
+    for obj, value in literals.items():
+        respond = parse_literal(obj.encode(cf.ENCODING))
+        assert respond == value and type(respond) == type(value)
+    assert parse_literal(b"<http://dbpedia.org/resource/A>") is None
+    assert get_object_text(f'"1.5E3"^^<{xsd}double>'.encode()) == "1500.0"
+    assert get_object_text(f'"true"^^<{xsd}boolean>'.encode()) == "true"
@@ -0,0 +1,39 @@
+from kgdb.utils.similarities import (
+    dis_damerau_levenshtein_bounded,
+    get_closest,
+    get_closest_scores,
+    sim_fuzz_ratio,
+    sim_fuzz_ratio_list,
+)
+
+
+def test_dis_damerau_levenshtein_bounded():
+    assert dis_damerau_levenshtein_bounded("tokyo", "tokyo", 2) == 0
+    assert dis_damerau_levenshtein_bounded("tokyo", "tokio", 2) == 1
+    # Transposition is one edit
+    assert dis_damerau_levenshtein_bounded("jellyifhs", "jellyfish", 3) == 2
+    assert dis_damerau_levenshtein_bounded("kitten", "sitting", 3) == 3
+
+
+def test_dis_damerau_levenshtein_bounded_exceed():
+    # Distance larger than max_distance returns max_distance + 1
+    assert dis_damerau_levenshtein_bounded("kitten", "sitting", 2) == 3
+    assert dis_damerau_levenshtein_bounded("abc", "", 2) == 3
+    assert dis_damerau_levenshtein_bounded("tokyo", "tokyo tower", 4) == 5
+
+
+def test_get_closest_scores():
+    groups = [["Tokyo", "Tokio"], [], ["Kyoto"], ["", "tokyo tower"]]
+    scores = get_closest_scores("Tokyo", groups)
+    assert scores[1] == 0
+    for group, score in zip(groups, scores):
+        if group:
+            assert abs(get_closest("Tokyo", group)[1] - score) < 1e-9
+
+
+def test_sim_fuzz_ratio_list():
+    labels = ["Tokyo", None, "Kyoto", ""]
+    scores = sim_fuzz_ratio_list("Tokyo", labels)
+    assert scores[0] == 1
+    assert scores[1] == 0 and scores[3] == 0
+    assert abs(scores[2] - sim_fuzz_ratio("Kyoto", "Tokyo")) < 1e-9
@@ -0,0 +1,35 @@
+import gzip
+
+from kgdb.utils.sql_dump import iter_sql_dump, iter_sql_rows
+
+LINE = (
+    b"INSERT INTO `page` VALUES (1,0,'Paris,_Texas',NULL,0.5,''),"
+    b"(2,14,'It\\'s_(a)_\\\\_\\\"test\\\"\\n',NULL,-2,'x'),"
+    b"(3,0,'Caf\xc3\xa9',NULL,1,'NULL');\n"
+)
+
+
+def test_iter_sql_rows():
+    rows = list(iter_sql_rows(LINE))
+    assert rows[0] == ("1", "0", "Paris,_Texas", None, "0.5", "")
+    assert rows[1][2] == 'It\'s_(a)_\\_"test"\n'
+    assert rows[2] == ("3", "0", "Café", None, "1", "NULL")
+
+    # Projection in any order, int conversion
+    rows = list(iter_sql_rows(LINE, columns=[2, 0, 1], int_columns=[0, 1]))
+    assert rows[0] == ("Paris,_Texas", 1, 0)
+    assert [row[2] for row in rows] == [0, 14, 0]
+    assert list(iter_sql_rows(LINE, columns=[3])) == [(None,)] * 3
+    assert list(iter_sql_rows(b"-- comment\n")) == []
+
+
+def test_iter_sql_dump(tmp_path):
+    file = str(tmp_path / "page.sql.gz")
+    with gzip.open(file, "wb") as f:
+        f.write(b"-- MySQL dump\n")
+        for i in range(5):
+            f.write(LINE.replace(b"(1,", f"({i * 10},".encode()))
+    rows = list(iter_sql_dump(file, [0, 2], [0]))
+    assert len(rows) == 15
+    assert rows[3] == (10, "Paris,_Texas")
+    assert list(iter_sql_dump(file, [0, 2], [0], n_cpu=2)) == rows
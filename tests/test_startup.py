@@ -0,0 +1,39 @@
+from kgdb.benchmarks.startup import (
+    measure_import_time,
+    parse_import_time,
+    timed_methods,
+)
+
+
+def test_parse_import_time():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     _io\n"
+        "import time:      2000 |       2500 |   kgdb.config.config\n"
+        "import time:       300 |       2800 | kgdb\n"
+    )
+    imports = parse_import_time(stderr)
+    assert [obj["module"] for obj in imports] == ["_io", "kgdb.config.config", "kgdb"]
+    assert [obj["depth"] for obj in imports] == [2, 1, 0]
+    assert imports[1]["self"] == 0.002
+    assert imports[2]["cumulative"] == 0.0028
+
+
+def test_timed_methods():
+    class Counter:
+        def count(self, n):
+            return n + 1
+
+    with timed_methods(Counter, ["count", "missing"]) as timings:
+        assert Counter().count(1) == 2
+    assert list(timings) == ["count"]
+    assert Counter.__dict__["count"].__name__ == "count"
+
+
+def test_import_entity_search():
+    # Databases and search backends (scipy, elasticsearch, ...) are imported on use
+    result = measure_import_time("kgdb.modules.entity_search", top_k=0)
+    assert not result["error"]
+    modules = {obj["module"] for obj in result["kgdb_modules"]}
+    assert not any(module.startswith("kgdb.resources") for module in modules)
+    assert result["cumulative"] < 0.3
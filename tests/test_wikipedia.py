@@ -37,6 +37,40 @@ def test_get_wikidata():
     assert db.get_wikidata(tokyo_lid) == "Q7473516"
 
 
+def test_get_page_links():
+    db = DBWikipedia(readonly=True)
+
+    links = db.get_page_links("Tokyo")
+    assert "Japan" in links["Section: Information"]
+
+    tokyo_lid = db.get_lid("Tokyo")
+    links = db.get_page_links(tokyo_lid, decode_value=False)
+    assert db.get_lid("Japan") in links["Section: Information"]
+
+    assert db.get_page_links_with_property("Tokyo", "Section: Information")
+
+
+def test_get_page_infobox():
+    db = DBWikipedia(readonly=True)
+
+    infobox = db.get_page_infobox("Tokyo")
+    assert infobox and all(isinstance(v, list) for v in infobox.values())
+
+
+def test_get_links():
+    db = DBWikipedia(readonly=True)
+
+    assert "Japan" in db.get_outlinks("Tokyo")
+    assert "Tokyo" in db.get_inlinks("Japan")
+    assert db.get_outlinks("Tokei") == db.get_outlinks("Tokyo")
+    assert len(db.get_inlinks("Tokyo", limit=10)) == 10
+
+    tokyo_lid = db.get_lid("Tokyo")
+    assert db.get_lid("Japan") in db.get_outlinks(tokyo_lid, decode_value=False)
+    assert db.get_inlinks_count("Tokyo") >= len(db.get_inlinks("Tokyo", limit=10))
+    assert db.get_outlinks_count(tokyo_lid) == len(db.get_outlinks(tokyo_lid))
+
+
 def test_get_label():
     db = DBWikipedia(readonly=True)
     assert db.get_label("Q1490") == "Tokyo"